@@ -7,6 +7,7 @@ from complexipy._complexipy import (
     FileComplexity,
     FunctionComplexity,
     IgnoredLocation,
+    LineComplexities,
     LineComplexity,
     RefactorPlan,
     RemovableIgnore,
@@ -34,6 +35,7 @@ __all__ = [
     "FileComplexity",
     "FunctionComplexity",
     "IgnoredLocation",
+    "LineComplexities",
     "LineComplexity",
     "RefactorPlan",
     "RemovableIgnore",
@@ -8,7 +8,7 @@ harder to reason about.
 """
 
 from enum import Enum
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
 
 class RuleCategory(Enum):
     """Category of a refactoring rule."""
@@ -87,6 +87,33 @@ class LineComplexity:
 
     def __init__(self, line: int, complexity: int) -> None: ...
 
+class LineComplexities(Sequence[LineComplexity]):
+    """
+    The complexity recorded for each line of a function.
+
+    Holds one entry for every line the analysis recorded, in the order it
+    walked them and including lines with zero complexity. The entries are
+    stored as packed pairs of unsigned 32-bit integers and only become
+    LineComplexity objects when indexed or iterated. The pairs can also be
+    read without creating any objects through the buffer protocol.
+
+    This is a read-only sequence, not a list: it has no list methods such
+    as append or sort. Use list(lines) where a list is needed.
+
+    Example:
+        >>> for lc in func.line_complexities:
+        ...     print(f"Line {lc.line}: +{lc.complexity}")
+        >>> pairs = memoryview(func.line_complexities).cast("I")
+        >>> list(zip(pairs[::2], pairs[1::2]))
+        [(11, 0), (12, 2), (15, 1)]
+    """
+
+    def __init__(self, entries: List[LineComplexity] = []) -> None: ...
+    def __len__(self) -> int: ...
+    def __getitem__(self, index: int) -> LineComplexity: ...  # type: ignore[override]
+    def __iter__(self) -> Iterator[LineComplexity]: ...
+    def __buffer__(self, flags: int) -> memoryview: ...
+
 class RefactorPlan:
     """Deterministic refactoring plan for reducing one function's complexity.
 
@@ -198,11 +225,13 @@ class FunctionComplexity:
         ...     complexity=8,
         ...     line_start=10,
         ...     line_end=25,
-        ...     line_complexities=[LineComplexity(12, 2), LineComplexity(15, 1)]
+        ...     line_complexities=LineComplexities(
+        ...         [LineComplexity(12, 2), LineComplexity(15, 1)]
+        ...     ),
         ... )
         >>> print(f"Function '{func.name}' has complexity {func.complexity}")
         >>> # Find the most complex lines
-        >>> complex_lines = [lc for lc in func.line_complexities if lc.complexity > 0]
+        >>> complex_lines = sorted(func.line_complexities, key=lambda lc: -lc.complexity)
     """
 
     name: str
@@ -236,13 +265,15 @@ class FunctionComplexity:
     Points to the last line that belongs to this function's body.
     """
 
-    line_complexities: List[LineComplexity]
+    line_complexities: LineComplexities
     """
     Detailed complexity information for each line in the function.
 
-    This list contains LineComplexity objects for every line in the function,
-    allowing you to identify exactly which lines contribute to the overall
-    complexity score. Lines with zero complexity are included for completeness.
+    This sequence contains LineComplexity objects for every line in the
+    function, allowing you to identify exactly which lines contribute to the
+    overall complexity score. Lines with zero complexity are included for
+    completeness. It is a read-only LineComplexities sequence rather than a
+    list; use list(func.line_complexities) where a list is needed.
 
     Example:
         >>> # Find lines that add complexity
@@ -252,7 +283,12 @@ class FunctionComplexity:
     """
 
     refactor_plans: List[RefactorPlan]
-    """Ranked deterministic refactoring plans for this function, capped at 5."""
+    """
+    Ranked deterministic refactoring plans for this function, capped at 5.
+
+    Plans are built the first time this or `additional_refactor_plans` is
+    read, and shared with every later read.
+    """
 
     additional_refactor_plans: int
     """Count of further plans that survived dedup but were dropped by the cap."""
@@ -263,7 +299,7 @@ class FunctionComplexity:
         complexity: int,
         line_start: int,
         line_end: int,
-        line_complexities: List[LineComplexity],
+        line_complexities: LineComplexities,
         refactor_plans: List[RefactorPlan],
         additional_refactor_plans: int,
     ) -> None: ...
@@ -476,6 +512,16 @@ def main(
     check_script: bool = False,
     no_ignore: bool = False,
     invocation_path: str = ".",
+    jobs: Optional[int] = None,
+    path_queue_depth: Optional[int] = None,
+    read_queue_depth: Optional[int] = None,
+    stats: bool = False,
+    schedule: str = "discovery",
+    cost_history: Optional[str] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    score_only: bool = False,
+    refactor_plans: bool = False,
+    plan_jobs: Optional[int] = None,
 ) -> Tuple[List[FileComplexity], List[str]]:
     """
     Analyze cognitive complexity of Python files and directories.
@@ -487,7 +533,10 @@ def main(
     The function handles various input types:
     - Local Python files: '/path/to/file.py'
     - Local directories: '/path/to/project/' (analyzes all .py files)
-    - Git repositories: 'https://github.com/user/repo.git'
+    - Git repositories: 'https://github.com/user/repo.git', 'file:///srv/repo.git'
+      or a local bare repository. Repositories are cloned shallowly and
+      concurrently into temporary directories, and their paths are reported
+      relative to the clone, starting with the repository name.
 
     Args:
         paths: List of file paths, directory paths, or Git repository URLs to analyze.
@@ -496,10 +545,41 @@ def main(
                programmatic usage where you only want the returned data.
         exclude: List of file paths, directory paths.
                  Each path will be excluded from the analysis.
+        jobs: Number of worker threads used to analyze files. Defaults to the
+              number of available CPU cores; small inputs use fewer threads.
+        path_queue_depth: Number of discovered paths buffered ahead of the
+                          reader threads. Defaults to 1024.
+        read_queue_depth: Number of read files buffered ahead of the analysis
+                          workers. Defaults to 64.
+        stats: If True, prints how long each stage (discovery, read, analysis)
+               spent stalled to stderr.
+        schedule: Order in which files are analyzed. "discovery" (the default)
+                  analyzes files as they are found; "largest-first" waits
+                  for discovery to finish and starts with the most expensive
+                  files.
+        cost_history: Path of a JSON file with per-file analysis times from
+                      previous runs. It is used to estimate costs for
+                      "largest-first" and rewritten with the times measured
+                      in this run. Nothing is read or written when omitted.
+        shard: (INDEX, COUNT) with 1 <= INDEX <= COUNT. Only the files whose
+               path hashes to shard INDEX of COUNT are analyzed; the hash is
+               taken over the path relative to each analyzed directory, so
+               every node of a split run gets a disjoint, reproducible subset.
+        score_only: If True, compute only each function's name, line range
+                    and complexity, leaving line complexities and refactor
+                    plans empty.
+        refactor_plans: If True, each function's refactor plans are built
+                        the first time they are read. If False (the
+                        default), they are left empty, like the CLI does
+                        without `--suggest-refactors`.
+        plan_jobs: Most threads used to check and measure the refactor plans
+                   of one function. Defaults to every thread of the pool
+                   they are built on. The cap only applies to the plans of
+                   this call, including those built when first read.
 
     Returns:
         List of FileComplexity objects, one for each Python file analyzed.
-        Files are ordered by discovery order during filesystem traversal.
+        Files are sorted by path.
 
     Raises:
         Various exceptions may be raised for invalid paths, permission errors,
@@ -518,7 +598,10 @@ def main(
     ...
 
 def code_complexity(
-    code: str, check_script: bool = False, no_ignore: bool = False
+    code: str,
+    check_script: bool = False,
+    no_ignore: bool = False,
+    score_only: bool = False,
 ) -> CodeComplexity:
     """
     Analyze cognitive complexity of Python code provided as a string.
@@ -536,6 +619,9 @@ def code_complexity(
         code: A string containing valid Python source code. The code should
               be properly formatted and syntactically correct. Syntax errors
               will cause the analysis to fail.
+        score_only: If True, compute only each function's name, line range
+                    and complexity, leaving line complexities and refactor
+                    plans empty.
 
     Returns:
         CodeComplexity object containing the analysis results, including
@@ -575,6 +661,7 @@ def file_complexity(
     base_path: str,
     check_script: bool = False,
     no_ignore: bool = False,
+    score_only: bool = False,
 ) -> FileComplexity:
     """
     Analyze cognitive complexity of a single Python source file.
@@ -595,6 +682,9 @@ def file_complexity(
                    in the analysis results. This is typically the project
                    root directory and affects the 'path' field in the
                    returned FileComplexity object.
+        score_only: If True, compute only each function's name, line range
+                    and complexity, leaving line complexities and refactor
+                    plans empty.
 
     Returns:
         FileComplexity object containing complete analysis results for the
@@ -623,6 +713,30 @@ def file_complexity(
     """
     ...
 
+def discover_files(
+    paths: List[str],
+    exclude: List[str],
+    invocation_path: str = ".",
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    List the Python files `main` would analyze, without analyzing them.
+
+    Directories are walked with the same gitignore rules and exclude
+    patterns as `main`. Repository URLs are not cloned.
+
+    Args:
+        paths: Files and directories to discover.
+        exclude: Glob patterns of files or directories to skip.
+        invocation_path: Directory that reported paths are relative to.
+
+    Returns:
+        Tuple of (files, failed_paths), where each file is a sorted
+        `(file_path, base_path)` pair that can be passed to
+        `file_complexity`, and failed_paths lists missing paths and
+        repository URLs.
+    """
+    ...
+
 def output_csv(
     output_path: str,
     files_complexities: List[FileComplexity],
@@ -714,6 +828,9 @@ def output_json(
                            empty list, mirroring `--suggest-refactors` in
                            the CLI.
 
+    Each entry has the keys `path`, `file_name`, `function_name`,
+    `complexity`, `line_start`, `line_end` and `refactor_plans`.
+
     Raises:
         PermissionError: If the output path is not writable.
         FileNotFoundError: If the output directory does not exist.
@@ -742,6 +859,31 @@ def create_snapshot_file(
     files_complexities: List[FileComplexity],
 ) -> None: ...
 def load_snapshot_file(snapshot_file_path: str) -> List[FileComplexity]: ...
+def load_result_files(
+    paths: List[str],
+    keep_plans: bool = False,
+    max_complexity: Optional[int] = None,
+) -> Tuple[List[FileComplexity], List[str]]:
+    """
+    Rebuild analysis results from saved result files without re-analysis.
+
+    Each file may be a JSON report written with `output_json` or a snapshot
+    written with `create_snapshot_file`. Files are streamed one entry at a
+    time, so inputs are never loaded whole. When several inputs report the
+    same file, the last one wins.
+
+    Args:
+        paths: Result files to combine, in order.
+        keep_plans: If True, keeps the refactor plans stored in JSON reports.
+        max_complexity: If set, only functions whose complexity exceeds it
+                        are kept.
+
+    Returns:
+        Tuple of (merged FileComplexity list sorted by path, result files
+        that could not be read or parsed).
+    """
+    ...
+
 def collect_all_ignored_locations(
     paths: List[str],
     exclude: List[str],
@@ -8,6 +8,7 @@ def code_complexity(
     code: str,
     check_script: bool = False,
     no_ignore: bool = False,
+    score_only: bool = False,
 ) -> CodeComplexity:
     """
     Analyze cognitive complexity of Python code provided as a string.
@@ -17,6 +18,10 @@ def code_complexity(
     complexity scores. Perfect for analyzing code snippets, templates,
     or dynamically generated code.
 
+    Refactor plans are built the first time a function's `refactor_plans`
+    or `additional_refactor_plans` is read, so callers that never look at
+    them do not pay for them.
+
     Args:
         code: A string containing valid Python source code. Must be
               syntactically correct Python code.
@@ -24,6 +29,10 @@ def code_complexity(
                       module-level (script) code as a '<module>' entry.
         no_ignore: If True, disregard all '# complexipy: ignore' and
                    '# noqa: complexipy' comments, analyzing every function.
+        score_only: If True, compute only each function's name, line range
+                    and complexity. Line complexities and refactor plans are
+                    left empty, which makes the analysis faster when only
+                    the scores are needed.
 
     Returns:
         CodeComplexity object containing the analysis results, including
@@ -43,13 +52,16 @@ def code_complexity(
         >>> result = code_complexity(code)
         >>> print(f"Total complexity: {result.complexity}")
     """
-    return _complexipy.code_complexity(code, check_script, no_ignore)
+    return _complexipy.code_complexity(
+        code, check_script, no_ignore, score_only
+    )
 
 
 def file_complexity(
     file_path: str,
     check_script: bool = False,
     no_ignore: bool = False,
+    score_only: bool = False,
 ) -> FileComplexity:
     """
     Analyze cognitive complexity of a single Python source file.
@@ -59,6 +71,15 @@ def file_complexity(
     complexity scores. Useful for analyzing individual files or integrating
     complexity analysis into custom tools.
 
+    Refactor plans are built the first time a function's `refactor_plans`
+    or `additional_refactor_plans` is read, so callers that never look at
+    them do not pay for them.
+
+    Files without a function definition or any keyword that adds complexity
+    (such as `__init__.py` re-exports or constants modules) are not parsed:
+    they are reported with no functions and a complexity of 0, and syntax
+    errors in them go unnoticed.
+
     Args:
         file_path: Path to the Python file to analyze. Can be relative or
                    absolute. The file must exist and be readable.
@@ -66,6 +87,10 @@ def file_complexity(
                       module-level (script) code as a '<module>' entry.
         no_ignore: If True, disregard all '# complexipy: ignore' and
                    '# noqa: complexipy' comments, analyzing every function.
+        score_only: If True, compute only each function's name, line range
+                    and complexity. Line complexities and refactor plans are
+                    left empty, which makes the analysis faster when only
+                    the scores are needed.
 
     Returns:
         FileComplexity object containing complete analysis results for the
@@ -97,4 +122,5 @@ def file_complexity(
         base_path.as_posix(),
         check_script,
         no_ignore,
+        score_only,
     )
@@ -12,10 +12,12 @@ from typing import (
     Tuple,
 )
 
+import click
 import typer
 from rich.console import (
     Console,
 )
+from typer.core import TyperGroup
 
 from complexipy import (
     _complexipy,
@@ -24,8 +26,13 @@ from complexipy._complexipy import FileComplexity
 from complexipy.types import (
     ColorTypes,
     ExitReport,
+    RunConfig,
+    Schedule,
     Sort,
 )
+from complexipy.utils.cache import (
+    prepare_cost_history,
+)
 from complexipy.utils.config import (
     _comma_separated_list,
     resolve_config,
@@ -43,6 +50,8 @@ from complexipy.utils.output import (
     handle_console_settings,
     handle_display,
     handle_results_storage,
+    has_success_functions,
+    output_summary,
     print_invalid_paths,
     resolve_output_formats,
 )
@@ -53,8 +62,51 @@ from complexipy.utils.snapshot import (
 from complexipy.utils.toml import (
     get_complexipy_toml_config,
 )
+from complexipy.utils.work_queue import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_POLL_INTERVAL,
+    create_queue,
+    default_worker_id,
+    queue_results,
+    queue_status,
+    run_worker,
+)
+
+
+class DefaultCommandGroup(TyperGroup):
+    """Run ``main`` unless a subcommand is named, so ``complexipy <paths>``
+    (and ``complexipy --help``) keep working next to ``complexipy merge`` and
+    ``complexipy queue``.
+
+    A first argument that names a subcommand always runs it. To analyze a
+    path called ``merge`` or ``queue``, spell it ``./merge`` or put ``--``
+    before the paths (``complexipy -- merge``)."""
+
+    default_command = "main"
 
-app = typer.Typer(name="complexipy")
+    def parse_args(self, ctx: click.Context, args: List[str]) -> List[str]:
+        group_options = {
+            option
+            for param in self.get_params(ctx)
+            for option in param.opts
+            if option not in ctx.help_option_names
+        }
+        if not args or (
+            args[0] not in self.commands and args[0] not in group_options
+        ):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+app = typer.Typer(name="complexipy", cls=DefaultCommandGroup)
+queue_app = typer.Typer(
+    help=(
+        "Share one analysis between worker processes, on one host or on "
+        "several hosts over a shared filesystem."
+    )
+)
+app.add_typer(queue_app, name="queue")
 INVOCATION_PATH = os.getcwd()
 TOML_CONFIG = get_complexipy_toml_config(INVOCATION_PATH)
 
@@ -69,7 +121,14 @@ def _version_callback(value: bool):
         raise typer.Exit()
 
 
-@app.command()
+@app.command(
+    epilog=(
+        "Run 'complexipy merge --help' to combine saved result files and "
+        "'complexipy queue --help' to share a run between worker processes. "
+        "To analyze a path named 'merge' or 'queue', pass it as './merge' "
+        "or after '--'."
+    )
+)
 def main(
     paths: Optional[List[str]] = typer.Argument(
         None,
@@ -201,6 +260,15 @@ def main(
             "Ignored when --plain is used."
         ),
     ),
+    score_only: Optional[bool] = typer.Option(
+        None,
+        "--score-only",
+        help=(
+            "Compute only function names, line ranges and complexities, "
+            "skipping line breakdowns and refactor plans. Used automatically "
+            "with --quiet or --plain unless --suggest-refactors is set."
+        ),
+    ),
     check_script: Optional[bool] = typer.Option(
         None,
         "--check-script",
@@ -219,6 +287,61 @@ def main(
         "--report-ignored",
         help="List every file:line where a '# complexipy: ignore' or '# noqa: complexipy' comment exists.",
     ),
+    jobs: Optional[int] = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        help=(
+            "Number of worker threads used to analyze files. "
+            "Defaults to the number of CPU cores."
+        ),
+    ),
+    plan_jobs: Optional[int] = typer.Option(
+        None,
+        "--plan-jobs",
+        help=(
+            "Maximum number of threads used to check and measure the "
+            "refactor plans of one function. Defaults to the number of "
+            "CPU cores."
+        ),
+    ),
+    path_queue_depth: Optional[int] = typer.Option(
+        None,
+        "--path-queue-depth",
+        help="Number of discovered paths buffered ahead of the reader threads.",
+    ),
+    read_queue_depth: Optional[int] = typer.Option(
+        None,
+        "--read-queue-depth",
+        help="Number of read files buffered ahead of the analysis workers.",
+    ),
+    schedule: Optional[Schedule] = typer.Option(
+        None,
+        "--schedule",
+        help=(
+            "Order in which files are analyzed: 'discovery' or "
+            "'largest-first' (estimated from file size and previous runs, "
+            "kept in .complexipy_cache). Default is 'discovery'."
+        ),
+    ),
+    stats: Optional[bool] = typer.Option(
+        None,
+        "--stats",
+        help=(
+            "Print how long each analysis stage spent stalled, and how many "
+            "files were skipped without parsing, to stderr."
+        ),
+    ),
+    shard: Optional[str] = typer.Option(
+        None,
+        "--shard",
+        metavar="INDEX/COUNT",
+        help=(
+            "Analyze only shard INDEX of COUNT (e.g. 2/8). Files are split "
+            "by a stable hash of their path, and default output filenames "
+            "are tagged with the shard."
+        ),
+    ),
     version: bool = typer.Option(
         False,
         "--version",
@@ -250,6 +373,14 @@ def main(
         check_script,
         no_ignore,
         report_ignored,
+        jobs,
+        path_queue_depth,
+        read_queue_depth,
+        stats,
+        schedule,
+        shard,
+        score_only,
+        plan_jobs,
     )
 
     console = handle_console_settings(cfg.color, cfg.quiet, cfg.plain)
@@ -265,6 +396,20 @@ def main(
         cfg.check_script,
         cfg.no_ignore,
         INVOCATION_PATH,
+        jobs=cfg.jobs,
+        path_queue_depth=cfg.path_queue_depth,
+        read_queue_depth=cfg.read_queue_depth,
+        stats=cfg.stats,
+        schedule=cfg.schedule.value,
+        cost_history=(
+            prepare_cost_history(INVOCATION_PATH)
+            if cfg.schedule is Schedule.largest_first
+            else None
+        ),
+        shard=cfg.shard,
+        score_only=cfg.score_only,
+        refactor_plans=cfg.suggest_refactors,
+        plan_jobs=cfg.plan_jobs,
     )
     files_complexities, failed_paths = result
     output_formats = resolve_output_formats(cfg.output_format)
@@ -288,6 +433,7 @@ def main(
         cfg.max_complexity_allowed,
         INVOCATION_PATH,
         cfg.suggest_refactors,
+        cfg.shard,
     )
 
     display_ok = handle_display(
@@ -364,5 +510,435 @@ def main(
         raise typer.Exit(code=1)
 
 
+@app.command()
+def merge(
+    inputs: List[str] = typer.Argument(
+        ...,
+        help=(
+            "Result files to combine: JSON reports written with "
+            "--output-format json, or snapshot files."
+        ),
+    ),
+    max_complexity_allowed: Optional[int] = typer.Option(
+        None,
+        "--max-complexity-allowed",
+        "-mx",
+        help="Max complexity allowed per function.",
+    ),
+    snapshot_create: Optional[bool] = typer.Option(
+        None,
+        "--snapshot-create",
+        "-spc",
+        help="Creates a snapshot of the merged results.",
+    ),
+    snapshot_ignore: Optional[bool] = typer.Option(
+        None,
+        "--snapshot-ignore",
+        "-spi",
+        help="Skip comparing against the existing snapshot file.",
+    ),
+    quiet: Optional[bool] = typer.Option(
+        None,
+        "--quiet",
+        "-q",
+        help="Suppress the output to the console.",
+    ),
+    ignore_complexity: Optional[bool] = typer.Option(
+        None,
+        "--ignore-complexity",
+        "-i",
+        help="Ignore the complexity and show all functions.",
+    ),
+    failed: Optional[bool] = typer.Option(
+        None,
+        "--failed",
+        "-f",
+        help="Show only functions that exceed the max complexity threshold.",
+    ),
+    color: Optional[ColorTypes] = typer.Option(
+        None,
+        "--color",
+        "-C",
+        help="Whether the output should be in color: either 'auto', 'yes' or 'no'. Default is 'auto'.",
+    ),
+    sort: Optional[Sort] = typer.Option(
+        None,
+        "--sort",
+        "-s",
+        help="Sort the output by complexity, it can be 'asc', 'desc' or 'name'. Default is 'asc'.",
+    ),
+    output: Optional[str] = typer.Option(
+        None,
+        "--output",
+        help=(
+            "Destination file or directory for machine-readable output. "
+            "Use a directory when emitting multiple formats."
+        ),
+    ),
+    output_format: Optional[List[str]] = typer.Option(
+        None,
+        "--output-format",
+        parser=_comma_separated_list,
+        help=(
+            "Output format to emit. Comma-separated or repeated flags: "
+            "csv, json, gitlab, sarif."
+        ),
+    ),
+    top: Optional[int] = typer.Option(
+        None,
+        "--top",
+        "-t",
+        help="Show only the N most complex functions, sorted by complexity descending.",
+    ),
+    plain: Optional[bool] = typer.Option(
+        None,
+        "--plain",
+        help="Use plain text output instead of rich formatting.",
+    ),
+    suggest_refactors: Optional[bool] = typer.Option(
+        None,
+        "--suggest-refactors",
+        help=(
+            "Keep the refactor plans stored in JSON reports and show them. "
+            "Ignored when --plain is used."
+        ),
+    ),
+):
+    """Combine result files from sharded or per-package runs and apply the
+    threshold, snapshot watermark and output formats to the merged set,
+    without re-analyzing any code."""
+    cfg = resolve_config(
+        TOML_CONFIG,
+        inputs,
+        max_complexity_allowed=max_complexity_allowed,
+        snapshot_create=snapshot_create,
+        snapshot_ignore=snapshot_ignore,
+        quiet=quiet,
+        ignore_complexity=ignore_complexity,
+        failed=failed,
+        color=color,
+        sort=sort,
+        output_format=output_format,
+        output=output,
+        top=top,
+        plain=plain,
+        suggest_refactors=suggest_refactors,
+    )
+    _report_result_files(cfg, cfg.paths)
+
+
+def _report_result_files(
+    cfg: RunConfig, inputs: List[str], failed_paths: Optional[List[str]] = None
+) -> None:
+    """Load saved result files and report them like an analysis run."""
+    console = handle_console_settings(cfg.color, cfg.quiet, cfg.plain)
+
+    # With --failed only functions above the threshold can be reported, so
+    # the loader drops the rest while streaming the inputs.
+    files_complexities, failed_inputs = _complexipy.load_result_files(
+        inputs,
+        keep_plans=cfg.suggest_refactors,
+        max_complexity=cfg.max_complexity_allowed if cfg.failed else None,
+    )
+    output_formats = resolve_output_formats(cfg.output_format)
+    output_snapshot_path = f"{INVOCATION_PATH}/complexipy-snapshot.json"
+
+    snap = evaluate_snapshot(
+        cfg.snapshot_create,
+        cfg.snapshot_ignore,
+        output_snapshot_path,
+        cfg.max_complexity_allowed,
+        files_complexities,
+    )
+
+    handle_results_storage(
+        console,
+        output_formats,
+        cfg.output,
+        files_complexities,
+        cfg.sort.value,
+        not cfg.failed,
+        cfg.max_complexity_allowed,
+        INVOCATION_PATH,
+        cfg.suggest_refactors,
+    )
+
+    if cfg.quiet:
+        display_ok = has_success_functions(
+            files_complexities,
+            cfg.max_complexity_allowed,
+            snap.active_snapshot_map,
+        )
+        snapshot_ok = snap.watermark_success if snap.should_run else True
+    else:
+        display_ok = output_summary(
+            console,
+            files_complexities,
+            cfg.failed,
+            Sort.desc if cfg.top is not None else cfg.sort,
+            cfg.ignore_complexity,
+            cfg.max_complexity_allowed,
+            None,
+            snap.active_snapshot_map,
+            cfg.plain,
+            cfg.top,
+            cfg.suggest_refactors,
+            INVOCATION_PATH,
+        )
+        snapshot_ok = handle_snapshot(console, snap, output_snapshot_path)
+    failed_inputs = [*(failed_paths or []), *failed_inputs]
+    _ = print_invalid_paths(console, cfg.quiet, failed_inputs)
+    report = ExitReport(
+        display_ok=display_ok,
+        snapshot_ok=snapshot_ok,
+        paths_ok=not failed_inputs,
+        diff_ok=True,
+        enforce_diff=False,
+    )
+    if not report.success:
+        raise typer.Exit(code=1)
+
+
+@queue_app.command("init")
+def queue_init(
+    queue: str = typer.Argument(..., help="Directory to create the queue in."),
+    paths: List[str] = typer.Argument(
+        ..., help="Paths to the directories or files to analyze."
+    ),
+    exclude: Optional[List[str]] = typer.Option(
+        None,
+        "--exclude",
+        "-e",
+        parser=_comma_separated_list,
+        help=(
+            "Paths to the directories or files to exclude. "
+            "Comma-separated or repeated flags."
+        ),
+    ),
+    check_script: Optional[bool] = typer.Option(
+        None,
+        "--check-script",
+        "-cs",
+        help="Report cognitive complexity of module-level (script) code as '<module>'.",
+    ),
+    no_ignore: Optional[bool] = typer.Option(
+        None,
+        "--no-ignore",
+        help="Disregard all '# complexipy: ignore' and '# noqa: complexipy' "
+        "comments.",
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE,
+        "--batch-size",
+        min=1,
+        help="Number of files a worker claims at a time.",
+    ),
+    suggest_refactors: Optional[bool] = typer.Option(
+        None,
+        "--suggest-refactors",
+        help=(
+            "Have the workers compute refactor plans, for "
+            "'complexipy queue assemble --suggest-refactors'."
+        ),
+    ),
+    quiet: Optional[bool] = typer.Option(
+        None,
+        "--quiet",
+        "-q",
+        help="Suppress the output to the console.",
+    ),
+):
+    """Discover the files to analyze and write them into a new queue."""
+    cfg = resolve_config(
+        TOML_CONFIG,
+        paths,
+        quiet=quiet,
+        exclude=exclude,
+        check_script=check_script,
+        no_ignore=no_ignore,
+        suggest_refactors=suggest_refactors,
+    )
+    console = handle_console_settings(cfg.color, cfg.quiet, cfg.plain)
+    files, failed_paths = _complexipy.discover_files(
+        cfg.paths, cfg.exclude, INVOCATION_PATH
+    )
+    try:
+        batches = create_queue(
+            queue,
+            files,
+            batch_size,
+            cfg.check_script,
+            cfg.no_ignore,
+            failed_paths,
+            cfg.suggest_refactors,
+        )
+    except FileExistsError as e:
+        raise typer.BadParameter(str(e), param_hint="'QUEUE'")
+    _ = print_invalid_paths(console, cfg.quiet, failed_paths)
+    if not cfg.quiet:
+        console.print(f"Queued {len(files)} files in {batches} batches.")
+
+
+@queue_app.command("work")
+def queue_work(
+    queue: str = typer.Argument(..., help="Queue directory to drain."),
+    lease: float = typer.Option(
+        DEFAULT_LEASE_SECONDS,
+        "--lease",
+        min=1,
+        help=(
+            "Seconds a claimed batch stays reserved without progress before "
+            "it is re-issued to another worker."
+        ),
+    ),
+    poll_interval: float = typer.Option(
+        DEFAULT_POLL_INTERVAL,
+        "--poll-interval",
+        min=0,
+        help="Seconds to wait between claims while other workers hold batches.",
+    ),
+    quiet: Optional[bool] = typer.Option(
+        None,
+        "--quiet",
+        "-q",
+        help="Suppress the output to the console.",
+    ),
+):
+    """Claim and analyze batches until every batch in the queue is done.
+    Start as many workers as needed; they can run on any host that sees the
+    queue directory and the analyzed files at the same paths."""
+    console = Console(quiet=bool(quiet))
+    worker_id = default_worker_id()
+    try:
+        completed = run_worker(queue, worker_id, lease, poll_interval)
+    except FileNotFoundError as e:
+        raise typer.BadParameter(str(e), param_hint="'QUEUE'")
+    console.print(f"Worker {worker_id} completed {completed} batches.")
+
+
+@queue_app.command("assemble")
+def queue_assemble(
+    queue: str = typer.Argument(..., help="Queue directory to report on."),
+    max_complexity_allowed: Optional[int] = typer.Option(
+        None,
+        "--max-complexity-allowed",
+        "-mx",
+        help="Max complexity allowed per function.",
+    ),
+    snapshot_create: Optional[bool] = typer.Option(
+        None,
+        "--snapshot-create",
+        "-spc",
+        help="Creates a snapshot of the assembled results.",
+    ),
+    snapshot_ignore: Optional[bool] = typer.Option(
+        None,
+        "--snapshot-ignore",
+        "-spi",
+        help="Skip comparing against the existing snapshot file.",
+    ),
+    quiet: Optional[bool] = typer.Option(
+        None,
+        "--quiet",
+        "-q",
+        help="Suppress the output to the console.",
+    ),
+    ignore_complexity: Optional[bool] = typer.Option(
+        None,
+        "--ignore-complexity",
+        "-i",
+        help="Ignore the complexity and show all functions.",
+    ),
+    failed: Optional[bool] = typer.Option(
+        None,
+        "--failed",
+        "-f",
+        help="Show only functions that exceed the max complexity threshold.",
+    ),
+    color: Optional[ColorTypes] = typer.Option(
+        None,
+        "--color",
+        "-C",
+        help="Whether the output should be in color: either 'auto', 'yes' or 'no'. Default is 'auto'.",
+    ),
+    sort: Optional[Sort] = typer.Option(
+        None,
+        "--sort",
+        "-s",
+        help="Sort the output by complexity, it can be 'asc', 'desc' or 'name'. Default is 'asc'.",
+    ),
+    output: Optional[str] = typer.Option(
+        None,
+        "--output",
+        help=(
+            "Destination file or directory for machine-readable output. "
+            "Use a directory when emitting multiple formats."
+        ),
+    ),
+    output_format: Optional[List[str]] = typer.Option(
+        None,
+        "--output-format",
+        parser=_comma_separated_list,
+        help=(
+            "Output format to emit. Comma-separated or repeated flags: "
+            "csv, json, gitlab, sarif."
+        ),
+    ),
+    top: Optional[int] = typer.Option(
+        None,
+        "--top",
+        "-t",
+        help="Show only the N most complex functions, sorted by complexity descending.",
+    ),
+    plain: Optional[bool] = typer.Option(
+        None,
+        "--plain",
+        help="Use plain text output instead of rich formatting.",
+    ),
+    suggest_refactors: Optional[bool] = typer.Option(
+        None,
+        "--suggest-refactors",
+        help=(
+            "Show the refactor plans computed by the workers; the queue "
+            "must have been created with --suggest-refactors. "
+            "Ignored when --plain is used."
+        ),
+    ),
+):
+    """Report the results of a drained queue, applying the threshold,
+    snapshot watermark and output formats like 'complexipy merge'."""
+    cfg = resolve_config(
+        TOML_CONFIG,
+        [queue],
+        max_complexity_allowed=max_complexity_allowed,
+        snapshot_create=snapshot_create,
+        snapshot_ignore=snapshot_ignore,
+        quiet=quiet,
+        ignore_complexity=ignore_complexity,
+        failed=failed,
+        color=color,
+        sort=sort,
+        output_format=output_format,
+        output=output,
+        top=top,
+        plain=plain,
+        suggest_refactors=suggest_refactors,
+    )
+    console = handle_console_settings(cfg.color, cfg.quiet, cfg.plain)
+    try:
+        status = queue_status(queue)
+    except FileNotFoundError as e:
+        raise typer.BadParameter(str(e), param_hint="'QUEUE'")
+    if not status.finished:
+        console.print(
+            f"[bold red]error[/bold red]: {status.pending + status.claimed} "
+            f"of {status.total} batches "
+            "are not finished; run 'complexipy queue work' first."
+        )
+        raise typer.Exit(code=1)
+    reports, failed_paths = queue_results(queue)
+    _report_result_files(cfg, reports, failed_paths)
+
+
 if __name__ == "__main__":
     app()
@@ -1,7 +1,7 @@
 import sys
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, MutableMapping, Optional, TypeVar, Union
+from typing import List, MutableMapping, Optional, Tuple, TypeVar, Union
 
 if sys.version_info >= (3, 10):
     from typing import TypeAlias
@@ -21,6 +21,11 @@ class Sort(str, Enum):
     file_name = "file_name"
 
 
+class Schedule(str, Enum):
+    discovery = "discovery"
+    largest_first = "largest-first"
+
+
 class OutputFormat(str, Enum):
     csv = "csv"
     json = "json"
@@ -38,6 +43,7 @@ TOMLTypes = TypeVar(
     List[str],
     ColorTypes,
     OutputFormat,
+    Schedule,
     Sort,
     TOMLDiffSection,
 )
@@ -70,6 +76,14 @@ class RunConfig:
     diff: Optional[str]
     diff_only: Optional[str]
     staged: bool
+    jobs: Optional[int] = None
+    path_queue_depth: Optional[int] = None
+    read_queue_depth: Optional[int] = None
+    stats: bool = False
+    schedule: Schedule = Schedule.discovery
+    shard: Optional[Tuple[int, int]] = None
+    score_only: bool = False
+    plan_jobs: Optional[int] = None
 
 
 @dataclass
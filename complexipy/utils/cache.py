@@ -17,6 +17,7 @@ from complexipy._complexipy import FileComplexity
 CACHE_DIR_NAME = ".complexipy_cache"
 CACHE_VALUES_DIR = "v/cache"
 FUNCTIONS_CACHE_KEY = "functions"
+COSTS_CACHE_KEY = "costs"
 MAX_CACHE_ENTRIES = 64
 CACHEDIR_TAG_CONTENT = """Signature: 8a477f597d28d172789f06886806bc55
 # This file is a cache directory tag created by complexipy.
@@ -26,7 +27,8 @@ CACHEDIR_TAG_CONTENT = """Signature: 8a477f597d28d172789f06886806bc55
 README_CONTENT = """# complexipy cache directory #
 
 This directory contains data from complexipy's cache, which stores previous
-complexity results so future runs can compare per-function complexity changes.
+complexity results so future runs can compare per-function complexity changes,
+and per-file analysis times used to schedule the largest files first.
 
 **Do not** commit this to version control.
 """
@@ -69,6 +71,23 @@ def remember_previous_functions(
     return previous_map
 
 
+def prepare_cost_history(invocation_path: str) -> Optional[str]:
+    """Return the path of the per-file analysis cost history.
+
+    The Rust runner reads it to schedule expensive files first and rewrites
+    it with the times measured during the run. Returns ``None`` when the cache
+    directory cannot be created.
+    """
+    cache_dir = Path(invocation_path) / CACHE_DIR_NAME
+    cost_file = _cache_value_path(cache_dir, COSTS_CACHE_KEY)
+    try:
+        _ensure_cache_dir_and_supporting_files(cache_dir)
+        cost_file.parent.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return str(cost_file)
+
+
 def _build_cache_key(invocation_path: str, targets: List[str]) -> Optional[str]:
     normalized_targets = _normalize_targets(invocation_path, targets)
     if not normalized_targets:
@@ -105,7 +124,7 @@ def _normalize_target(invocation_path: str, target: str) -> str:
 
 
 def _looks_like_remote(target: str) -> bool:
-    return bool(
+    return target.startswith("file://") or bool(
         re.match(r"^(https://|http://|www\.|git@)(github|gitlab)\.com", target)
     )
 
@@ -12,6 +12,7 @@ import typer
 from complexipy.types import (
     ColorTypes,
     RunConfig,
+    Schedule,
     Sort,
     TOMLConfig,
     TOMLDiffSection,
@@ -43,26 +44,34 @@ def _flatten_lists(value: Optional[list]) -> List[str]:
 def resolve_config(
     toml_config: Optional[TOMLConfig],
     paths: Optional[List[str]],
-    max_complexity_allowed: Optional[int],
-    snapshot_create: Optional[bool],
-    snapshot_ignore: Optional[bool],
-    quiet: Optional[bool],
-    ignore_complexity: Optional[bool],
-    failed: Optional[bool],
-    color: Optional[ColorTypes],
-    sort: Optional[Sort],
-    output_format: Optional[List[str]],
-    output: Optional[str],
-    diff: Optional[str],
-    diff_only: Optional[str],
-    staged: Optional[bool],
-    top: Optional[int],
-    plain: Optional[bool],
-    suggest_refactors: Optional[bool],
-    exclude: Optional[List[str]],
-    check_script: Optional[bool],
-    no_ignore: Optional[bool],
-    report_ignored: Optional[bool],
+    max_complexity_allowed: Optional[int] = None,
+    snapshot_create: Optional[bool] = None,
+    snapshot_ignore: Optional[bool] = None,
+    quiet: Optional[bool] = None,
+    ignore_complexity: Optional[bool] = None,
+    failed: Optional[bool] = None,
+    color: Optional[ColorTypes] = None,
+    sort: Optional[Sort] = None,
+    output_format: Optional[List[str]] = None,
+    output: Optional[str] = None,
+    diff: Optional[str] = None,
+    diff_only: Optional[str] = None,
+    staged: Optional[bool] = None,
+    top: Optional[int] = None,
+    plain: Optional[bool] = None,
+    suggest_refactors: Optional[bool] = None,
+    exclude: Optional[List[str]] = None,
+    check_script: Optional[bool] = None,
+    no_ignore: Optional[bool] = None,
+    report_ignored: Optional[bool] = None,
+    jobs: Optional[int] = None,
+    path_queue_depth: Optional[int] = None,
+    read_queue_depth: Optional[int] = None,
+    stats: Optional[bool] = None,
+    schedule: Optional[Schedule] = None,
+    shard: Optional[str] = None,
+    score_only: Optional[bool] = None,
+    plan_jobs: Optional[int] = None,
 ) -> RunConfig:
     cli_args = {
         "paths": paths,
@@ -80,6 +89,13 @@ def resolve_config(
         "check_script": check_script,
         "no_ignore": no_ignore,
         "report_ignored": report_ignored,
+        "jobs": jobs,
+        "path_queue_depth": path_queue_depth,
+        "read_queue_depth": read_queue_depth,
+        "stats": stats,
+        "schedule": schedule,
+        "score_only": score_only,
+        "plan_jobs": plan_jobs,
     }
 
     resolved = get_arguments_value(toml_config, cli_args)
@@ -99,12 +115,20 @@ def resolve_config(
     check_script = resolved["check_script"]
     no_ignore = resolved["no_ignore"]
     report_ignored = resolved["report_ignored"]
+    jobs = resolved["jobs"]
+    path_queue_depth = resolved["path_queue_depth"]
+    read_queue_depth = resolved["read_queue_depth"]
+    stats = resolved["stats"]
+    schedule = resolved["schedule"]
+    score_only = resolved["score_only"]
+    plan_jobs = resolved["plan_jobs"]
 
     exclude = _flatten_lists(exclude)
     output_format = _flatten_lists(output_format)
 
     no_ignore = bool(no_ignore)
     report_ignored = bool(report_ignored)
+    stats = bool(stats)
     cli_staged = staged
     staged = bool(staged)
 
@@ -123,6 +147,18 @@ def resolve_config(
     plain, suggest_refactors = validate_cli_arguments(
         plain, suggest_refactors, top, quiet
     )
+    score_only = resolve_score_only(score_only, quiet, plain, suggest_refactors)
+
+    for flag, value in (
+        ("--jobs", jobs),
+        ("--path-queue-depth", path_queue_depth),
+        ("--read-queue-depth", read_queue_depth),
+        ("--plan-jobs", plan_jobs),
+    ):
+        if value is not None and value < 1:
+            raise typer.BadParameter(f"{flag} must be a positive integer.")
+
+    parsed_shard = parse_shard(shard) if shard is not None else None
 
     return RunConfig(
         paths=paths,
@@ -146,9 +182,28 @@ def resolve_config(
         diff=diff,
         diff_only=diff_only,
         staged=staged,
+        jobs=jobs,
+        path_queue_depth=path_queue_depth,
+        read_queue_depth=read_queue_depth,
+        stats=stats,
+        schedule=schedule,
+        shard=parsed_shard,
+        score_only=score_only,
+        plan_jobs=plan_jobs,
     )
 
 
+def parse_shard(value: str) -> Tuple[int, int]:
+    index, separator, count = value.strip().partition("/")
+    if not separator or not index.isdigit() or not count.isdigit():
+        raise typer.BadParameter("--shard must be INDEX/COUNT, e.g. 2/8.")
+
+    shard = (int(index), int(count))
+    if not 1 <= shard[0] <= shard[1]:
+        raise typer.BadParameter("--shard INDEX must be between 1 and COUNT.")
+    return shard
+
+
 def validate_cli_arguments(
     plain: Optional[bool],
     suggest_refactors: Optional[bool],
@@ -167,3 +222,18 @@ def validate_cli_arguments(
         raise typer.BadParameter("--top must be a positive integer.")
 
     return plain, suggest_refactors
+
+
+def resolve_score_only(
+    score_only: bool,
+    quiet: bool,
+    plain: bool,
+    suggest_refactors: bool,
+) -> bool:
+    if score_only and suggest_refactors:
+        raise typer.BadParameter(
+            "--score-only and --suggest-refactors cannot be used together."
+        )
+
+    # Quiet and plain runs only report scores unless plans were requested.
+    return score_only or ((quiet or plain) and not suggest_refactors)
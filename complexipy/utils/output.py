@@ -111,8 +111,11 @@ def handle_results_storage(
     max_complexity: int,
     invocation_path: str,
     suggest_refactors: bool = False,
+    shard: Optional[Tuple[int, int]] = None,
 ) -> None:
-    output_paths = resolve_output_paths(output_formats, output, invocation_path)
+    output_paths = resolve_output_paths(
+        output_formats, output, invocation_path, shard
+    )
 
     for output_format in output_formats:
         output_path = output_paths[output_format]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import typer
 
@@ -13,12 +13,13 @@ def resolve_output_paths(
     output_formats: List[OutputFormat],
     output: Optional[str],
     invocation_path: str,
+    shard: Optional[Tuple[int, int]] = None,
 ) -> Dict[OutputFormat, str]:
     if not output_formats:
         return {}
 
     if output is None:
-        return build_output_paths(invocation_path, output_formats)
+        return build_output_paths(invocation_path, output_formats, shard)
 
     if output == "-":
         raise typer.BadParameter(
@@ -30,12 +31,12 @@ def resolve_output_paths(
 
     if len(output_formats) > 1:
         ensure_directory_destination(destination, is_directory_hint)
-        return build_output_paths(destination, output_formats)
+        return build_output_paths(destination, output_formats, shard)
 
     output_format = output_formats[0]
     if os.path.isdir(destination) or is_directory_hint:
         os.makedirs(destination, exist_ok=True)
-        return build_output_paths(destination, [output_format])
+        return build_output_paths(destination, [output_format], shard)
 
     parent_dir = os.path.dirname(destination)
     if parent_dir:
@@ -45,17 +46,32 @@ def resolve_output_paths(
 
 
 def build_output_paths(
-    destination: str, output_formats: List[OutputFormat]
+    destination: str,
+    output_formats: List[OutputFormat],
+    shard: Optional[Tuple[int, int]] = None,
 ) -> Dict[OutputFormat, str]:
     return {
         output_format: os.path.join(
             destination,
-            DEFAULT_OUTPUT_FILENAMES[output_format],
+            shard_output_filename(
+                DEFAULT_OUTPUT_FILENAMES[output_format], shard
+            ),
         )
         for output_format in output_formats
     }
 
 
+def shard_output_filename(
+    filename: str, shard: Optional[Tuple[int, int]]
+) -> str:
+    """Tag a default output filename with its shard, e.g.
+    ``complexipy-results.shard-2-of-8.json``."""
+    if shard is None:
+        return filename
+    stem, dot, extension = filename.partition(".")
+    return f"{stem}.shard-{shard[0]}-of-{shard[1]}{dot}{extension}"
+
+
 def is_directory_output_hint(output: str) -> bool:
     return output.endswith(os.sep) or (
         os.altsep is not None and output.endswith(os.altsep)
@@ -21,6 +21,7 @@ from typer import Exit
 from complexipy.types import (
     ColorTypes,
     OutputFormat,
+    Schedule,
     Sort,
     TOMLBase,
     TOMLConfig,
@@ -34,6 +35,8 @@ if sys.version_info >= (3, 11):
 else:
     import tomli as toml_library
 
+_ENUM_KEYS = {"color": ColorTypes, "sort": Sort, "schedule": Schedule}
+
 
 @overload
 def load_values_from_toml_key(
@@ -44,6 +47,10 @@ def load_values_from_toml_key(
     key: Literal["sort"], value: str | Sort
 ) -> Sort: ...
 @overload
+def load_values_from_toml_key(
+    key: Literal["schedule"], value: str | Schedule
+) -> Schedule: ...
+@overload
 def load_values_from_toml_key(
     key: Literal["paths", "exclude", "output-format"],
     value: str | List[str],
@@ -56,6 +63,7 @@ def load_values_from_toml_key(
     | str
     | List[str]
     | Sort
+    | Schedule
     | ColorTypes
     | OutputFormat
     | TOMLType
@@ -68,6 +76,7 @@ def load_values_from_toml_key(
     | ColorTypes
     | OutputFormat
     | Sort
+    | Schedule
     | TOMLType
     | TOMLDiffSection
 ): ...
@@ -80,6 +89,7 @@ def load_values_from_toml_key(
     | str
     | List[str]
     | Sort
+    | Schedule
     | ColorTypes
     | OutputFormat
     | TOMLType
@@ -87,20 +97,14 @@ def load_values_from_toml_key(
 ):
     """Normalize TOML values to expected runtime types.
 
-    - Convert `sort` string values to their Enum variants.
+    - Convert `color`, `sort` and `schedule` string values to their Enum
+      variants.
     - Ensure `paths` and `exclude` are lists when provided as strings.
     """
-    if key == "color":
-        if isinstance(value, ColorTypes):
-            return value
-        elif isinstance(value, str):
-            return ColorTypes(value)
-        return value
-    elif key == "sort":
-        if isinstance(value, Sort):
-            return value
-        elif isinstance(value, str):
-            return Sort(value)
+    if key in _ENUM_KEYS:
+        enum = _ENUM_KEYS[key]
+        if isinstance(value, str) and not isinstance(value, enum):
+            return enum(value)
         return value
     elif key in ("paths", "exclude", "output-format"):
         if isinstance(value, str):
@@ -211,6 +215,8 @@ BOOLEAN_FIELDS: List[Tuple[str, str, bool]] = [
     ("check_script", "check-script", False),
     ("no_ignore", "no-ignore", False),
     ("report_ignored", "report-ignored", False),
+    ("stats", "stats", False),
+    ("score_only", "score-only", False),
 ]
 
 
@@ -256,6 +262,16 @@ def get_arguments_value(
         get_argument_value(toml_config, "sort", cli_args.get("sort"), Sort.asc),
     )
 
+    result["schedule"] = cast(
+        Schedule,
+        get_argument_value(
+            toml_config,
+            "schedule",
+            cli_args.get("schedule"),
+            Schedule.discovery,
+        ),
+    )
+
     output_format = cli_args.get("output_format")
     if output_format is None:
         if toml_config is None:
@@ -279,4 +295,15 @@ def get_arguments_value(
         toml_config, "exclude", cli_args.get("exclude"), []
     )
 
+    for field_name, toml_key in (
+        ("jobs", "jobs"),
+        ("path_queue_depth", "path-queue-depth"),
+        ("read_queue_depth", "read-queue-depth"),
+        ("plan_jobs", "plan-jobs"),
+    ):
+        value = cli_args.get(field_name)
+        if value is None and toml_config is not None:
+            value = cast(Optional[int], toml_config.get(toml_key))
+        result[field_name] = value
+
     return result
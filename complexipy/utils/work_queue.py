@@ -0,0 +1,398 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    List,  # It's important to use this to make it compatible with python 3.8, don't remove it
+    Optional,
+    Tuple,
+)
+
+from complexipy._complexipy import FileComplexity, file_complexity
+from complexipy.utils.json import store_json
+
+QUEUE_DB_NAME = "queue.sqlite3"
+RESULTS_DIR_NAME = "results"
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_POLL_INTERVAL = 1.0
+# A batch claimed this many times without being finished keeps killing its
+# workers, so its files are reported as failed instead of re-issued again.
+MAX_ATTEMPTS = 3
+# Long enough to ride out another process holding the write lock while it
+# claims or completes a batch.
+LOCK_TIMEOUT_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE batches (
+    id INTEGER PRIMARY KEY,
+    files TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE failures (
+    batch_id INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class Batch:
+    id: int
+    files: List[Tuple[str, str]]
+
+
+@dataclass
+class QueueStatus:
+    pending: int
+    claimed: int
+    done: int
+    failed: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.pending == 0 and self.claimed == 0
+
+    @property
+    def total(self) -> int:
+        return self.pending + self.claimed + self.done + self.failed
+
+
+def create_queue(
+    queue_dir: str,
+    files: List[Tuple[str, str]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    check_script: bool = False,
+    no_ignore: bool = False,
+    failed_paths: Optional[List[str]] = None,
+    suggest_refactors: bool = False,
+) -> int:
+    """Write the discovered ``(file_path, base_path)`` pairs into a new queue.
+
+    The queue is a directory holding a SQLite store of file batches and the
+    JSON report of every finished batch. ``failed_paths`` (paths that could
+    not be discovered) are reported again when the queue is assembled.
+    Workers only build refactor plans when ``suggest_refactors`` is set.
+    Returns the number of batches. Raises ``FileExistsError`` if
+    ``queue_dir`` already holds a queue.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    root = Path(queue_dir)
+    db_path = root / QUEUE_DB_NAME
+    if db_path.exists():
+        raise FileExistsError(f"{db_path} already exists")
+    (root / RESULTS_DIR_NAME).mkdir(parents=True, exist_ok=True)
+
+    batches = [
+        files[start : start + batch_size]
+        for start in range(0, len(files), batch_size)
+    ]
+    conn = _connect(root, create=True)
+    try:
+        conn.executescript(_SCHEMA)
+        with _transaction(conn):
+            conn.executemany(
+                "INSERT INTO settings (key, value) VALUES (?, ?)",
+                [
+                    ("check_script", json.dumps(check_script)),
+                    ("no_ignore", json.dumps(no_ignore)),
+                    ("suggest_refactors", json.dumps(suggest_refactors)),
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO batches (files) VALUES (?)",
+                [(json.dumps(batch),) for batch in batches],
+            )
+            # Batch ids start at 1, so 0 holds the discovery failures.
+            conn.executemany(
+                "INSERT INTO failures (batch_id, path) VALUES (0, ?)",
+                [(path,) for path in failed_paths or []],
+            )
+    finally:
+        conn.close()
+    return len(batches)
+
+
+def claim_batch(
+    queue_dir: str,
+    owner: str,
+    lease_seconds: float,
+    max_attempts: int = MAX_ATTEMPTS,
+) -> Optional[Batch]:
+    """Lease the next pending batch to ``owner``.
+
+    A batch whose lease expired (its worker died or stalled) is pending
+    again, so it is re-issued to the next worker that asks, unless it was
+    already claimed ``max_attempts`` times: its files are then recorded as
+    failed and the batch is not handed out again. Returns ``None`` when
+    nothing can be claimed right now.
+    """
+    conn = _connect(Path(queue_dir))
+    try:
+        with _transaction(conn):
+            now = time.time()
+            while True:
+                row = conn.execute(
+                    "SELECT id, files, attempts FROM batches "
+                    "WHERE state = 'pending' "
+                    "OR (state = 'claimed' AND lease_expires < ?) "
+                    "ORDER BY id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[2] < max_attempts:
+                    break
+                _fail_batch(conn, row[0], json.loads(row[1]))
+            conn.execute(
+                "UPDATE batches SET state = 'claimed', owner = ?, "
+                "lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (owner, now + lease_seconds, row[0]),
+            )
+    finally:
+        conn.close()
+    files = [(file, base) for file, base in json.loads(row[1])]
+    return Batch(id=row[0], files=files)
+
+
+def renew_lease(
+    queue_dir: str, batch_id: int, owner: str, lease_seconds: float
+) -> bool:
+    """Extend ``owner``'s lease; ``False`` if the batch was re-issued."""
+    conn = _connect(Path(queue_dir))
+    try:
+        with _transaction(conn):
+            updated = conn.execute(
+                "UPDATE batches SET lease_expires = ? "
+                "WHERE id = ? AND owner = ? AND state = 'claimed'",
+                (time.time() + lease_seconds, batch_id, owner),
+            ).rowcount
+    finally:
+        conn.close()
+    return updated == 1
+
+
+def complete_batch(
+    queue_dir: str,
+    batch_id: int,
+    owner: str,
+    files_complexities: List[FileComplexity],
+    failed_paths: List[str],
+    suggest_refactors: bool = False,
+) -> bool:
+    """Store the results of a batch and mark it done.
+
+    The report is written under a temporary name and renamed into place, so
+    a batch that was re-issued and finished twice leaves one complete
+    report. Returns ``False`` if another worker already finished it or the
+    batch was given up as failed.
+    """
+    root = Path(queue_dir)
+    report_path = _report_path(root, batch_id)
+    tmp_path = report_path.with_name(f"{report_path.name}.{_safe(owner)}.tmp")
+    store_json(
+        str(tmp_path),
+        files_complexities,
+        show_details=True,
+        max_complexity=0,
+        suggest_refactors=suggest_refactors,
+    )
+    conn = _connect(root)
+    try:
+        with _transaction(conn):
+            state = conn.execute(
+                "SELECT state FROM batches WHERE id = ?", (batch_id,)
+            ).fetchone()
+            if state is None or state[0] != "claimed":
+                os.remove(tmp_path)
+                return False
+            os.replace(tmp_path, report_path)
+            conn.execute("DELETE FROM failures WHERE batch_id = ?", (batch_id,))
+            conn.executemany(
+                "INSERT INTO failures (batch_id, path) VALUES (?, ?)",
+                [(batch_id, path) for path in failed_paths],
+            )
+            conn.execute(
+                "UPDATE batches SET state = 'done', owner = ? WHERE id = ?",
+                (owner, batch_id),
+            )
+    finally:
+        conn.close()
+    return True
+
+
+def run_worker(
+    queue_dir: str,
+    owner: Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+) -> int:
+    """Claim and analyze batches until every batch in the queue is done.
+
+    While other workers still hold leases, the worker waits for them to
+    finish or expire instead of exiting, so batches of a dead worker are
+    always picked up. Returns the number of batches this worker completed.
+    """
+    owner = owner or default_worker_id()
+    check_script, no_ignore, suggest_refactors = _load_settings(queue_dir)
+    completed = 0
+    while True:
+        batch = claim_batch(queue_dir, owner, lease_seconds)
+        if batch is None:
+            if queue_status(queue_dir).finished:
+                return completed
+            time.sleep(poll_interval)
+            continue
+        files_complexities, failed_paths, kept = _analyze_batch(
+            queue_dir, batch, owner, lease_seconds, check_script, no_ignore
+        )
+        if kept and complete_batch(
+            queue_dir,
+            batch.id,
+            owner,
+            files_complexities,
+            failed_paths,
+            suggest_refactors,
+        ):
+            completed += 1
+
+
+def queue_status(queue_dir: str) -> QueueStatus:
+    conn = _connect(Path(queue_dir))
+    try:
+        counts = dict(
+            conn.execute(
+                "SELECT state, COUNT(*) FROM batches GROUP BY state"
+            ).fetchall()
+        )
+    finally:
+        conn.close()
+    return QueueStatus(
+        pending=counts.get("pending", 0),
+        claimed=counts.get("claimed", 0),
+        done=counts.get("done", 0),
+        failed=counts.get("failed", 0),
+    )
+
+
+def queue_results(queue_dir: str) -> Tuple[List[str], List[str]]:
+    """Return the report of every finished batch and the failed files."""
+    root = Path(queue_dir)
+    conn = _connect(root)
+    try:
+        batch_ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM batches WHERE state = 'done' ORDER BY id"
+            )
+        ]
+        failed_paths = [
+            row[0]
+            for row in conn.execute("SELECT path FROM failures ORDER BY path")
+        ]
+    finally:
+        conn.close()
+    return [str(_report_path(root, i)) for i in batch_ids], failed_paths
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _analyze_batch(
+    queue_dir: str,
+    batch: Batch,
+    owner: str,
+    lease_seconds: float,
+    check_script: bool,
+    no_ignore: bool,
+) -> Tuple[List[FileComplexity], List[str], bool]:
+    files_complexities = []
+    failed_paths = []
+    for file_path, base_path in batch.files:
+        try:
+            files_complexities.append(
+                file_complexity(file_path, base_path, check_script, no_ignore)
+            )
+        except (OSError, ValueError):
+            failed_paths.append(file_path)
+        # Renewing after each file keeps the lease short enough to notice a
+        # dead worker quickly, however large the batch.
+        if not renew_lease(queue_dir, batch.id, owner, lease_seconds):
+            return [], [], False
+    return files_complexities, failed_paths, True
+
+
+def _fail_batch(
+    conn: sqlite3.Connection, batch_id: int, files: List[List[str]]
+) -> None:
+    conn.execute(
+        "UPDATE batches SET state = 'failed', owner = NULL WHERE id = ?",
+        (batch_id,),
+    )
+    conn.execute("DELETE FROM failures WHERE batch_id = ?", (batch_id,))
+    conn.executemany(
+        "INSERT INTO failures (batch_id, path) VALUES (?, ?)",
+        [(batch_id, file) for file, _ in files],
+    )
+
+
+def _load_settings(queue_dir: str) -> Tuple[bool, bool, bool]:
+    conn = _connect(Path(queue_dir))
+    try:
+        settings = {
+            key: json.loads(value)
+            for key, value in conn.execute("SELECT key, value FROM settings")
+        }
+    finally:
+        conn.close()
+    return (
+        settings["check_script"],
+        settings["no_ignore"],
+        settings["suggest_refactors"],
+    )
+
+
+def _connect(root: Path, create: bool = False) -> sqlite3.Connection:
+    db_path = root / QUEUE_DB_NAME
+    if not create and not db_path.is_file():
+        raise FileNotFoundError(f"{root} is not a complexipy queue")
+    # Transactions are opened explicitly so claims take the write lock up
+    # front; the default rollback journal also works over network
+    # filesystems, where WAL does not.
+    return sqlite3.connect(
+        str(db_path), timeout=LOCK_TIMEOUT_SECONDS, isolation_level=None
+    )
+
+
+class _transaction:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _report_path(root: Path, batch_id: int) -> Path:
+    return root / RESULTS_DIR_NAME / f"batch-{batch_id:06d}.json"
+
+
+def _safe(owner: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in owner)
@@ -1,5 +1,9 @@
 #[cfg(feature = "python")]
+use crate::refactor_plans::DeferredPlans;
+#[cfg(feature = "python")]
 use pyo3::prelude::*;
+#[cfg(feature = "python")]
+use std::sync::Arc;
 
 #[cfg(any(feature = "python", feature = "wasm"))]
 use serde::{Deserialize, Serialize};
@@ -18,6 +22,139 @@ pub struct LineComplexity {
     pub complexity: u64,
 }
 
+/// The complexity the walk recorded for each line of a function, in walk
+/// order and including the lines that add nothing, packed as
+/// `[line, complexity]` `u32` pairs.
+///
+/// Python sees a read-only sequence of [`LineComplexity`] whose pairs are
+/// also exposed through the buffer protocol, so `memoryview(lines).cast("I")`
+/// reads them without creating an object per line.
+#[cfg_attr(
+    feature = "python",
+    pyclass(module = "complexipy", frozen, sequence, from_py_object)
+)]
+#[cfg_attr(
+    any(feature = "python", feature = "wasm"),
+    derive(Serialize, Deserialize),
+    serde(from = "Vec<LineComplexity>", into = "Vec<LineComplexity>")
+)]
+#[derive(Clone, Default, PartialEq, Eq, Debug)]
+pub struct LineComplexities {
+    pairs: Vec<[u32; 2]>,
+}
+
+impl LineComplexities {
+    pub fn len(&self) -> usize {
+        self.pairs.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.pairs.is_empty()
+    }
+
+    pub fn get(&self, index: usize) -> Option<LineComplexity> {
+        self.pairs.get(index).map(|&pair| unpack(pair))
+    }
+
+    pub fn iter(&self) -> impl ExactSizeIterator<Item = LineComplexity> + '_ {
+        self.pairs.iter().map(|&pair| unpack(pair))
+    }
+}
+
+fn unpack([line, complexity]: [u32; 2]) -> LineComplexity {
+    LineComplexity {
+        line: u64::from(line),
+        complexity: u64::from(complexity),
+    }
+}
+
+/// Packs the entries as they come, saturating lines and complexities that do
+/// not fit in a `u32`.
+impl FromIterator<LineComplexity> for LineComplexities {
+    fn from_iter<I: IntoIterator<Item = LineComplexity>>(entries: I) -> Self {
+        let saturate = |value: u64| u32::try_from(value).unwrap_or(u32::MAX);
+        let mut pairs: Vec<[u32; 2]> = entries
+            .into_iter()
+            .map(|entry| [saturate(entry.line), saturate(entry.complexity)])
+            .collect();
+        pairs.shrink_to_fit();
+        LineComplexities { pairs }
+    }
+}
+
+impl From<Vec<LineComplexity>> for LineComplexities {
+    fn from(entries: Vec<LineComplexity>) -> Self {
+        entries.into_iter().collect()
+    }
+}
+
+impl From<LineComplexities> for Vec<LineComplexity> {
+    fn from(lines: LineComplexities) -> Self {
+        lines.iter().collect()
+    }
+}
+
+#[cfg(feature = "python")]
+#[pymethods]
+impl LineComplexities {
+    #[new]
+    #[pyo3(signature = (entries=Vec::new()))]
+    fn new(entries: Vec<LineComplexity>) -> Self {
+        entries.into()
+    }
+
+    fn __len__(&self) -> usize {
+        self.len()
+    }
+
+    fn __getitem__(&self, index: isize) -> PyResult<LineComplexity> {
+        let position = if index < 0 {
+            index + self.len() as isize
+        } else {
+            index
+        };
+        usize::try_from(position)
+            .ok()
+            .and_then(|position| self.get(position))
+            .ok_or_else(|| {
+                pyo3::exceptions::PyIndexError::new_err("line complexity index out of range")
+            })
+    }
+
+    fn __repr__(&self) -> String {
+        let pairs: Vec<String> = self
+            .pairs
+            .iter()
+            .map(|[line, complexity]| format!("({line}, {complexity})"))
+            .collect();
+        format!("LineComplexities([{}])", pairs.join(", "))
+    }
+
+    /// Expose the packed pairs as a read-only byte buffer. The class is
+    /// frozen, so the pairs cannot move while a view holds a reference.
+    unsafe fn __getbuffer__(
+        slf: Bound<'_, Self>,
+        view: *mut pyo3::ffi::Py_buffer,
+        flags: std::os::raw::c_int,
+    ) -> PyResult<()> {
+        let pairs = &slf.get().pairs;
+        let status = unsafe {
+            pyo3::ffi::PyBuffer_FillInfo(
+                view,
+                slf.as_ptr(),
+                pairs.as_ptr() as *mut std::os::raw::c_void,
+                std::mem::size_of_val(pairs.as_slice()) as pyo3::ffi::Py_ssize_t,
+                1,
+                flags,
+            )
+        };
+        if status == -1 {
+            return Err(PyErr::fetch(slf.py()));
+        }
+        Ok(())
+    }
+}
+
 #[cfg_attr(
     feature = "python",
     pyclass(module = "complexipy", get_all, from_py_object)
@@ -94,28 +231,62 @@ pub struct RefactorPlan {
     pub doc_url: String,
 }
 
-#[cfg_attr(
-    feature = "python",
-    pyclass(module = "complexipy", get_all, from_py_object)
-)]
+#[cfg_attr(feature = "python", pyclass(module = "complexipy", from_py_object))]
 #[cfg_attr(
     any(feature = "python", feature = "wasm"),
     derive(Serialize, Deserialize)
 )]
 #[derive(Clone)]
 pub struct FunctionComplexity {
+    #[cfg_attr(feature = "python", pyo3(get))]
     pub name: String,
+    #[cfg_attr(feature = "python", pyo3(get))]
     pub complexity: u64,
-    #[cfg_attr(feature = "python", serde(skip))]
+    #[cfg_attr(feature = "python", pyo3(get), serde(skip))]
     pub line_start: u64,
-    #[cfg_attr(feature = "python", serde(skip))]
+    #[cfg_attr(feature = "python", pyo3(get), serde(skip))]
     pub line_end: u64,
-    #[cfg_attr(feature = "python", serde(skip))]
-    pub line_complexities: Vec<LineComplexity>,
+    #[cfg_attr(feature = "python", pyo3(get), serde(skip))]
+    pub line_complexities: LineComplexities,
+    /// Plans built with the analysis. Python reads them, or the deferred
+    /// ones, through [`FunctionComplexity::plans`].
     #[cfg_attr(feature = "python", serde(skip))]
     pub refactor_plans: Vec<RefactorPlan>,
     #[cfg_attr(feature = "python", serde(skip))]
     pub additional_refactor_plans: u64,
+    /// Set when the plans are only built the first time they are read.
+    #[cfg(feature = "python")]
+    #[serde(skip)]
+    pub deferred_plans: Option<Arc<DeferredPlans>>,
+}
+
+#[cfg(feature = "python")]
+impl FunctionComplexity {
+    /// The refactor plans and the count of further plans cut by the cap,
+    /// building deferred plans on the first call.
+    pub fn plans(&self) -> (&[RefactorPlan], u64) {
+        match &self.deferred_plans {
+            Some(deferred) => {
+                let (plans, additional) = deferred.get();
+                (plans, *additional)
+            }
+            None => (&self.refactor_plans, self.additional_refactor_plans),
+        }
+    }
+}
+
+#[cfg(feature = "python")]
+#[pymethods]
+impl FunctionComplexity {
+    #[getter]
+    fn refactor_plans(&self, py: Python<'_>) -> Vec<RefactorPlan> {
+        py.detach(|| self.plans().0.to_vec())
+    }
+
+    #[getter]
+    fn additional_refactor_plans(&self, py: Python<'_>) -> u64 {
+        py.detach(|| self.plans().1)
+    }
 }
 
 #[cfg(feature = "python")]
@@ -175,3 +346,7 @@ pub struct RemovableIgnore {
     pub function: String,
     pub complexity: u64,
 }
+
+#[cfg(all(test, feature = "python"))]
+#[path = "tests/line_complexities.rs"]
+mod tests;
@@ -1,13 +1,16 @@
 #[cfg(any(feature = "python", feature = "wasm"))]
 mod shared_deps {
-    pub use crate::classes::{FunctionComplexity, LineComplexity};
+    pub use crate::classes::{FunctionComplexity, LineComplexities, LineComplexity};
+    pub use crate::line_index::LineIndex;
     pub use crate::refactor_plans::{
-        ComplexityRegion, ComplexityResult, RegionKind, build_refactor_plans,
-    };
-    pub use crate::utils::{
-        count_bool_ops, get_column_number, get_line_number, has_noqa_complexipy, is_decorator,
+        ComplexityRegion, ComplexityResult, PlanFile, PlanScope, RegionKind, build_refactor_plans,
     };
+    pub use crate::utils::{IgnoreMarkers, count_bool_ops, is_decorator};
+    pub use ruff_python_ast::visitor::Visitor;
     pub use ruff_python_ast::{self as ast, Stmt};
+    pub use ruff_text_size::Ranged;
+    pub use std::cell::RefCell;
+    pub use std::sync::Arc;
 }
 
 #[cfg(feature = "python")]
@@ -18,6 +21,8 @@ use shared_deps::*;
 
 #[cfg(feature = "python")]
 mod python_deps {
+    pub use crate::helpers::stack::on_analysis_stack;
+    pub use crate::refactor_plans::DeferredPlans;
     pub use pyo3::exceptions::PyValueError;
     pub use pyo3::prelude::*;
     pub use ruff_python_parser::parse_module;
@@ -28,35 +33,199 @@ use python_deps::*;
 
 #[cfg(feature = "python")]
 #[pyfunction]
-#[pyo3(signature = (code, check_script=false, no_ignore=false))]
+#[pyo3(signature = (code, check_script=false, no_ignore=false, score_only=false))]
 pub fn code_complexity(
+    py: Python<'_>,
     code: &str,
     check_script: bool,
     no_ignore: bool,
+    score_only: bool,
 ) -> PyResult<CodeComplexity> {
-    let parsed = match parse_module(code) {
-        Ok(parsed) => parsed,
-        Err(e) => {
-            return Err(PyValueError::new_err(format!(
-                "Failed to parse code: {}",
-                e
-            )));
-        }
-    };
-    let ast_body = parsed.into_suite();
-    let (functions, complexity) = function_level_cognitive_complexity_shared(
-        &ast_body,
-        code,
-        check_script,
-        no_ignore,
-        true,
-    );
-    Ok(CodeComplexity {
+    let mode = AnalysisMode::new(score_only, true, None);
+    py.detach(|| analyze_code(code, check_script, no_ignore, mode))
+}
+
+/// GIL-free body of [`code_complexity`]: parses and scores `code` without
+/// touching any Python object, so callers can run it on any thread. The
+/// work runs on an analysis-sized stack and modules nested deeper than
+/// [`MAX_NESTING_DEPTH`] are rejected.
+#[cfg(feature = "python")]
+pub fn analyze_code(
+    code: &str,
+    check_script: bool,
+    no_ignore: bool,
+    mode: AnalysisMode,
+) -> PyResult<CodeComplexity> {
+    on_analysis_stack(|| {
+        let parsed = match parse_module(code) {
+            Ok(parsed) => parsed,
+            Err(e) => {
+                return Err(PyValueError::new_err(format!(
+                    "Failed to parse code: {}",
+                    e
+                )));
+            }
+        };
+        let ast_body = parsed.into_suite();
+        check_nesting_depth(&ast_body).map_err(PyValueError::new_err)?;
+        let (functions, complexity) = function_level_cognitive_complexity_shared(
+            &ast_body,
+            code,
+            check_script,
+            no_ignore,
+            mode,
+        );
+        Ok(CodeComplexity {
+            functions,
+            complexity,
+            #[cfg(feature = "wasm")]
+            version: env!("CARGO_PKG_VERSION").to_string(),
+        })
+    })
+}
+
+/// What [`analyze_code`] returns for `code` that
+/// [`crate::utils::may_add_complexity`] rules out: no functions and a total
+/// of 0, plus the empty `<module>` entry when scoring the script.
+#[cfg(feature = "python")]
+pub fn unparsed_code_complexity(code: &str, check_script: bool) -> CodeComplexity {
+    let mut functions = Vec::new();
+    if check_script {
+        functions.push(FunctionComplexity {
+            name: "<module>".to_string(),
+            complexity: 0,
+            line_start: 1,
+            line_end: LineIndex::new(code).line_count() as u64,
+            line_complexities: LineComplexities::default(),
+            refactor_plans: Vec::new(),
+            additional_refactor_plans: 0,
+            deferred_plans: None,
+        });
+    }
+    CodeComplexity {
         functions,
-        complexity,
+        complexity: 0,
         #[cfg(feature = "wasm")]
         version: env!("CARGO_PKG_VERSION").to_string(),
-    })
+    }
+}
+
+/// Deepest statement nesting accepted for analysis. The walk recurses once
+/// per level, so deeper modules are reported as errors instead of risking
+/// the stack of the thread analyzing them.
+#[cfg(any(feature = "python", feature = "wasm"))]
+pub const MAX_NESTING_DEPTH: usize = 10_000;
+
+/// Number of compound statements around the most deeply nested statement of
+/// `suite`. Measured with a heap-allocated work stack, so any module the
+/// parser accepted can be checked before it is walked.
+#[cfg(any(feature = "python", feature = "wasm"))]
+pub fn nesting_depth<'a>(suite: &'a ast::Suite) -> usize {
+    let mut deepest = 0;
+    let mut pending: Vec<(&Stmt, usize)> = suite.iter().map(|node| (node, 0)).collect();
+    while let Some((statement, depth)) = pending.pop() {
+        deepest = deepest.max(depth);
+        let mut nest = |body: &'a [Stmt]| pending.extend(body.iter().map(|node| (node, depth + 1)));
+        match statement {
+            Stmt::FunctionDef(f) => nest(&f.body),
+            Stmt::ClassDef(c) => nest(&c.body),
+            Stmt::If(i) => {
+                nest(&i.body);
+                for clause in i.elif_else_clauses.iter() {
+                    nest(&clause.body);
+                }
+            }
+            Stmt::For(f) => {
+                nest(&f.body);
+                nest(&f.orelse);
+            }
+            Stmt::While(w) => {
+                nest(&w.body);
+                nest(&w.orelse);
+            }
+            Stmt::With(w) => nest(&w.body),
+            Stmt::Try(t) => {
+                nest(&t.body);
+                for handler in t.handlers.iter() {
+                    let ast::ExceptHandler::ExceptHandler(handler) = handler;
+                    nest(&handler.body);
+                }
+                nest(&t.orelse);
+                nest(&t.finalbody);
+            }
+            Stmt::Match(m) => {
+                for case in m.cases.iter() {
+                    nest(&case.body);
+                }
+            }
+            _ => {}
+        }
+    }
+    deepest
+}
+
+/// Reject `suite` if it nests deeper than [`MAX_NESTING_DEPTH`].
+#[cfg(any(feature = "python", feature = "wasm"))]
+pub fn check_nesting_depth(suite: &ast::Suite) -> Result<(), String> {
+    let depth = nesting_depth(suite);
+    if depth > MAX_NESTING_DEPTH {
+        return Err(format!(
+            "Code is nested {} levels deep, more than the {} supported",
+            depth, MAX_NESTING_DEPTH
+        ));
+    }
+    Ok(())
+}
+
+/// Modules at least this large (in bytes) have their top-level definitions
+/// analyzed in parallel on the current rayon pool.
+#[cfg(feature = "python")]
+pub const PARALLEL_MODULE_MIN_BYTES: usize = 128 * 1024;
+
+/// How much of each function's analysis is computed.
+#[cfg(any(feature = "python", feature = "wasm"))]
+#[derive(Clone, Copy, PartialEq, Eq, Debug)]
+pub enum AnalysisMode {
+    /// Totals, line ranges, line complexities and refactor plans.
+    Full,
+    /// Everything `Full` computes, except that each function keeps its
+    /// regions and a shared copy of the source, and only builds its refactor
+    /// plans the first time they are read, on at most `plan_jobs` threads
+    /// (every thread of the current rayon pool when `None`).
+    #[cfg(feature = "python")]
+    DeferredPlans { plan_jobs: Option<usize> },
+    /// Everything but the refactor plans.
+    NoPlans,
+    /// Only names, line ranges and totals. The walk records no line
+    /// complexities or regions and never looks up their positions.
+    ScoreOnly,
+}
+
+#[cfg(any(feature = "python", feature = "wasm"))]
+impl AnalysisMode {
+    /// Scores only when `score_only` is set, otherwise the full analysis
+    /// with refactor plans deferred when `refactor_plans` is set and left
+    /// out when it is not.
+    #[cfg(feature = "python")]
+    pub fn new(score_only: bool, refactor_plans: bool, plan_jobs: Option<usize>) -> Self {
+        if score_only {
+            AnalysisMode::ScoreOnly
+        } else if refactor_plans {
+            AnalysisMode::DeferredPlans { plan_jobs }
+        } else {
+            AnalysisMode::NoPlans
+        }
+    }
+
+    /// Whether the walk assembles the region tree refactor plans are built
+    /// from.
+    fn with_regions(self) -> bool {
+        !matches!(self, AnalysisMode::NoPlans | AnalysisMode::ScoreOnly)
+    }
+
+    fn scores_only(self) -> bool {
+        self == AnalysisMode::ScoreOnly
+    }
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
@@ -65,47 +234,127 @@ pub fn function_level_cognitive_complexity_shared(
     code: &str,
     check_script: bool,
     no_ignore: bool,
-    with_plans: bool,
+    mode: AnalysisMode,
 ) -> (Vec<FunctionComplexity>, u64) {
-    let mut functions: Vec<FunctionComplexity> = Vec::new();
-    let mut complexity: u64 = 0;
-    let mut module_complexity: u64 = 0;
-    let mut module_line_complexities: Vec<LineComplexity> = Vec::new();
-    let mut module_regions: Vec<ComplexityRegion> = Vec::new();
+    #[cfg(feature = "python")]
+    let parallel = code.len() >= PARALLEL_MODULE_MIN_BYTES;
+    #[cfg(not(feature = "python"))]
+    let parallel = false;
+    module_cognitive_complexity(ast_body, code, check_script, no_ignore, mode, parallel)
+}
 
+/// A top-level unit of a module: a function or method scored on its own, or
+/// a module-level statement.
+#[cfg(any(feature = "python", feature = "wasm"))]
+enum TopLevelUnit<'a> {
+    Function {
+        node: &'a Stmt,
+        f: &'a ast::StmtFunctionDef,
+        name: String,
+    },
+    Statement(&'a Stmt),
+}
+
+#[cfg(any(feature = "python", feature = "wasm"))]
+enum TopLevelResult {
+    Function(FunctionComplexity),
+    Statement(ComplexityResult),
+}
+
+#[cfg(any(feature = "python", feature = "wasm"))]
+fn module_cognitive_complexity(
+    ast_body: &ast::Suite,
+    code: &str,
+    check_script: bool,
+    no_ignore: bool,
+    mode: AnalysisMode,
+    parallel: bool,
+) -> (Vec<FunctionComplexity>, u64) {
+    let index = LineIndex::new(code);
+    let lines = &index;
+    let source = &PlanSource::new(code, mode);
+    let markers = (!no_ignore).then(|| IgnoreMarkers::new(lines));
+    let markers = markers.as_ref();
+    let mut units: Vec<TopLevelUnit> = Vec::new();
+    // Lines of the statements `<module>` is scored from, which its plans
+    // are measured on.
+    let mut module_statements: Vec<(u64, u64)> = Vec::new();
     for node in ast_body.iter() {
         match node {
             Stmt::FunctionDef(f) => {
-                if !is_ignored(f, code, no_ignore) {
-                    functions.push(analyze_function(
+                if !is_ignored(f, lines, markers) {
+                    units.push(TopLevelUnit::Function {
                         node,
                         f,
-                        f.name.to_string(),
-                        code,
-                        with_plans,
-                    ));
+                        name: f.name.to_string(),
+                    });
                 }
             }
             Stmt::ClassDef(c) => {
                 for node in c.body.iter() {
                     if let Stmt::FunctionDef(f) = node
-                        && !is_ignored(f, code, no_ignore)
+                        && !is_ignored(f, lines, markers)
                     {
-                        functions.push(analyze_function(
+                        units.push(TopLevelUnit::Function {
                             node,
                             f,
-                            format!("{}::{}", c.name, f.name),
-                            code,
-                            with_plans,
-                        ));
+                            name: format!("{}::{}", c.name, f.name),
+                        });
                     }
                 }
             }
             _ => {
-                let result = statement_cognitive_complexity_shared(node, 0, code);
+                if check_script && mode.with_regions() {
+                    module_statements.push((
+                        lines.line_number(usize::from(node.range().start())),
+                        lines.line_number(usize::from(node.range().end())),
+                    ));
+                }
+                units.push(TopLevelUnit::Statement(node));
+            }
+        }
+    }
+
+    // Outside script mode module-level statements only add to the total.
+    let statement_mode = if check_script {
+        mode
+    } else {
+        AnalysisMode::ScoreOnly
+    };
+    let analyze_unit = |unit: &TopLevelUnit| match unit {
+        TopLevelUnit::Function { node, f, name } => {
+            TopLevelResult::Function(analyze_function(node, f, name.clone(), lines, source, mode))
+        }
+        TopLevelUnit::Statement(node) => {
+            TopLevelResult::Statement(analyze_statement(node, lines, statement_mode))
+        }
+    };
+    #[cfg(feature = "python")]
+    let results: Vec<TopLevelResult> = if parallel && units.len() > 1 {
+        use rayon::prelude::*;
+        units.par_iter().map(analyze_unit).collect()
+    } else {
+        units.iter().map(analyze_unit).collect()
+    };
+    #[cfg(not(feature = "python"))]
+    let results: Vec<TopLevelResult> = {
+        let _ = parallel;
+        units.iter().map(analyze_unit).collect()
+    };
+
+    let mut functions: Vec<FunctionComplexity> = Vec::new();
+    let mut complexity: u64 = 0;
+    let mut module_complexity: u64 = 0;
+    let mut module_line_complexities: Vec<LineComplexity> = Vec::new();
+    let mut module_regions: Vec<ComplexityRegion> = Vec::new();
+
+    for result in results {
+        match result {
+            TopLevelResult::Function(function) => functions.push(function),
+            TopLevelResult::Statement(result) => {
                 if check_script {
                     module_complexity += result.complexity;
-                    module_line_complexities.extend(result.line_complexities);
+                    module_line_complexities.extend(result.line_complexities.iter());
                     module_regions.extend(result.regions);
                 } else {
                     complexity += result.complexity;
@@ -115,21 +364,23 @@ pub fn function_level_cognitive_complexity_shared(
     }
 
     if check_script {
-        let total_lines = code.lines().count() as u64;
-        let (refactor_plans, additional_refactor_plans) = if with_plans {
-            build_refactor_plans(module_complexity, &module_regions, code, true)
-        } else {
-            (Vec::new(), 0)
-        };
-        functions.push(FunctionComplexity {
+        let total_lines = lines.line_count() as u64;
+        let mut module = FunctionComplexity {
             name: "<module>".to_string(),
             complexity: module_complexity,
             line_start: 1,
             line_end: total_lines,
-            line_complexities: module_line_complexities,
-            refactor_plans,
-            additional_refactor_plans,
-        });
+            line_complexities: LineComplexities::from(module_line_complexities),
+            refactor_plans: Vec::new(),
+            additional_refactor_plans: 0,
+            #[cfg(feature = "python")]
+            deferred_plans: None,
+        };
+        let scope = PlanScope::Module {
+            statements: module_statements,
+        };
+        source.plan(&mut module, module_regions, scope);
+        functions.push(module);
     }
 
     for function in functions.iter() {
@@ -138,10 +389,16 @@ pub fn function_level_cognitive_complexity_shared(
     (functions, complexity)
 }
 
+/// Whether `f` is suppressed by an ignore marker; `markers` is `None` when
+/// markers are not honoured.
 #[cfg(any(feature = "python", feature = "wasm"))]
-fn is_ignored(f: &ast::StmtFunctionDef, code: &str, no_ignore: bool) -> bool {
-    let start_line = get_line_number(usize::from(f.range.start()), code);
-    !no_ignore && has_noqa_complexipy(start_line, code)
+fn is_ignored(
+    f: &ast::StmtFunctionDef,
+    lines: &LineIndex,
+    markers: Option<&IgnoreMarkers>,
+) -> bool {
+    let start_line = lines.line_number(usize::from(f.range.start()));
+    markers.is_some_and(|markers| markers.suppresses(start_line))
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
@@ -149,55 +406,132 @@ fn analyze_function(
     node: &Stmt,
     f: &ast::StmtFunctionDef,
     name: String,
-    code: &str,
-    with_plans: bool,
+    lines: &LineIndex,
+    source: &PlanSource,
+    mode: AnalysisMode,
 ) -> FunctionComplexity {
-    let mut result = statement_cognitive_complexity_shared(node, 0, code);
-    if let Some(line) = detect_direct_recursion(&f.body, f.name.as_str(), code) {
-        result.complexity += 1;
-        push_line(&mut result, line, 1);
-    }
-    let (refactor_plans, additional_refactor_plans) = if with_plans {
-        build_refactor_plans(result.complexity, &result.regions, code, false)
-    } else {
-        (Vec::new(), 0)
-    };
-    FunctionComplexity {
+    let result = with_walk_arena(mode.scores_only(), |arena| {
+        let mut recursion = RecursionScan {
+            function: f,
+            found: None,
+        };
+        let mut complexity =
+            statement_cognitive_complexity_shared(node, 0, lines, arena, Some(&mut recursion));
+        if let Some(offset) = recursion.found {
+            complexity += 1;
+            let line = arena.line(lines, offset);
+            arena.push_line(line, 1);
+        }
+        arena.finish(complexity, mode.with_regions())
+    });
+    let mut function = FunctionComplexity {
         name,
         complexity: result.complexity,
-        line_start: get_line_number(usize::from(f.range.start()), code),
-        line_end: get_line_number(usize::from(f.range.end()), code),
+        line_start: lines.line_number(usize::from(f.range.start())),
+        line_end: lines.line_number(usize::from(f.range.end())),
         line_complexities: result.line_complexities,
-        refactor_plans,
-        additional_refactor_plans,
-    }
+        refactor_plans: Vec::new(),
+        additional_refactor_plans: 0,
+        #[cfg(feature = "python")]
+        deferred_plans: None,
+    };
+    let first_decorator = f.decorator_list.first().map(|d| d.range.start());
+    let scope = PlanScope::Function {
+        line_start: lines.line_number(usize::from(first_decorator.unwrap_or(f.range.start()))),
+        line_end: function.line_end,
+    };
+    source.plan(&mut function, result.regions, scope);
+    function
 }
 
+/// The file refactor plans are built from, when the analysis mode builds
+/// them.
 #[cfg(any(feature = "python", feature = "wasm"))]
-struct RecursionFinder<'a> {
-    name: &'a str,
-    found: Option<usize>,
+struct PlanSource {
+    file: Option<Arc<PlanFile>>,
+    mode: AnalysisMode,
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-impl<'a> ast::visitor::Visitor<'a> for RecursionFinder<'a> {
-    fn visit_stmt(&mut self, stmt: &'a Stmt) {
-        if self.found.is_some() {
-            return;
+impl PlanSource {
+    fn new(code: &str, mode: AnalysisMode) -> Self {
+        PlanSource {
+            file: mode.with_regions().then(|| Arc::new(PlanFile::new(code))),
+            mode,
         }
-        if matches!(stmt, Stmt::FunctionDef(_) | Stmt::ClassDef(_)) {
+    }
+
+    /// Give `function` its refactor plans: built now from `regions`, or
+    /// kept with them to be built when first read.
+    fn plan(
+        &self,
+        function: &mut FunctionComplexity,
+        regions: Vec<ComplexityRegion>,
+        scope: PlanScope,
+    ) {
+        let Some(file) = &self.file else {
             return;
+        };
+        match self.mode {
+            #[cfg(feature = "python")]
+            AnalysisMode::DeferredPlans { plan_jobs } => {
+                function.deferred_plans = Some(Arc::new(DeferredPlans::new(
+                    function.complexity,
+                    regions,
+                    Arc::clone(file),
+                    scope,
+                    plan_jobs,
+                )));
+            }
+            _ => {
+                (function.refactor_plans, function.additional_refactor_plans) =
+                    build_refactor_plans(function.complexity, &regions, file.index(), &scope, None);
+            }
         }
-        ast::visitor::walk_stmt(self, stmt);
     }
+}
 
-    fn visit_expr(&mut self, expr: &'a ast::Expr) {
+#[cfg(any(feature = "python", feature = "wasm"))]
+fn analyze_statement(node: &Stmt, lines: &LineIndex, mode: AnalysisMode) -> ComplexityResult {
+    with_walk_arena(mode.scores_only(), |arena| {
+        let complexity = statement_cognitive_complexity_shared(node, 0, lines, arena, None);
+        arena.finish(complexity, mode.with_regions())
+    })
+}
+
+/// The direct-recursion check of one function, carried along its complexity
+/// walk. The walker hands it the expressions of the function's own
+/// statements as it reaches them, in source order, so the first call to the
+/// function by name is found without a second traversal. Nested functions,
+/// classes and lambdas are never searched.
+#[cfg(any(feature = "python", feature = "wasm"))]
+struct RecursionScan<'a> {
+    function: &'a ast::StmtFunctionDef,
+    found: Option<usize>,
+}
+
+#[cfg(any(feature = "python", feature = "wasm"))]
+impl RecursionScan<'_> {
+    /// Scan the expressions of `stmt` itself; its nested statements are
+    /// reached, and scanned, by the walker.
+    fn scan_stmt(&mut self, stmt: &Stmt) {
+        if self.found.is_none() {
+            ast::visitor::walk_stmt(self, stmt);
+        }
+    }
+}
+
+#[cfg(any(feature = "python", feature = "wasm"))]
+impl<'b> Visitor<'b> for RecursionScan<'_> {
+    fn visit_stmt(&mut self, _stmt: &'b Stmt) {}
+
+    fn visit_expr(&mut self, expr: &'b ast::Expr) {
         if self.found.is_some() {
             return;
         }
         if let ast::Expr::Call(c) = expr
             && let ast::Expr::Name(n) = c.func.as_ref()
-            && n.id.as_str() == self.name
+            && n.id.as_str() == self.function.name.as_str()
         {
             self.found = Some(usize::from(c.range.start()));
             return;
@@ -209,99 +543,209 @@ impl<'a> ast::visitor::Visitor<'a> for RecursionFinder<'a> {
     }
 }
 
+/// Append-only buffers one walk writes into: the line complexities in source
+/// order and a flat table of regions, each linked to its parent by index.
+/// Every entry is written once, where it is found, instead of being copied
+/// into the result of each enclosing statement; the region tree the refactor
+/// rules need is only assembled by [`WalkArena::finish`].
 #[cfg(any(feature = "python", feature = "wasm"))]
-fn detect_direct_recursion(body: &[Stmt], name: &str, code: &str) -> Option<u64> {
-    let mut finder = RecursionFinder { name, found: None };
-    ast::visitor::walk_body(&mut finder, body);
-    finder.found.map(|offset| get_line_number(offset, code))
+#[derive(Default)]
+struct WalkArena {
+    line_complexities: Vec<LineComplexity>,
+    /// Regions in the order they were opened. Their `children` stay empty
+    /// until the tree is assembled.
+    regions: Vec<ArenaRegion>,
+    /// Innermost region still being walked, which new regions are added to.
+    open: Option<usize>,
+    /// Set for score-only walks, which record nothing but the total.
+    scores_only: bool,
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-fn empty_result() -> ComplexityResult {
-    ComplexityResult {
-        complexity: 0,
-        line_complexities: Vec::new(),
-        regions: Vec::new(),
-    }
+struct ArenaRegion {
+    parent: Option<usize>,
+    region: ComplexityRegion,
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-fn push_line(result: &mut ComplexityResult, line: u64, complexity: u64) {
-    result
-        .line_complexities
-        .push(LineComplexity { line, complexity });
+thread_local! {
+    /// Reused by every function and statement walked on this thread, so
+    /// the buffers only grow to the largest one instead of being allocated
+    /// for each.
+    static WALK_ARENA: RefCell<WalkArena> = RefCell::new(WalkArena::default());
 }
 
+/// Run `f` on this thread's cleared arena. Walks started while it is in
+/// use get a fresh one.
 #[cfg(any(feature = "python", feature = "wasm"))]
-fn absorb(result: &mut ComplexityResult, child: ComplexityResult) {
-    result.complexity += child.complexity;
-    result.line_complexities.extend(child.line_complexities);
+fn with_walk_arena<T>(scores_only: bool, f: impl FnOnce(&mut WalkArena) -> T) -> T {
+    WALK_ARENA.with(|arena| match arena.try_borrow_mut() {
+        Ok(mut arena) => {
+            arena.clear();
+            arena.scores_only = scores_only;
+            f(&mut arena)
+        }
+        Err(_) => f(&mut WalkArena {
+            scores_only,
+            ..WalkArena::default()
+        }),
+    })
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-fn absorb_with_regions(result: &mut ComplexityResult, child: ComplexityResult) {
-    result.complexity += child.complexity;
-    result.line_complexities.extend(child.line_complexities);
-    result.regions.extend(child.regions);
-}
+impl WalkArena {
+    fn clear(&mut self) {
+        self.line_complexities.clear();
+        self.regions.clear();
+        self.open = None;
+    }
 
-#[cfg(any(feature = "python", feature = "wasm"))]
-fn finalize_region(result: &mut ComplexityResult, mut region: ComplexityRegion) {
-    region.total += sum_region_child_totals(&region.children);
-    result.regions.push(region);
+    /// Line of `offset`, looked up only when the walk records positions.
+    fn line(&self, lines: &LineIndex, offset: usize) -> u64 {
+        if self.scores_only {
+            0
+        } else {
+            lines.line_number(offset)
+        }
+    }
+
+    /// Column of `offset`, looked up only when the walk records positions.
+    fn column(&self, lines: &LineIndex, offset: usize) -> u64 {
+        if self.scores_only {
+            0
+        } else {
+            lines.column_number(offset)
+        }
+    }
+
+    fn push_line(&mut self, line: u64, complexity: u64) {
+        if self.scores_only {
+            return;
+        }
+        self.line_complexities
+            .push(LineComplexity { line, complexity });
+    }
+
+    /// Open a region at the current position; regions added until it is
+    /// closed become its children.
+    fn open_region(&mut self) -> usize {
+        if self.scores_only {
+            return 0;
+        }
+        let index = self.regions.len();
+        self.regions.push(ArenaRegion {
+            parent: self.open,
+            region: ComplexityRegion::default(),
+        });
+        self.open = Some(index);
+        index
+    }
+
+    /// Fill in region `index` and close it. Its `total` is its own total
+    /// plus the totals of its non-boolean children, which they added to it
+    /// as they were closed.
+    fn close_region(&mut self, index: usize, region: ComplexityRegion) {
+        if self.scores_only {
+            return;
+        }
+        let entry = &mut self.regions[index];
+        let child_totals = entry.region.total;
+        entry.region = ComplexityRegion {
+            total: region.total + child_totals,
+            ..region
+        };
+        self.open = entry.parent;
+        if let Some(parent) = entry.parent
+            && entry.region.kind != RegionKind::BooleanCondition
+        {
+            let total = entry.region.total;
+            self.regions[parent].region.total += total;
+        }
+    }
+
+    fn push_region(&mut self, region: ComplexityRegion) {
+        let index = self.open_region();
+        self.close_region(index, region);
+    }
+
+    /// Pack the result of the walk; the region tree is only assembled when
+    /// `with_regions` is set.
+    fn finish(&mut self, complexity: u64, with_regions: bool) -> ComplexityResult {
+        ComplexityResult {
+            complexity,
+            line_complexities: self.line_complexities.iter().cloned().collect(),
+            regions: if with_regions {
+                self.region_tree()
+            } else {
+                Vec::new()
+            },
+        }
+    }
+
+    /// Move the regions into the nested form the refactor rules walk.
+    /// Children always come after their parent, so going backwards every
+    /// region is complete before it is moved into its parent.
+    fn region_tree(&mut self) -> Vec<ComplexityRegion> {
+        let mut roots = Vec::new();
+        for index in (0..self.regions.len()).rev() {
+            let mut region = std::mem::take(&mut self.regions[index].region);
+            region.children.reverse();
+            match self.regions[index].parent {
+                Some(parent) => self.regions[parent].region.children.push(region),
+                None => roots.push(region),
+            }
+        }
+        roots.reverse();
+        roots
+    }
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-fn count_line_bool_ops(
-    result: &mut ComplexityResult,
-    exprs: Vec<ast::Expr>,
+fn count_line_bool_ops<'a>(
+    arena: &mut WalkArena,
+    exprs: impl IntoIterator<Item = &'a ast::Expr>,
     line: u64,
     nesting_level: u64,
-) {
+) -> u64 {
     let complexity: u64 = exprs
         .into_iter()
         .map(|expr| count_bool_ops(expr, nesting_level))
         .sum();
-    result.complexity += complexity;
-    push_line(result, line, complexity);
+    arena.push_line(line, complexity);
+    complexity
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
 fn collect_suite(
     suite: &ast::Suite,
     nesting_level: u64,
-    code: &str,
-    region_children: &mut Vec<ComplexityRegion>,
-) -> ComplexityResult {
-    let mut result = empty_result();
+    lines: &LineIndex,
+    arena: &mut WalkArena,
+    mut recursion: Option<&mut RecursionScan>,
+) -> u64 {
+    let mut complexity = 0;
     for node in suite.iter() {
-        let child = statement_cognitive_complexity_shared(node, nesting_level, code);
-        result.complexity += child.complexity;
-        result.line_complexities.extend(child.line_complexities);
-        region_children.extend(child.regions);
+        complexity += statement_cognitive_complexity_shared(
+            node,
+            nesting_level,
+            lines,
+            arena,
+            recursion.as_deref_mut(),
+        );
     }
-    result
-}
-
-#[cfg(any(feature = "python", feature = "wasm"))]
-fn sum_region_child_totals(children: &[ComplexityRegion]) -> u64 {
-    children
-        .iter()
-        .filter(|child| child.kind != RegionKind::BooleanCondition)
-        .map(|child| child.total)
-        .sum()
+    complexity
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
 fn push_bool_region(
-    regions: &mut Vec<ComplexityRegion>,
+    arena: &mut WalkArena,
     line_start: u64,
     line_end: u64,
     column_start: u64,
     boolean: u64,
 ) {
     if boolean >= 2 {
-        regions.push(ComplexityRegion {
+        arena.push_region(ComplexityRegion {
             kind: RegionKind::BooleanCondition,
             line_start,
             line_end,
@@ -316,36 +760,37 @@ fn push_bool_region(
 
 #[cfg(any(feature = "python", feature = "wasm"))]
 fn loop_complexity(
-    control: ast::Expr,
+    control: &ast::Expr,
     body: &ast::Suite,
     orelse: &ast::Suite,
     range: (usize, usize),
     nesting_level: u64,
-    code: &str,
-) -> ComplexityResult {
-    let mut result = empty_result();
+    lines: &LineIndex,
+    arena: &mut WalkArena,
+    mut recursion: Option<&mut RecursionScan>,
+) -> u64 {
     let (range_start, range_end) = range;
-    let line_start = get_line_number(range_start, code);
-    let line_end = get_line_number(range_end, code);
-    let column_start = get_column_number(range_start, code);
+    let line_start = arena.line(lines, range_start);
+    let line_end = arena.line(lines, range_end);
+    let column_start = arena.column(lines, range_start);
     let boolean = count_bool_ops(control, nesting_level);
     let own = 1 + nesting_level + boolean;
-    result.complexity += own;
-    push_line(&mut result, line_start, own);
-
-    let mut children = Vec::new();
-    push_bool_region(&mut children, line_start, line_start, column_start, boolean);
-    absorb(
-        &mut result,
-        collect_suite(body, nesting_level + 1, code, &mut children),
-    );
-    absorb(
-        &mut result,
-        collect_suite(orelse, nesting_level, code, &mut children),
+    let mut complexity = own;
+    arena.push_line(line_start, own);
+
+    let region = arena.open_region();
+    push_bool_region(arena, line_start, line_start, column_start, boolean);
+    complexity += collect_suite(
+        body,
+        nesting_level + 1,
+        lines,
+        arena,
+        recursion.as_deref_mut(),
     );
+    complexity += collect_suite(orelse, nesting_level, lines, arena, recursion);
 
-    finalize_region(
-        &mut result,
+    arena.close_region(
+        region,
         ComplexityRegion {
             kind: RegionKind::Loop,
             line_start,
@@ -356,117 +801,167 @@ fn loop_complexity(
             boolean,
             total: own,
             bool_op_count: boolean,
-            children,
             ..Default::default()
         },
     );
-    result
+    complexity
 }
 
+/// Score `statement` at `nesting_level`, writing its line complexities and
+/// regions to `arena`. With a `recursion` scan, the statement belongs to the
+/// scanned function and its expressions are searched for a recursive call on
+/// the way.
 #[cfg(any(feature = "python", feature = "wasm"))]
 fn statement_cognitive_complexity_shared(
     statement: &Stmt,
     nesting_level: u64,
-    code: &str,
-) -> ComplexityResult {
-    let mut result = empty_result();
-
-    if is_decorator(statement.clone())
+    lines: &LineIndex,
+    arena: &mut WalkArena,
+    mut recursion: Option<&mut RecursionScan>,
+) -> u64 {
+    if is_decorator(statement)
         && let Stmt::FunctionDef(f) = statement
     {
-        return statement_cognitive_complexity_shared(&f.body[0], nesting_level, code);
+        if let Some(scan) = recursion.filter(|scan| std::ptr::eq(scan.function, f)) {
+            scan.scan_stmt(&f.body[1]);
+        }
+        return statement_cognitive_complexity_shared(
+            &f.body[0],
+            nesting_level,
+            lines,
+            arena,
+            None,
+        );
     }
 
+    // Clause headers of `if`, `try` and `match` are scanned as each clause
+    // is reached below; every other statement's own expressions precede its
+    // body, so they are scanned up front.
+    if let Some(scan) = recursion.as_deref_mut()
+        && !matches!(
+            statement,
+            Stmt::FunctionDef(_) | Stmt::ClassDef(_) | Stmt::If(_) | Stmt::Try(_) | Stmt::Match(_)
+        )
+    {
+        scan.scan_stmt(statement);
+    }
+
+    let mut complexity = 0;
     match statement {
         Stmt::FunctionDef(f) => {
+            // Only the scanned function's own body is searched, not the
+            // bodies of functions nested in it.
+            let mut recursion = recursion.filter(|scan| std::ptr::eq(scan.function, f));
             for node in f.body.iter() {
                 let next_nesting = if matches!(node, Stmt::FunctionDef(..)) {
                     nesting_level + 1
                 } else {
                     nesting_level
                 };
-                absorb_with_regions(
-                    &mut result,
-                    statement_cognitive_complexity_shared(node, next_nesting, code),
+                complexity += statement_cognitive_complexity_shared(
+                    node,
+                    next_nesting,
+                    lines,
+                    arena,
+                    recursion.as_deref_mut(),
                 );
             }
         }
         Stmt::ClassDef(c) => {
             for node in c.body.iter() {
                 if let Stmt::FunctionDef(..) = node {
-                    absorb_with_regions(
-                        &mut result,
-                        statement_cognitive_complexity_shared(node, nesting_level, code),
+                    complexity += statement_cognitive_complexity_shared(
+                        node,
+                        nesting_level,
+                        lines,
+                        arena,
+                        None,
                     );
                 }
             }
         }
         Stmt::Assign(a) => {
-            let line = get_line_number(usize::from(a.range.start()), code);
-            count_line_bool_ops(&mut result, vec![*a.value.clone()], line, nesting_level);
+            let line = arena.line(lines, usize::from(a.range.start()));
+            complexity += count_line_bool_ops(arena, [&*a.value], line, nesting_level);
         }
         Stmt::AnnAssign(a) => {
-            if let Some(value) = a.value.clone() {
-                let line = get_line_number(usize::from(a.range.start()), code);
-                count_line_bool_ops(&mut result, vec![*value], line, nesting_level);
+            if let Some(value) = a.value.as_deref() {
+                let line = arena.line(lines, usize::from(a.range.start()));
+                complexity += count_line_bool_ops(arena, [value], line, nesting_level);
             }
         }
         Stmt::AugAssign(a) => {
-            let line = get_line_number(usize::from(a.range.start()), code);
-            count_line_bool_ops(&mut result, vec![*a.value.clone()], line, nesting_level);
+            let line = arena.line(lines, usize::from(a.range.start()));
+            complexity += count_line_bool_ops(arena, [&*a.value], line, nesting_level);
         }
         Stmt::For(f) => {
-            result = loop_complexity(
-                *f.iter.clone(),
+            complexity += loop_complexity(
+                &f.iter,
                 &f.body,
                 &f.orelse,
                 (usize::from(f.range.start()), usize::from(f.range.end())),
                 nesting_level,
-                code,
+                lines,
+                arena,
+                recursion,
             );
         }
         Stmt::While(w) => {
-            result = loop_complexity(
-                *w.test.clone(),
+            complexity += loop_complexity(
+                &w.test,
                 &w.body,
                 &w.orelse,
                 (usize::from(w.range.start()), usize::from(w.range.end())),
                 nesting_level,
-                code,
+                lines,
+                arena,
+                recursion,
             );
         }
         Stmt::If(i) => {
-            let boolean = count_bool_ops(*i.test.clone(), nesting_level);
+            if let Some(scan) = recursion.as_deref_mut() {
+                scan.visit_expr(&i.test);
+            }
+            let boolean = count_bool_ops(&i.test, nesting_level);
             let own = 1 + nesting_level + boolean;
-            result.complexity += own;
-            let line_start = get_line_number(usize::from(i.range.start()), code);
-            let line_end = get_line_number(usize::from(i.range.end()), code);
-            let column_start = get_column_number(usize::from(i.range.start()), code);
-            push_line(&mut result, line_start, own);
-
-            let mut children = Vec::new();
-            push_bool_region(&mut children, line_start, line_start, column_start, boolean);
-            absorb(
-                &mut result,
-                collect_suite(&i.body, nesting_level + 1, code, &mut children),
+            complexity += own;
+            let line_start = arena.line(lines, usize::from(i.range.start()));
+            let line_end = arena.line(lines, usize::from(i.range.end()));
+            let column_start = arena.column(lines, usize::from(i.range.start()));
+            arena.push_line(line_start, own);
+
+            let region = arena.open_region();
+            push_bool_region(arena, line_start, line_start, column_start, boolean);
+            complexity += collect_suite(
+                &i.body,
+                nesting_level + 1,
+                lines,
+                arena,
+                recursion.as_deref_mut(),
             );
 
             let mut elif_count = 0;
-            for clause in i.elif_else_clauses.clone() {
-                let line = get_line_number(usize::from(clause.range.start()), code);
-                let column = get_column_number(usize::from(clause.range.start()), code);
+            for clause in i.elif_else_clauses.iter() {
+                if let Some(scan) = recursion.as_deref_mut() {
+                    ast::visitor::walk_elif_else_clause(scan, clause);
+                }
+                let line = arena.line(lines, usize::from(clause.range.start()));
+                let column = arena.column(lines, usize::from(clause.range.start()));
                 let mut clause_complexity = 1;
-                if let Some(test) = clause.test.clone() {
+                if let Some(test) = clause.test.as_ref() {
                     elif_count += 1;
                     let clause_bool = count_bool_ops(test, nesting_level);
                     clause_complexity += clause_bool;
-                    push_bool_region(&mut children, line, line, column, clause_bool);
+                    push_bool_region(arena, line, line, column, clause_bool);
                 }
-                result.complexity += clause_complexity;
-                push_line(&mut result, line, clause_complexity);
-                absorb(
-                    &mut result,
-                    collect_suite(&clause.body, nesting_level + 1, code, &mut children),
+                complexity += clause_complexity;
+                arena.push_line(line, clause_complexity);
+                complexity += collect_suite(
+                    &clause.body,
+                    nesting_level + 1,
+                    lines,
+                    arena,
+                    recursion.as_deref_mut(),
                 );
             }
 
@@ -475,8 +970,8 @@ fn statement_cognitive_complexity_shared(
             } else {
                 RegionKind::If
             };
-            finalize_region(
-                &mut result,
+            arena.close_region(
+                region,
                 ComplexityRegion {
                     kind,
                     line_start,
@@ -488,47 +983,56 @@ fn statement_cognitive_complexity_shared(
                     total: own,
                     elif_count,
                     bool_op_count: boolean,
-                    children,
+                    children: Vec::new(),
                 },
             );
         }
         Stmt::Try(t) => {
-            let line_start = get_line_number(usize::from(t.range.start()), code);
-            let line_end = get_line_number(usize::from(t.range.end()), code);
-            let column_start = get_column_number(usize::from(t.range.start()), code);
-            let mut children = Vec::new();
-            absorb(
-                &mut result,
-                collect_suite(&t.body, nesting_level, code, &mut children),
+            let line_start = arena.line(lines, usize::from(t.range.start()));
+            let line_end = arena.line(lines, usize::from(t.range.end()));
+            let column_start = arena.column(lines, usize::from(t.range.start()));
+            let region = arena.open_region();
+            complexity += collect_suite(
+                &t.body,
+                nesting_level,
+                lines,
+                arena,
+                recursion.as_deref_mut(),
             );
 
             let mut structural = 0;
             let mut own = 0;
             for handler in t.handlers.iter() {
+                if let Some(scan) = recursion.as_deref_mut() {
+                    ast::visitor::walk_except_handler(scan, handler);
+                }
                 structural += 1;
                 let handler_complexity = 1 + nesting_level;
                 own += handler_complexity;
-                result.complexity += handler_complexity;
-                let handler = handler.clone().expect_except_handler();
-                let line = get_line_number(usize::from(handler.range.start()), code);
-                push_line(&mut result, line, handler_complexity);
-                absorb(
-                    &mut result,
-                    collect_suite(&handler.body, nesting_level + 1, code, &mut children),
+                complexity += handler_complexity;
+                let ast::ExceptHandler::ExceptHandler(handler) = handler;
+                let line = arena.line(lines, usize::from(handler.range.start()));
+                arena.push_line(line, handler_complexity);
+                complexity += collect_suite(
+                    &handler.body,
+                    nesting_level + 1,
+                    lines,
+                    arena,
+                    recursion.as_deref_mut(),
                 );
             }
 
-            absorb(
-                &mut result,
-                collect_suite(&t.orelse, nesting_level, code, &mut children),
-            );
-            absorb(
-                &mut result,
-                collect_suite(&t.finalbody, nesting_level, code, &mut children),
+            complexity += collect_suite(
+                &t.orelse,
+                nesting_level,
+                lines,
+                arena,
+                recursion.as_deref_mut(),
             );
+            complexity += collect_suite(&t.finalbody, nesting_level, lines, arena, recursion);
 
-            finalize_region(
-                &mut result,
+            arena.close_region(
+                region,
                 ComplexityRegion {
                     kind: RegionKind::Try,
                     line_start,
@@ -537,29 +1041,37 @@ fn statement_cognitive_complexity_shared(
                     structural,
                     nesting: nesting_level,
                     total: own,
-                    children,
                     ..Default::default()
                 },
             );
         }
         Stmt::Match(m) => {
+            if let Some(scan) = recursion.as_deref_mut() {
+                scan.visit_expr(&m.subject);
+            }
             let own = 1 + nesting_level;
-            result.complexity += own;
-            let line_start = get_line_number(usize::from(m.range.start()), code);
-            let line_end = get_line_number(usize::from(m.range.end()), code);
-            let column_start = get_column_number(usize::from(m.range.start()), code);
-            push_line(&mut result, line_start, own);
+            complexity += own;
+            let line_start = arena.line(lines, usize::from(m.range.start()));
+            let line_end = arena.line(lines, usize::from(m.range.end()));
+            let column_start = arena.column(lines, usize::from(m.range.start()));
+            arena.push_line(line_start, own);
 
-            let mut children = Vec::new();
+            let region = arena.open_region();
             for case in m.cases.iter() {
-                absorb(
-                    &mut result,
-                    collect_suite(&case.body, nesting_level + 1, code, &mut children),
+                if let Some(scan) = recursion.as_deref_mut() {
+                    ast::visitor::walk_match_case(scan, case);
+                }
+                complexity += collect_suite(
+                    &case.body,
+                    nesting_level + 1,
+                    lines,
+                    arena,
+                    recursion.as_deref_mut(),
                 );
             }
 
-            finalize_region(
-                &mut result,
+            arena.close_region(
+                region,
                 ComplexityRegion {
                     kind: RegionKind::Match,
                     line_start,
@@ -568,56 +1080,43 @@ fn statement_cognitive_complexity_shared(
                     structural: 1,
                     nesting: nesting_level,
                     total: own,
-                    children,
                     ..Default::default()
                 },
             );
         }
         Stmt::Return(r) => {
-            if let Some(value) = r.value.clone() {
-                let line = get_line_number(usize::from(r.range.start()), code);
-                count_line_bool_ops(&mut result, vec![*value], line, nesting_level);
+            if let Some(value) = r.value.as_deref() {
+                let line = arena.line(lines, usize::from(r.range.start()));
+                complexity += count_line_bool_ops(arena, [value], line, nesting_level);
             }
         }
         Stmt::Raise(r) => {
-            let mut exprs = Vec::new();
-            if let Some(exc) = r.exc.clone() {
-                exprs.push(*exc);
-            }
-            if let Some(cause) = r.cause.clone() {
-                exprs.push(*cause);
-            }
-            let line = get_line_number(usize::from(r.range.start()), code);
-            count_line_bool_ops(&mut result, exprs, line, nesting_level);
+            let exprs = r.exc.iter().chain(r.cause.iter()).map(|e| &**e);
+            let line = arena.line(lines, usize::from(r.range.start()));
+            complexity += count_line_bool_ops(arena, exprs, line, nesting_level);
         }
         Stmt::Assert(a) => {
-            let mut exprs = vec![*a.test.clone()];
-            if let Some(msg) = a.msg.clone() {
-                exprs.push(*msg);
-            }
-            let line = get_line_number(usize::from(a.range.start()), code);
-            count_line_bool_ops(&mut result, exprs, line, nesting_level);
+            let exprs = std::iter::once(&a.test).chain(a.msg.iter()).map(|e| &**e);
+            let line = arena.line(lines, usize::from(a.range.start()));
+            complexity += count_line_bool_ops(arena, exprs, line, nesting_level);
         }
         Stmt::With(w) => {
             let with_complexity: u64 = w
                 .items
                 .iter()
-                .map(|item| count_bool_ops(item.context_expr.clone(), nesting_level))
+                .map(|item| count_bool_ops(&item.context_expr, nesting_level))
                 .sum();
-            result.complexity += with_complexity;
-            let line_start = get_line_number(usize::from(w.range.start()), code);
-            let line_end = get_line_number(usize::from(w.range.end()), code);
-            let column_start = get_column_number(usize::from(w.range.start()), code);
-            push_line(&mut result, line_start, with_complexity);
-
-            let mut children = Vec::new();
-            absorb(
-                &mut result,
-                collect_suite(&w.body, nesting_level, code, &mut children),
-            );
+            complexity += with_complexity;
+            let line_start = arena.line(lines, usize::from(w.range.start()));
+            let line_end = arena.line(lines, usize::from(w.range.end()));
+            let column_start = arena.column(lines, usize::from(w.range.start()));
+            arena.push_line(line_start, with_complexity);
+
+            let region = arena.open_region();
+            complexity += collect_suite(&w.body, nesting_level, lines, arena, recursion);
 
-            finalize_region(
-                &mut result,
+            arena.close_region(
+                region,
                 ComplexityRegion {
                     kind: RegionKind::With,
                     line_start,
@@ -626,17 +1125,20 @@ fn statement_cognitive_complexity_shared(
                     boolean: with_complexity,
                     total: with_complexity,
                     bool_op_count: with_complexity,
-                    children,
                     ..Default::default()
                 },
             );
         }
         Stmt::Expr(e) => {
-            let line = get_line_number(usize::from(e.range.start()), code);
-            count_line_bool_ops(&mut result, vec![*e.value.clone()], line, nesting_level);
+            let line = arena.line(lines, usize::from(e.range.start()));
+            complexity += count_line_bool_ops(arena, [&*e.value], line, nesting_level);
         }
         _ => {}
     }
 
-    result
+    complexity
 }
+
+#[cfg(all(test, feature = "python"))]
+#[path = "tests/cognitive_complexity.rs"]
+mod tests;
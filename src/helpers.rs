@@ -1,2 +1,12 @@
 #[cfg(feature = "python")]
+pub mod clone;
+#[cfg(feature = "python")]
 pub mod exclude;
+#[cfg(feature = "python")]
+pub mod pipeline;
+#[cfg(feature = "python")]
+pub mod results;
+#[cfg(feature = "python")]
+pub mod schedule;
+#[cfg(feature = "python")]
+pub mod stack;
@@ -0,0 +1,154 @@
+use crate::utils::get_repo_name;
+use crossbeam_channel::{Receiver, unbounded};
+use regex::Regex;
+use std::ffi::OsStr;
+use std::path::{Path, PathBuf};
+use std::process::{Command, Stdio};
+use std::sync::OnceLock;
+use std::thread;
+use tempfile::{TempDir, tempdir};
+
+/// Files kept by the sparse checkout: the Python sources plus the ignore
+/// files the walk honours, so a clone is filtered like a local checkout.
+const SPARSE_PATTERNS: [&str; 3] = ["*.py", ".gitignore", ".ignore"];
+
+/// A repository checked out into a temporary directory, removed on drop.
+pub struct ClonedRepo {
+    dir: TempDir,
+    path: PathBuf,
+}
+
+impl ClonedRepo {
+    /// Root of the working tree.
+    pub fn path(&self) -> &Path {
+        &self.path
+    }
+
+    /// Directory holding the working tree; reported paths are made relative
+    /// to it so they start with the repository name.
+    pub fn base(&self) -> &Path {
+        self.dir.path()
+    }
+}
+
+/// Whether `path` names a repository to clone rather than a local tree: a
+/// GitHub or GitLab URL, a `file://` URL, or a local bare repository.
+pub fn is_repo_url(path: &str) -> bool {
+    static REPO_URL_RE: OnceLock<Regex> = OnceLock::new();
+    let re = REPO_URL_RE.get_or_init(|| {
+        Regex::new(r"^(https:\/\/|http:\/\/|www\.|git@)(github|gitlab)\.com(\/[\w.-]+){2,}$")
+            .expect("valid repository pattern")
+    });
+    re.is_match(path) || path.starts_with("file://") || is_bare_repo(Path::new(path))
+}
+
+fn is_bare_repo(path: &Path) -> bool {
+    path.join("HEAD").is_file() && path.join("objects").is_dir() && path.join("refs").is_dir()
+}
+
+/// Shallow-clone `url` into a fresh temporary directory, checking out only
+/// the files analysis needs. Falls back to a plain shallow clone when the
+/// local git rejects the sparse or filter options, and to a full checkout of
+/// the shallow clone when it cannot do a non-cone sparse checkout. Any other
+/// failure, such as a missing repository, returns git's error.
+pub fn clone_repo(url: &str) -> Result<ClonedRepo, String> {
+    let repo_name = get_repo_name(url)
+        .map_err(|_| format!("Repository URL '{}' is missing a final path segment", url))?;
+    let dir = tempdir().map_err(|e| format!("Failed to create a clone directory: {}", e))?;
+    let path = dir.path().join(repo_name);
+
+    let sparse_clone = git([
+        OsStr::new("clone"),
+        OsStr::new("--quiet"),
+        OsStr::new("--depth"),
+        OsStr::new("1"),
+        OsStr::new("--filter=blob:none"),
+        OsStr::new("--sparse"),
+        OsStr::new("--"),
+        OsStr::new(url),
+        path.as_os_str(),
+    ]);
+    match sparse_clone {
+        Ok(()) => {
+            let sparse_set = git([
+                OsStr::new("-C"),
+                path.as_os_str(),
+                OsStr::new("sparse-checkout"),
+                OsStr::new("set"),
+                OsStr::new("--no-cone"),
+            ]
+            .into_iter()
+            .chain(SPARSE_PATTERNS.iter().map(OsStr::new)));
+            if sparse_set.is_err() {
+                git([
+                    OsStr::new("-C"),
+                    path.as_os_str(),
+                    OsStr::new("sparse-checkout"),
+                    OsStr::new("disable"),
+                ])?;
+            }
+        }
+        Err(stderr) if rejects_sparse_options(&stderr) => {
+            if path.exists() {
+                std::fs::remove_dir_all(&path)
+                    .map_err(|e| format!("Failed to reset the clone directory: {}", e))?;
+            }
+            git([
+                OsStr::new("clone"),
+                OsStr::new("--quiet"),
+                OsStr::new("--depth"),
+                OsStr::new("1"),
+                OsStr::new("--"),
+                OsStr::new(url),
+                path.as_os_str(),
+            ])?;
+        }
+        Err(stderr) => return Err(stderr),
+    }
+
+    Ok(ClonedRepo { dir, path })
+}
+
+/// Whether `stderr` is git refusing the `--filter` or `--sparse` options of
+/// `git clone` (git older than 2.25) rather than failing to clone.
+fn rejects_sparse_options(stderr: &str) -> bool {
+    stderr.contains("unknown option") || stderr.contains("usage: git clone")
+}
+
+/// Start cloning every `(index, url)` pair on its own thread. Each result is
+/// sent, tagged with its index, as soon as that clone finishes, so callers
+/// can analyze early clones while the others are still downloading.
+pub fn clone_all(urls: Vec<(usize, String)>) -> Receiver<(usize, Result<ClonedRepo, String>)> {
+    let (tx, rx) = unbounded();
+    for (index, url) in urls {
+        let tx = tx.clone();
+        thread::spawn(move || {
+            let _ = tx.send((index, clone_repo(&url)));
+        });
+    }
+    rx
+}
+
+/// Run git to completion, with prompts disabled so a private or missing
+/// repository fails instead of waiting for credentials.
+fn git<I, S>(args: I) -> Result<(), String>
+where
+    I: IntoIterator<Item = S>,
+    S: AsRef<OsStr>,
+{
+    let output = Command::new("git")
+        .args(args)
+        .env("GIT_TERMINAL_PROMPT", "0")
+        .stdin(Stdio::null())
+        .output()
+        .map_err(|e| format!("Failed to run git: {}", e))?;
+    if output.status.success() {
+        Ok(())
+    } else {
+        Err(String::from_utf8_lossy(&output.stderr).trim().to_string())
+    }
+}
+
+#[cfg(test)]
+#[path = "../tests/helpers/clone.rs"]
+mod tests;
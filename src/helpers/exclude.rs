@@ -1,53 +1,191 @@
-use ignore::Walk;
-use wax::walk::{Entry, FileIterator};
-use wax::{Glob, any};
+use globset::{Glob, GlobBuilder, GlobSet, GlobSetBuilder};
+use ignore::{DirEntry, WalkBuilder, WalkState};
+use std::fs;
+use std::path::Path;
+use std::sync::Mutex;
 
+/// Compiled `--exclude` patterns.
+///
+/// Patterns are matched against paths relative to the walk root (`*` never
+/// crosses a `/`). A directory matched by a pattern, or by the directory part
+/// of a `dir/**` pattern, is pruned instead of descended into.
+pub struct PathFilter {
+    file_excludes: GlobSet,
+    dir_excludes: GlobSet,
+    shard: Option<Shard>,
+}
+
+impl PathFilter {
+    pub fn new(to_exclude_paths: &[String]) -> Result<Self, String> {
+        let normalized_excludes: Vec<String> = to_exclude_paths
+            .iter()
+            .map(|s| s.replace('\\', "/"))
+            .collect();
+        let file_excludes = build_glob_set(normalized_excludes.iter().map(String::as_str))
+            .map_err(|e| format!("Failed to apply exclude patterns: {}", e))?;
+        let dir_excludes = build_glob_set(
+            normalized_excludes
+                .iter()
+                .map(|s| s.strip_suffix("/**").unwrap_or(s)),
+        )
+        .map_err(|e| format!("Failed to apply exclude patterns: {}", e))?;
+        Ok(PathFilter {
+            file_excludes,
+            dir_excludes,
+            shard: None,
+        })
+    }
+
+    /// Keep only the files of `shard`.
+    pub fn with_shard(mut self, shard: Option<Shard>) -> Self {
+        self.shard = shard;
+        self
+    }
+}
+
+/// One of `count` disjoint slices of the files of a run, for splitting a run
+/// across machines. Files are assigned by a 64-bit FNV-1a hash of their
+/// `/`-separated path relative to the analyzed directory, so the split only
+/// depends on the tree and is the same on every node.
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub struct Shard {
+    index: u64,
+    count: u64,
+}
+
+impl Shard {
+    /// Shard `index` (1-based) of `count`.
+    pub fn new(index: usize, count: usize) -> Result<Self, String> {
+        if count == 0 || index == 0 || index > count {
+            return Err(format!(
+                "Invalid shard {}/{}, expected INDEX/COUNT with 1 <= INDEX <= COUNT",
+                index, count
+            ));
+        }
+        Ok(Shard {
+            index: index as u64,
+            count: count as u64,
+        })
+    }
+
+    pub fn contains(&self, relative: &str) -> bool {
+        fnv1a(relative.as_bytes()) % self.count == self.index - 1
+    }
+}
+
+fn fnv1a(bytes: &[u8]) -> u64 {
+    bytes.iter().fold(0xcbf2_9ce4_8422_2325, |hash, &byte| {
+        (hash ^ byte as u64).wrapping_mul(0x0000_0100_0000_01b3)
+    })
+}
+
+/// A Python file found by [`walk_python_files`].
+pub struct DiscoveredFile {
+    /// Absolute, `/`-separated path.
+    pub path: String,
+    entry: DirEntry,
+}
+
+impl DiscoveredFile {
+    /// Size in bytes, taken from the walk's own metadata when it describes
+    /// the file itself (not a symlink to it).
+    pub fn size(&self) -> u64 {
+        match self.entry.metadata() {
+            Ok(metadata) if metadata.is_file() => metadata.len(),
+            _ => fs::metadata(&self.path).map(|m| m.len()).unwrap_or(0),
+        }
+    }
+}
+
+/// Discover the Python files under `root_path` and return them sorted.
+/// Returned paths are absolute and `/`-separated.
 pub fn get_paths_to_process(
     root_path: &str,
     to_exclude_paths: Vec<String>,
 ) -> Result<Vec<String>, String> {
-    let mut files_paths: Vec<String> = Vec::new();
-    let glob = Glob::new("**/*.py").unwrap();
-
-    let normalized_root = root_path.replace('\\', "/");
-    let normalized_excludes: Vec<String> = to_exclude_paths
-        .iter()
-        .map(|s| s.replace('\\', "/"))
-        .collect();
-
-    let gitignore_walk = Walk::new(&normalized_root);
-    let non_ignored: Vec<String> = gitignore_walk
-        .filter_map(|result| match result {
-            Ok(entry) => entry.path().to_str().map(|s| s.replace('\\', "/")),
-            Err(_) => None,
-        })
-        .collect();
-
-    let exclude_refs: Vec<&str> = normalized_excludes.iter().map(|s| s.as_str()).collect();
+    let filter = PathFilter::new(&to_exclude_paths)?;
+    let found = Mutex::new(Vec::new());
+    walk_python_files(root_path, &filter, |file| {
+        if let Ok(mut found) = found.lock() {
+            found.push(file.path);
+        }
+    });
+    let mut files_paths = found.into_inner().unwrap_or_default();
+    files_paths.sort_unstable();
+    Ok(files_paths)
+}
 
-    let non_excluded_entries = glob
-        .walk(&normalized_root)
-        .not(any(exclude_refs))
-        .map_err(|e| format!("Failed to apply exclude patterns: {}", e))?;
+/// Stream every Python file under `root_path` to `on_file` from a single
+/// parallel walk that applies gitignore rules, the `*.py` filter and
+/// `filter` (excludes and shard) together. `on_file` is called from the
+/// walker threads in no particular order, with absolute `/`-separated paths.
+pub fn walk_python_files<F>(root_path: &str, filter: &PathFilter, on_file: F)
+where
+    F: Fn(DiscoveredFile) + Sync,
+{
+    let root = Path::new(root_path)
+        .canonicalize()
+        .unwrap_or_else(|_| Path::new(root_path).to_path_buf());
 
-    for entry in non_excluded_entries
-        .filter_map(|entry| entry.ok())
-        .filter(|entry| {
-            entry
+    WalkBuilder::new(&root).build_parallel().run(|| {
+        let root = &root;
+        let on_file = &on_file;
+        Box::new(move |result| {
+            let Ok(entry) = result else {
+                return WalkState::Continue;
+            };
+            if entry.depth() == 0 {
+                return WalkState::Continue;
+            }
+            let Some(file_type) = entry.file_type() else {
+                return WalkState::Continue;
+            };
+            let relative = entry
                 .path()
-                .to_str()
-                .map(|s| non_ignored.contains(&s.replace('\\', "/")))
-                .unwrap_or(false)
+                .strip_prefix(root)
+                .unwrap_or(entry.path())
+                .to_string_lossy()
+                .replace('\\', "/");
+
+            if file_type.is_dir() {
+                if filter.dir_excludes.is_match(&relative) {
+                    return WalkState::Skip;
+                }
+                return WalkState::Continue;
+            }
+
+            if !relative.ends_with(".py") || filter.file_excludes.is_match(&relative) {
+                return WalkState::Continue;
+            }
+            if filter.shard.is_some_and(|shard| !shard.contains(&relative)) {
+                return WalkState::Continue;
+            }
+            if file_type.is_file() {
+                let path = entry.path().to_string_lossy().replace('\\', "/");
+                on_file(DiscoveredFile { path, entry });
+            } else if let Ok(target) = entry.path().canonicalize()
+                && target.is_file()
+            {
+                let path = target.to_string_lossy().replace('\\', "/");
+                on_file(DiscoveredFile { path, entry });
+            }
+            WalkState::Continue
         })
-    {
-        let entry_path = entry.path();
-        let file_abs = match entry_path.canonicalize() {
-            Ok(p) => p,
-            Err(_) => entry_path.to_path_buf(),
-        };
-        let file_abs_str = file_abs.to_string_lossy().replace('\\', "/");
-        files_paths.push(file_abs_str);
+    });
+}
+
+fn build_glob_set<'a>(patterns: impl Iterator<Item = &'a str>) -> Result<GlobSet, globset::Error> {
+    let mut builder = GlobSetBuilder::new();
+    for pattern in patterns {
+        builder.add(compile_glob(pattern)?);
     }
+    builder.build()
+}
 
-    Ok(files_paths)
+fn compile_glob(pattern: &str) -> Result<Glob, globset::Error> {
+    GlobBuilder::new(pattern).literal_separator(true).build()
 }
+
+#[cfg(test)]
+#[path = "../tests/helpers/exclude.rs"]
+mod tests;
@@ -0,0 +1,307 @@
+use crate::helpers::exclude::{PathFilter, walk_python_files};
+use crate::helpers::schedule::{CostHistory, FileCost, Schedule};
+use crate::helpers::stack::{ANALYSIS_STACK_SIZE, mark_analysis_stack};
+use crossbeam_channel::{Receiver, Sender, TryRecvError, TrySendError, bounded};
+use std::fmt;
+use std::io;
+use std::sync::Mutex;
+use std::sync::atomic::{AtomicU64, AtomicUsize, Ordering};
+use std::thread;
+use std::time::{Duration, Instant};
+
+pub const DEFAULT_PATH_QUEUE_DEPTH: usize = 1024;
+pub const DEFAULT_READ_QUEUE_DEPTH: usize = 64;
+const MIN_FILES_PER_JOB: usize = 4;
+
+/// Tuning knobs of a directory run.
+pub struct PipelineOptions {
+    /// Requested number of reader and analysis threads; `None` uses the core count.
+    pub jobs: Option<usize>,
+    /// Capacity of the queue between discovery and the reader threads.
+    pub path_queue_depth: usize,
+    /// Capacity of the queue of file contents waiting to be analyzed.
+    pub read_queue_depth: usize,
+    /// Order in which discovered files are queued for reading.
+    pub schedule: Schedule,
+}
+
+/// Outcome of [`run_pipeline`].
+pub struct PipelineRun<T> {
+    /// One entry per discovered file, in no particular order.
+    pub results: Vec<Result<T, String>>,
+    /// Measured analysis time of every file that was read.
+    pub costs: Vec<FileCost>,
+    pub stats: PipelineStats,
+}
+
+/// Where each stage of a directory run spent its time blocked. Durations are
+/// summed over all the threads of a stage.
+pub struct PipelineStats {
+    pub files: usize,
+    pub jobs: usize,
+    pub elapsed: Duration,
+    /// Discovery waiting on a full path queue (readers falling behind).
+    pub discovery_stalled: Duration,
+    /// Readers waiting on an empty path queue (discovery falling behind).
+    pub read_starved: Duration,
+    /// Readers waiting on a full read queue (analysis falling behind).
+    pub read_stalled: Duration,
+    /// Analysis waiting on an empty read queue (reads falling behind).
+    pub analysis_starved: Duration,
+}
+
+impl fmt::Display for PipelineStats {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        writeln!(
+            f,
+            "pipeline: {} files, {} jobs, {:.3}s",
+            self.files,
+            self.jobs,
+            self.elapsed.as_secs_f64()
+        )?;
+        writeln!(
+            f,
+            "  discovery  stalled {:.3}s on a full path queue",
+            self.discovery_stalled.as_secs_f64()
+        )?;
+        writeln!(
+            f,
+            "  read       starved {:.3}s, stalled {:.3}s on a full read queue",
+            self.read_starved.as_secs_f64(),
+            self.read_stalled.as_secs_f64()
+        )?;
+        write!(
+            f,
+            "  analysis   starved {:.3}s",
+            self.analysis_starved.as_secs_f64()
+        )
+    }
+}
+
+/// Accumulates the time threads spend blocked on a queue. Only waits that
+/// actually block are timed, so the uncontended path costs one `try_*` call.
+#[derive(Default)]
+struct StallClock(AtomicU64);
+
+impl StallClock {
+    fn send<T>(&self, tx: &Sender<T>, item: T) -> bool {
+        match tx.try_send(item) {
+            Ok(()) => true,
+            Err(TrySendError::Disconnected(_)) => false,
+            Err(TrySendError::Full(item)) => {
+                let start = Instant::now();
+                let sent = tx.send(item).is_ok();
+                self.add(start.elapsed());
+                sent
+            }
+        }
+    }
+
+    fn recv<T>(&self, rx: &Receiver<T>) -> Option<T> {
+        match rx.try_recv() {
+            Ok(item) => Some(item),
+            Err(TryRecvError::Disconnected) => None,
+            Err(TryRecvError::Empty) => {
+                let start = Instant::now();
+                let item = rx.recv().ok();
+                self.add(start.elapsed());
+                item
+            }
+        }
+    }
+
+    fn add(&self, elapsed: Duration) {
+        self.0
+            .fetch_add(elapsed.as_nanos() as u64, Ordering::Relaxed);
+    }
+
+    fn total(&self) -> Duration {
+        Duration::from_nanos(self.0.load(Ordering::Relaxed))
+    }
+}
+
+/// Analyze every Python file under `root_path` in three overlapping stages:
+/// discovery streams paths into a bounded queue, reader threads prefetch the
+/// file contents into a second bounded queue, and analysis workers consume
+/// the buffers. Workers run on [`ANALYSIS_STACK_SIZE`] stacks, so deeply
+/// nested files cannot exhaust them.
+///
+/// With [`Schedule::LargestFirst`] discovery completes the walk before
+/// queueing anything and hands files out by estimated cost from `history`
+/// (falling back to file size from the walk metadata).
+///
+/// One reader and one worker start right away; the rest are added once
+/// discovery has found enough files to keep them busy (or has finished), so
+/// tiny inputs never spin up threads they cannot use. `on_discovered` is
+/// called once per discovered file. Files that cannot be read, and files for
+/// which `analyze` fails, are reported as `Err(path)`.
+pub fn run_pipeline<T, D, F>(
+    root_path: &str,
+    filter: &PathFilter,
+    options: &PipelineOptions,
+    history: &CostHistory,
+    on_discovered: D,
+    analyze: F,
+) -> PipelineRun<T>
+where
+    T: Send,
+    D: Fn() + Sync,
+    F: Fn(&str, String) -> Result<T, String> + Sync,
+{
+    let started = Instant::now();
+    let max_jobs = resolve_jobs(options.jobs, usize::MAX);
+    let sizing_threshold = max_jobs.saturating_mul(MIN_FILES_PER_JOB);
+
+    let (path_tx, path_rx) = bounded::<String>(options.path_queue_depth.max(1));
+    let (source_tx, source_rx) =
+        bounded::<(String, io::Result<String>)>(options.read_queue_depth.max(1));
+    let (sizing_tx, sizing_rx) = bounded::<usize>(1);
+
+    let discovered = AtomicUsize::new(0);
+    let queued = AtomicUsize::new(0);
+    let discovery_stall = StallClock::default();
+    let read_starve = StallClock::default();
+    let read_stall = StallClock::default();
+    let analysis_starve = StallClock::default();
+
+    let (results, costs, jobs) = thread::scope(|scope| {
+        // Owned here so they can be dropped once every reader and worker holds
+        // its own clone: a stage that dies then disconnects the stage feeding it.
+        let path_rx = path_rx;
+        let source_rx = source_rx;
+        let discovered = &discovered;
+        let queued = &queued;
+        let discovery_stall = &discovery_stall;
+        let on_discovered = &on_discovered;
+        scope.spawn(move || {
+            let enqueue = |path: String| {
+                let seen = queued.fetch_add(1, Ordering::Relaxed) + 1;
+                discovery_stall.send(&path_tx, path);
+                if seen == sizing_threshold {
+                    let _ = sizing_tx.try_send(seen);
+                }
+            };
+            match options.schedule {
+                Schedule::Discovery => walk_python_files(root_path, filter, |file| {
+                    discovered.fetch_add(1, Ordering::Relaxed);
+                    on_discovered();
+                    enqueue(file.path);
+                }),
+                Schedule::LargestFirst => {
+                    let found = Mutex::new(Vec::new());
+                    walk_python_files(root_path, filter, |file| {
+                        discovered.fetch_add(1, Ordering::Relaxed);
+                        on_discovered();
+                        let size = file.size();
+                        if let Ok(mut found) = found.lock() {
+                            found.push((file.path, size));
+                        }
+                    });
+                    let mut files = found.into_inner().unwrap_or_default();
+                    history.order_largest_first(&mut files);
+                    files.into_iter().for_each(|(path, _)| enqueue(path));
+                }
+            }
+            let _ = sizing_tx.try_send(queued.load(Ordering::Relaxed));
+        });
+
+        let spawn_reader = |source_tx: Sender<(String, io::Result<String>)>| {
+            let path_rx = path_rx.clone();
+            let read_starve = &read_starve;
+            let read_stall = &read_stall;
+            scope.spawn(move || {
+                while let Some(path) = read_starve.recv(&path_rx) {
+                    let source = std::fs::read_to_string(&path);
+                    if !read_stall.send(&source_tx, (path, source)) {
+                        break;
+                    }
+                }
+            });
+        };
+        let spawn_worker = || {
+            let source_rx = source_rx.clone();
+            let analysis_starve = &analysis_starve;
+            let analyze = &analyze;
+            let worker = move || {
+                mark_analysis_stack();
+                let mut results = Vec::new();
+                let mut costs = Vec::new();
+                while let Some((path, source)) = analysis_starve.recv(&source_rx) {
+                    let Ok(code) = source else {
+                        results.push(Err(path));
+                        continue;
+                    };
+                    let bytes = code.len() as u64;
+                    let start = Instant::now();
+                    results.push(analyze(&path, code));
+                    costs.push(FileCost {
+                        path,
+                        bytes,
+                        nanos: start.elapsed().as_nanos() as u64,
+                    });
+                }
+                (results, costs)
+            };
+            thread::Builder::new()
+                .stack_size(ANALYSIS_STACK_SIZE)
+                .spawn_scoped(scope, worker)
+                .expect("failed to spawn an analysis thread")
+        };
+
+        spawn_reader(source_tx.clone());
+        let mut workers = vec![spawn_worker()];
+
+        let sized_on = sizing_rx.recv().unwrap_or(0);
+        let jobs = max_jobs
+            .min(sized_on.div_ceil(MIN_FILES_PER_JOB))
+            .max(1);
+        for _ in 1..jobs {
+            spawn_reader(source_tx.clone());
+            workers.push(spawn_worker());
+        }
+        drop(source_tx);
+        drop(path_rx);
+        drop(source_rx);
+
+        let mut results = Vec::new();
+        let mut costs = Vec::new();
+        for worker in workers {
+            let (mut worker_results, mut worker_costs) = worker
+                .join()
+                .unwrap_or_else(|panic| std::panic::resume_unwind(panic));
+            results.append(&mut worker_results);
+            costs.append(&mut worker_costs);
+        }
+        (results, costs, jobs)
+    });
+
+    let stats = PipelineStats {
+        files: discovered.load(Ordering::Relaxed),
+        jobs,
+        elapsed: started.elapsed(),
+        discovery_stalled: discovery_stall.total(),
+        read_starved: read_starve.total(),
+        read_stalled: read_stall.total(),
+        analysis_starved: analysis_starve.total(),
+    };
+    PipelineRun {
+        results,
+        costs,
+        stats,
+    }
+}
+
+/// Number of worker threads for a run over `work_items` files: the requested
+/// count (or the core count when unset), never more than one thread per
+/// `MIN_FILES_PER_JOB` files so tiny inputs stay on a single thread.
+pub fn resolve_jobs(requested: Option<usize>, work_items: usize) -> usize {
+    let available = thread::available_parallelism()
+        .map(|n| n.get())
+        .unwrap_or(1);
+    let jobs = requested.filter(|&jobs| jobs > 0).unwrap_or(available);
+    jobs.min(work_items.div_ceil(MIN_FILES_PER_JOB)).max(1)
+}
+
+#[cfg(test)]
+#[path = "../tests/helpers/pipeline.rs"]
+mod tests;
@@ -0,0 +1,194 @@
+use crate::classes::{FileComplexity, FunctionComplexity, LineComplexities, RefactorPlan};
+use serde::Deserialize;
+use serde::de::{Deserializer, SeqAccess, Visitor};
+use std::collections::HashMap;
+use std::fmt;
+use std::fs::File;
+use std::io::BufReader;
+
+/// Which parts of the result files are kept while merging.
+#[derive(Default)]
+pub struct MergeOptions {
+    /// Keep the refactor plans of JSON rows.
+    pub keep_plans: bool,
+    /// Keep only functions whose complexity exceeds this value.
+    pub max_complexity: Option<u64>,
+}
+
+/// One element of a result file: a function row written by `output_json`,
+/// or a file entry of a snapshot written by `create_snapshot_file`.
+#[derive(Deserialize)]
+struct ResultRecord {
+    path: String,
+    file_name: String,
+    function_name: Option<String>,
+    #[serde(default)]
+    complexity: u64,
+    line_start: Option<u64>,
+    line_end: Option<u64>,
+    #[serde(default)]
+    refactor_plans: Vec<RefactorPlan>,
+    #[serde(default)]
+    functions: Vec<SnapshotFunction>,
+}
+
+#[derive(Deserialize)]
+struct SnapshotFunction {
+    name: String,
+    complexity: u64,
+}
+
+/// `FileComplexity` entries rebuilt from any number of result files.
+///
+/// A file reported by several inputs keeps the functions of the last input
+/// that reported it, so merging a report with a newer one for the same
+/// files never duplicates functions.
+#[derive(Default)]
+pub struct MergedResults {
+    files: Vec<FileComplexity>,
+    /// `(path, file_name)` -> index in `files`.
+    index: HashMap<(String, String), usize>,
+}
+
+impl MergedResults {
+    /// Stream the JSON array in `path` one element at a time, so the input
+    /// is never held in memory as a whole. Its rows are only merged once the
+    /// whole file has parsed; an input that fails partway adds nothing.
+    pub fn read_file(&mut self, path: &str, options: &MergeOptions) -> Result<(), String> {
+        let file =
+            File::open(path).map_err(|e| format!("Failed to read results {}: {}", path, e))?;
+        let mut deserializer = serde_json::Deserializer::from_reader(BufReader::new(file));
+        let mut rows = MergedResults::default();
+        deserializer
+            .deserialize_seq(RecordSink {
+                rows: &mut rows,
+                options,
+            })
+            .and_then(|()| deserializer.end())
+            .map_err(|e| format!("Failed to parse results {}: {}", path, e))?;
+        self.absorb(rows);
+        Ok(())
+    }
+
+    /// The merged files sorted by path, like the output of an analysis run.
+    pub fn into_files(self) -> Vec<FileComplexity> {
+        let mut files: Vec<FileComplexity> = self
+            .files
+            .into_iter()
+            .filter(|file| !file.functions.is_empty())
+            .map(|mut file| {
+                file.functions
+                    .sort_by_key(|f| (f.complexity, f.name.clone()));
+                file.complexity = file.functions.iter().map(|f| f.complexity).sum();
+                file
+            })
+            .collect();
+        files.sort_by(|a, b| (&a.path, &a.file_name).cmp(&(&b.path, &b.file_name)));
+        files
+    }
+
+    /// Add one element of an input to the rows read from it, keeping the
+    /// files left without functions so they still replace earlier inputs.
+    fn add(&mut self, record: ResultRecord, options: &MergeOptions) {
+        let mut functions: Vec<FunctionComplexity> = match record.function_name {
+            Some(name) => vec![function(
+                name,
+                record.complexity,
+                record.line_start,
+                record.line_end,
+                if options.keep_plans {
+                    record.refactor_plans
+                } else {
+                    Vec::new()
+                },
+            )],
+            None => record
+                .functions
+                .into_iter()
+                .map(|f| function(f.name, f.complexity, None, None, Vec::new()))
+                .collect(),
+        };
+        if let Some(max_complexity) = options.max_complexity {
+            functions.retain(|f| f.complexity > max_complexity);
+        }
+
+        let key = (record.path, record.file_name);
+        let slot = match self.index.get(&key) {
+            Some(&slot) => slot,
+            None => {
+                self.files.push(FileComplexity {
+                    path: key.0.clone(),
+                    file_name: key.1.clone(),
+                    functions: Vec::new(),
+                    complexity: 0,
+                });
+                self.index.insert(key, self.files.len() - 1);
+                self.files.len() - 1
+            }
+        };
+        self.files[slot].functions.append(&mut functions);
+    }
+
+    /// Merge the rows of one fully parsed input, replacing the functions
+    /// earlier inputs reported for the same files.
+    fn absorb(&mut self, rows: MergedResults) {
+        for file in rows.files {
+            let key = (file.path.clone(), file.file_name.clone());
+            match self.index.get(&key) {
+                Some(&slot) => self.files[slot].functions = file.functions,
+                None if file.functions.is_empty() => {}
+                None => {
+                    self.index.insert(key, self.files.len());
+                    self.files.push(file);
+                }
+            }
+        }
+    }
+}
+
+/// Snapshots (and JSON reports written before line numbers were added) carry
+/// no lines; a missing line points at the top of the file so SARIF and
+/// GitLab locations stay valid.
+fn function(
+    name: String,
+    complexity: u64,
+    line_start: Option<u64>,
+    line_end: Option<u64>,
+    refactor_plans: Vec<RefactorPlan>,
+) -> FunctionComplexity {
+    let line_start = line_start.unwrap_or(1);
+    FunctionComplexity {
+        name,
+        complexity,
+        line_start,
+        line_end: line_end.unwrap_or(line_start),
+        line_complexities: LineComplexities::default(),
+        refactor_plans,
+        additional_refactor_plans: 0,
+        deferred_plans: None,
+    }
+}
+
+struct RecordSink<'a> {
+    rows: &'a mut MergedResults,
+    options: &'a MergeOptions,
+}
+
+impl<'de> Visitor<'de> for RecordSink<'_> {
+    type Value = ();
+
+    fn expecting(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        f.write_str("a JSON array of complexipy results")
+    }
+
+    fn visit_seq<A: SeqAccess<'de>>(self, mut seq: A) -> Result<(), A::Error> {
+        while let Some(record) = seq.next_element::<ResultRecord>()? {
+            self.rows.add(record, self.options);
+        }
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+#[path = "../tests/helpers/results.rs"]
+mod tests;
@@ -0,0 +1,143 @@
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::fs;
+use std::io::{self, Write};
+use std::path::Path;
+use tempfile::NamedTempFile;
+
+const COST_HISTORY_VERSION: u32 = 1;
+
+/// Order in which discovered files are handed to the readers.
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum Schedule {
+    /// Stream files as the walk finds them.
+    Discovery,
+    /// Finish the walk, then hand out the most expensive files first
+    /// (longest-processing-time-first) so a huge module picked up last
+    /// cannot set the run's wall time.
+    LargestFirst,
+}
+
+impl Schedule {
+    pub fn parse(value: &str) -> Result<Self, String> {
+        match value {
+            "discovery" => Ok(Schedule::Discovery),
+            "largest-first" => Ok(Schedule::LargestFirst),
+            other => Err(format!(
+                "Unknown schedule '{}', expected 'discovery' or 'largest-first'",
+                other
+            )),
+        }
+    }
+}
+
+/// Measured analysis time of one file.
+pub struct FileCost {
+    pub path: String,
+    pub bytes: u64,
+    pub nanos: u64,
+}
+
+#[derive(Clone, Copy, Serialize, Deserialize)]
+struct CostEntry {
+    bytes: u64,
+    nanos: u64,
+}
+
+/// Per-file analysis times from previous runs, keyed by absolute path and
+/// persisted as JSON in the cache directory.
+#[derive(Serialize, Deserialize)]
+pub struct CostHistory {
+    version: u32,
+    files: HashMap<String, CostEntry>,
+}
+
+impl Default for CostHistory {
+    fn default() -> Self {
+        CostHistory {
+            version: COST_HISTORY_VERSION,
+            files: HashMap::new(),
+        }
+    }
+}
+
+impl CostHistory {
+    /// Load the history at `path`; a missing, unreadable or outdated file
+    /// yields an empty history.
+    pub fn load(path: &Path) -> Self {
+        fs::read(path)
+            .ok()
+            .and_then(|raw| serde_json::from_slice::<CostHistory>(&raw).ok())
+            .filter(|history| history.version == COST_HISTORY_VERSION)
+            .unwrap_or_default()
+    }
+
+    /// Write the history to `path` through a uniquely named temporary file
+    /// in the same directory, so concurrent runs never observe a truncated
+    /// file or write into each other's temporary file.
+    pub fn save(&self, path: &Path) -> io::Result<()> {
+        let payload = serde_json::to_vec(self).map_err(io::Error::other)?;
+        let dir = path
+            .parent()
+            .filter(|dir| !dir.as_os_str().is_empty())
+            .unwrap_or(Path::new("."));
+        let mut tmp = NamedTempFile::new_in(dir)?;
+        tmp.write_all(&payload)?;
+        tmp.persist(path).map(drop).map_err(|err| err.error)
+    }
+
+    /// Replace the history with the costs measured in this run, so files
+    /// that were deleted or are no longer analyzed do not accumulate.
+    pub fn record(&mut self, costs: impl IntoIterator<Item = FileCost>) {
+        self.files = costs
+            .into_iter()
+            .map(|cost| {
+                let entry = CostEntry {
+                    bytes: cost.bytes,
+                    nanos: cost.nanos,
+                };
+                (cost.path, entry)
+            })
+            .collect();
+    }
+
+    /// Order `files` (path, size in bytes) by estimated cost, most expensive
+    /// first. Files with history are estimated from their measured time,
+    /// scaled by how much they grew or shrank; new files are estimated from
+    /// their size at the average measured nanoseconds per byte. Ties keep
+    /// path order so the schedule is deterministic.
+    pub fn order_largest_first(&self, files: &mut [(String, u64)]) {
+        let nanos_per_byte = self.nanos_per_byte();
+        let estimate = |path: &str, bytes: u64| -> f64 {
+            match self.files.get(path) {
+                Some(entry) if entry.bytes > 0 => {
+                    entry.nanos as f64 * bytes as f64 / entry.bytes as f64
+                }
+                _ => bytes as f64 * nanos_per_byte,
+            }
+        };
+        files.sort_by(|(a_path, a_bytes), (b_path, b_bytes)| {
+            estimate(b_path, *b_bytes)
+                .total_cmp(&estimate(a_path, *a_bytes))
+                .then_with(|| a_path.cmp(b_path))
+        });
+    }
+
+    fn nanos_per_byte(&self) -> f64 {
+        let (bytes, nanos) = self
+            .files
+            .values()
+            .fold((0u128, 0u128), |(bytes, nanos), entry| {
+                (bytes + entry.bytes as u128, nanos + entry.nanos as u128)
+            });
+        if bytes == 0 {
+            1.0
+        } else {
+            nanos as f64 / bytes as f64
+        }
+    }
+}
+
+#[cfg(test)]
+#[path = "../tests/helpers/schedule.rs"]
+mod tests;
@@ -0,0 +1,63 @@
+use std::cell::Cell;
+use std::thread;
+
+/// Stack reserved for every thread that parses or walks a module. Parsing
+/// and the complexity walk recurse once per nesting level, so generated code
+/// nested thousands of levels deep needs far more than the 2 MiB that
+/// spawned threads get by default. Only the pages a walk touches are ever
+/// committed; 32-bit targets reserve less to keep address space for the
+/// other threads.
+pub const ANALYSIS_STACK_SIZE: usize = if cfg!(target_pointer_width = "64") {
+    256 * 1024 * 1024
+} else {
+    32 * 1024 * 1024
+};
+
+thread_local! {
+    /// Set on threads started with an [`ANALYSIS_STACK_SIZE`] stack.
+    static ON_ANALYSIS_STACK: Cell<bool> = const { Cell::new(false) };
+}
+
+/// Record that the current thread runs on an [`ANALYSIS_STACK_SIZE`] stack.
+pub fn mark_analysis_stack() {
+    ON_ANALYSIS_STACK.with(|flag| flag.set(true));
+}
+
+/// Run `f` on an [`ANALYSIS_STACK_SIZE`] stack: right here when the current
+/// thread already has one, otherwise on a scoped thread that is joined
+/// before returning. A panic in `f` is resumed on the caller.
+pub fn on_analysis_stack<T: Send>(f: impl FnOnce() -> T + Send) -> T {
+    if ON_ANALYSIS_STACK.with(Cell::get) {
+        return f();
+    }
+    thread::scope(|scope| {
+        thread::Builder::new()
+            .name("complexipy-analysis".to_string())
+            .stack_size(ANALYSIS_STACK_SIZE)
+            .spawn_scoped(scope, || {
+                mark_analysis_stack();
+                f()
+            })
+            .expect("failed to spawn an analysis thread")
+            .join()
+            .unwrap_or_else(|panic| std::panic::resume_unwind(panic))
+    })
+}
+
+/// A rayon pool builder whose threads get [`ANALYSIS_STACK_SIZE`] stacks.
+pub fn analysis_pool() -> rayon::ThreadPoolBuilder {
+    rayon::ThreadPoolBuilder::new()
+        .stack_size(ANALYSIS_STACK_SIZE)
+        .start_handler(|_| mark_analysis_stack())
+}
+
+/// Give the global rayon pool, which large modules fan out on when no other
+/// pool is installed, analysis-sized stacks. Does nothing if the pool has
+/// already been started.
+pub fn init_global_analysis_pool() {
+    let _ = analysis_pool().build_global();
+}
+
+#[cfg(test)]
+#[path = "../tests/helpers/stack.rs"]
+mod tests;
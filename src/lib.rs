@@ -1,6 +1,8 @@
 mod classes;
 pub(crate) mod cognitive_complexity;
 mod helpers;
+#[cfg(any(feature = "python", feature = "wasm"))]
+mod line_index;
 mod refactor_plans;
 mod rules;
 #[cfg(feature = "python")]
@@ -20,19 +22,26 @@ use pyo3::prelude::*;
 mod _complexipy {
     use super::classes::{
         Applicability, CodeComplexity, CodeSuggestion, FileComplexity, FunctionComplexity,
-        IgnoredLocation, LineComplexity, RefactorPlan, RemovableIgnore, RuleCategory,
+        IgnoredLocation, LineComplexities, LineComplexity, RefactorPlan, RemovableIgnore,
+        RuleCategory,
     };
     use super::cognitive_complexity::code_complexity;
+    use super::helpers::stack::init_global_analysis_pool;
     use super::runner::{
-        collect_all_ignored_locations, collect_removable_ignored_locations, file_complexity, main,
+        collect_all_ignored_locations, collect_removable_ignored_locations, discover_files,
+        file_complexity, main,
+    };
+    use super::utils::{
+        create_snapshot_file, load_result_files, load_snapshot_file, output_csv, output_json,
     };
-    use super::utils::{create_snapshot_file, load_snapshot_file, output_csv, output_json};
     use pyo3::prelude::*;
 
     #[pymodule_init]
     fn init(m: &Bound<'_, PyModule>) -> PyResult<()> {
+        init_global_analysis_pool();
         m.add_function(wrap_pyfunction!(main, m)?)?;
         m.add_function(wrap_pyfunction!(file_complexity, m)?)?;
+        m.add_function(wrap_pyfunction!(discover_files, m)?)?;
         m.add_function(wrap_pyfunction!(code_complexity, m)?)?;
         m.add_function(wrap_pyfunction!(collect_all_ignored_locations, m)?)?;
         m.add_function(wrap_pyfunction!(collect_removable_ignored_locations, m)?)?;
@@ -40,12 +49,14 @@ mod _complexipy {
         m.add_function(wrap_pyfunction!(output_json, m)?)?;
         m.add_function(wrap_pyfunction!(create_snapshot_file, m)?)?;
         m.add_function(wrap_pyfunction!(load_snapshot_file, m)?)?;
+        m.add_function(wrap_pyfunction!(load_result_files, m)?)?;
         m.add_class::<Applicability>()?;
         m.add_class::<CodeComplexity>()?;
         m.add_class::<CodeSuggestion>()?;
         m.add_class::<FileComplexity>()?;
         m.add_class::<FunctionComplexity>()?;
         m.add_class::<IgnoredLocation>()?;
+        m.add_class::<LineComplexities>()?;
         m.add_class::<LineComplexity>()?;
         m.add_class::<RefactorPlan>()?;
         m.add_class::<RemovableIgnore>()?;
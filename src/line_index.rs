@@ -0,0 +1,85 @@
+use std::ops::Range;
+
+/// Line starts of a source file, found once so that line and column lookups
+/// are a binary search instead of a rescan of everything before the offset.
+pub struct LineIndex<'a> {
+    source: &'a str,
+    /// Byte offset at which each line starts; always begins with 0.
+    line_starts: Vec<usize>,
+}
+
+impl<'a> LineIndex<'a> {
+    pub fn new(source: &'a str) -> Self {
+        let mut line_starts = Vec::with_capacity(source.len() / 32 + 1);
+        line_starts.push(0);
+        line_starts.extend(memchr::memchr_iter(b'\n', source.as_bytes()).map(|i| i + 1));
+        LineIndex {
+            source,
+            line_starts,
+        }
+    }
+
+    pub fn source(&self) -> &'a str {
+        self.source
+    }
+
+    /// 1-based line of the byte at `offset`.
+    pub fn line_number(&self, offset: usize) -> u64 {
+        self.line_starts.partition_point(|&start| start <= offset) as u64
+    }
+
+    /// 1-based column of the byte at `offset`, counted in characters.
+    pub fn column_number(&self, offset: usize) -> u64 {
+        let line_start = self.line_starts[self.line_number(offset) as usize - 1];
+        let prefix = &self.source[line_start..offset];
+        let width = if prefix.is_ascii() {
+            prefix.len()
+        } else {
+            prefix.chars().count()
+        };
+        (width + 1) as u64
+    }
+
+    /// Number of lines, counted like `str::lines`: a trailing newline does
+    /// not start another line.
+    pub fn line_count(&self) -> usize {
+        if self.source.ends_with('\n') {
+            self.line_starts.len() - 1
+        } else if self.source.is_empty() {
+            0
+        } else {
+            self.line_starts.len()
+        }
+    }
+
+    /// The 0-based line `idx` without its line ending, like the `idx`-th
+    /// item of `str::lines`.
+    pub fn line(&self, idx: usize) -> Option<&'a str> {
+        self.line_range(idx).map(|range| &self.source[range])
+    }
+
+    /// Byte range of the 0-based line `idx` without its line ending.
+    pub fn line_range(&self, idx: usize) -> Option<Range<usize>> {
+        if idx >= self.line_count() {
+            return None;
+        }
+        let start = self.line_starts[idx];
+        let end = self
+            .line_starts
+            .get(idx + 1)
+            .map_or(self.source.len(), |next| next - 1);
+        if end < self.source.len() && self.source[start..end].ends_with('\r') {
+            Some(start..end - 1)
+        } else {
+            Some(start..end)
+        }
+    }
+
+    pub fn lines(&self) -> impl Iterator<Item = &'a str> + '_ {
+        (0..self.line_count()).filter_map(|idx| self.line(idx))
+    }
+}
+
+#[cfg(test)]
+#[path = "tests/line_index.rs"]
+mod tests;
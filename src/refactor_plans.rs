@@ -1,7 +1,11 @@
-pub use crate::classes::{LineComplexity, RefactorPlan};
+pub use crate::classes::{LineComplexities, RefactorPlan};
 
+#[cfg(feature = "python")]
+use crate::helpers::stack::on_analysis_stack;
 #[cfg(any(feature = "python", feature = "wasm"))]
-use crate::rules::RuleRegistry;
+use crate::rules::{RuleRegistry, SourceIndex};
+#[cfg(any(feature = "python", feature = "wasm"))]
+use std::sync::Arc;
 use std::sync::OnceLock;
 
 #[cfg(any(feature = "python", feature = "wasm"))]
@@ -17,6 +21,19 @@ pub enum RegionKind {
     With,
 }
 
+#[cfg(any(feature = "python", feature = "wasm"))]
+impl RegionKind {
+    pub const ALL: [RegionKind; 7] = [
+        RegionKind::If,
+        RegionKind::ElifChain,
+        RegionKind::Loop,
+        RegionKind::Try,
+        RegionKind::Match,
+        RegionKind::BooleanCondition,
+        RegionKind::With,
+    ];
+}
+
 #[cfg(any(feature = "python", feature = "wasm"))]
 #[derive(Clone, Default)]
 pub struct ComplexityRegion {
@@ -36,18 +53,129 @@ pub struct ComplexityRegion {
 #[cfg(any(feature = "python", feature = "wasm"))]
 pub struct ComplexityResult {
     pub complexity: u64,
-    pub line_complexities: Vec<LineComplexity>,
+    pub line_complexities: LineComplexities,
     pub regions: Vec<ComplexityRegion>,
 }
 
+/// Where the plans of one function are measured: the lines a suggestion is
+/// spliced into and re-scored, instead of the whole module. Lines are
+/// 1-based and inclusive.
+#[cfg(any(feature = "python", feature = "wasm"))]
+#[derive(Clone, PartialEq, Eq, Debug)]
+pub enum PlanScope {
+    /// A function or method, from its first decorator to its last line.
+    Function { line_start: u64, line_end: u64 },
+    /// The `<module>` entry, with the lines of each module-level statement
+    /// it is scored from, in source order.
+    Module { statements: Vec<(u64, u64)> },
+}
+
+/// A module's source and the [`SourceIndex`] its refactor rules read. The
+/// index is built the first time plans are built for one of the module's
+/// functions, and shared by the rest.
+#[cfg(any(feature = "python", feature = "wasm"))]
+pub struct PlanFile {
+    source: Arc<str>,
+    index: OnceLock<SourceIndex>,
+}
+
+#[cfg(any(feature = "python", feature = "wasm"))]
+impl PlanFile {
+    pub fn new(source: &str) -> Self {
+        PlanFile {
+            source: Arc::from(source),
+            index: OnceLock::new(),
+        }
+    }
+
+    pub fn index(&self) -> &SourceIndex {
+        self.index
+            .get_or_init(|| SourceIndex::new(Arc::clone(&self.source)))
+    }
+}
+
+/// Most region subtrees checked, or plans measured, at once while building
+/// one function's refactor plans: `jobs` when set, otherwise one per thread
+/// of the current rayon pool.
+#[cfg(feature = "python")]
+fn resolve_plan_jobs(jobs: Option<usize>) -> usize {
+    jobs.filter(|&jobs| jobs > 0)
+        .unwrap_or_else(rayon::current_num_threads)
+}
+
+#[cfg(all(feature = "wasm", not(feature = "python")))]
+fn resolve_plan_jobs(_jobs: Option<usize>) -> usize {
+    1
+}
+
+/// The selected plans of one function and the count of further plans cut
+/// by the cap. `jobs` caps the threads used, see [`resolve_plan_jobs`]; the
+/// plans do not depend on it.
 #[cfg(any(feature = "python", feature = "wasm"))]
 pub fn build_refactor_plans(
     function_complexity: u64,
     regions: &[ComplexityRegion],
-    source: &str,
-    is_module: bool,
+    source: &SourceIndex,
+    scope: &PlanScope,
+    jobs: Option<usize>,
 ) -> (Vec<RefactorPlan>, u64) {
     static REGISTRY: OnceLock<RuleRegistry> = OnceLock::new();
     let registry = REGISTRY.get_or_init(RuleRegistry::new);
-    registry.analyze(regions, source, function_complexity, is_module)
+    registry.analyze(
+        regions,
+        source,
+        function_complexity,
+        scope,
+        resolve_plan_jobs(jobs),
+    )
+}
+
+/// The regions and file one function's refactor plans are built from,
+/// kept so the plans can be built the first time they are asked for rather
+/// than with the rest of the analysis.
+#[cfg(feature = "python")]
+pub struct DeferredPlans {
+    function_complexity: u64,
+    regions: Vec<ComplexityRegion>,
+    file: Arc<PlanFile>,
+    scope: PlanScope,
+    jobs: Option<usize>,
+    plans: OnceLock<(Vec<RefactorPlan>, u64)>,
+}
+
+#[cfg(feature = "python")]
+impl DeferredPlans {
+    pub fn new(
+        function_complexity: u64,
+        regions: Vec<ComplexityRegion>,
+        file: Arc<PlanFile>,
+        scope: PlanScope,
+        jobs: Option<usize>,
+    ) -> Self {
+        DeferredPlans {
+            function_complexity,
+            regions,
+            file,
+            scope,
+            jobs,
+            plans: OnceLock::new(),
+        }
+    }
+
+    /// The plans and the count of further plans cut by the cap, built on
+    /// the first call. The rules walk the region tree recursively, so they
+    /// run on an analysis stack.
+    pub fn get(&self) -> &(Vec<RefactorPlan>, u64) {
+        self.plans.get_or_init(|| {
+            on_analysis_stack(|| {
+                build_refactor_plans(
+                    self.function_complexity,
+                    &self.regions,
+                    self.file.index(),
+                    &self.scope,
+                    self.jobs,
+                )
+            })
+        })
+    }
 }
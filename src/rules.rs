@@ -1,5 +1,7 @@
 pub mod complexity;
 pub mod registry;
+pub mod source;
 pub mod types;
 
 pub use registry::RuleRegistry;
+pub use source::SourceIndex;
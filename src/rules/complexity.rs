@@ -1,9 +1,11 @@
 use crate::classes::{Applicability, CodeSuggestion, RefactorPlan, RuleCategory};
 use crate::refactor_plans::{ComplexityRegion, RegionKind};
+use crate::rules::source::SourceIndex;
 use crate::rules::types::{RefactorRule, RuleMetadata};
 use crate::utils::count_bool_ops;
 use ruff_python_ast::{CmpOp, Expr};
 use ruff_python_parser::parse_expression;
+use std::ops::Range;
 use std::sync::OnceLock;
 
 pub struct FlattenConditionRule;
@@ -19,16 +21,18 @@ impl RefactorRule for FlattenConditionRule {
             applicability: Applicability::Informational,
             effectiveness: 4,
             doc_url: "https://rohaquinlop.github.io/complexipy/refactoring-rules/#c001-flatten-nested-conditions".to_string(),
+            region_kinds: vec![RegionKind::If],
+            min_total: 4,
         })
     }
 
     fn check(
         &self,
         region: &ComplexityRegion,
-        _source: &str,
+        _source: &SourceIndex,
         function_complexity: u64,
     ) -> Option<RefactorPlan> {
-        if region.kind != RegionKind::If || region.nesting < 2 || region.total < 4 {
+        if region.nesting < 2 {
             return None;
         }
 
@@ -68,21 +72,18 @@ impl RefactorRule for LoopGuardsRule {
             effectiveness: 3,
             doc_url: "https://rohaquinlop.github.io/complexipy/refactoring-rules/#c002-loop-guards"
                 .to_string(),
+            region_kinds: vec![RegionKind::Loop],
+            min_total: 5,
         })
     }
 
     fn check(
         &self,
         region: &ComplexityRegion,
-        source: &str,
+        source: &SourceIndex,
         function_complexity: u64,
     ) -> Option<RefactorPlan> {
-        if region.kind != RegionKind::Loop || region.total < 5 {
-            return None;
-        }
-
-        let lines: Vec<&str> = source.lines().collect();
-        let chain = collect_loop_if_chain(region, &lines);
+        let chain = collect_loop_if_chain(region, source);
 
         if chain.is_empty() {
             return None;
@@ -144,18 +145,20 @@ impl RefactorRule for ExtractHelperRule {
             applicability: Applicability::Informational,
             effectiveness: 2,
             doc_url: "https://rohaquinlop.github.io/complexipy/refactoring-rules/#c003-extract-helper-function".to_string(),
+            region_kinds: vec![],
+            min_total: 6,
         })
     }
 
     fn check(
         &self,
         region: &ComplexityRegion,
-        _source: &str,
+        _source: &SourceIndex,
         function_complexity: u64,
     ) -> Option<RefactorPlan> {
         let line_count = region.line_end.saturating_sub(region.line_start) + 1;
 
-        if region.total < 6 || line_count < 5 {
+        if line_count < 5 {
             return None;
         }
 
@@ -199,16 +202,18 @@ impl RefactorRule for SplitDispatcherRule {
             doc_url:
                 "https://rohaquinlop.github.io/complexipy/refactoring-rules/#c004-split-dispatcher"
                     .to_string(),
+            region_kinds: vec![RegionKind::ElifChain],
+            min_total: 0,
         })
     }
 
     fn check(
         &self,
         region: &ComplexityRegion,
-        source: &str,
+        source: &SourceIndex,
         function_complexity: u64,
     ) -> Option<RefactorPlan> {
-        if region.kind != RegionKind::ElifChain || region.elif_count < 3 {
+        if region.elif_count < 3 {
             return None;
         }
 
@@ -220,8 +225,7 @@ impl RefactorRule for SplitDispatcherRule {
             return None;
         }
 
-        let lines: Vec<&str> = source.lines().collect();
-        let help = if let Some(subject) = single_variable_equality_subject(region, &lines) {
+        let help = if let Some(subject) = single_variable_equality_subject(region, source) {
             format!(
                 "This chain only compares `{subject}` against literal values, so it can \
                  become `match {subject}:` with one `case <value>:` per branch. Unlike an \
@@ -255,22 +259,25 @@ impl RefactorRule for SplitDispatcherRule {
     }
 }
 
-fn single_variable_equality_subject(region: &ComplexityRegion, lines: &[&str]) -> Option<String> {
+fn single_variable_equality_subject(
+    region: &ComplexityRegion,
+    source: &SourceIndex,
+) -> Option<String> {
     let start = (region.line_start.saturating_sub(1)) as usize;
-    let end = (region.line_end as usize).min(lines.len());
+    let end = (region.line_end as usize).min(source.line_count());
     if start >= end {
         return None;
     }
 
-    let base_indent = get_indentation_from_str(lines[start]);
+    let base_indent = source.indent(start);
     let mut subject: Option<String> = None;
     let mut clause_count = 0;
 
-    for line in &lines[start..end] {
-        if get_indentation_from_str(line) != base_indent {
+    for idx in start..end {
+        if source.indent(idx) != base_indent {
             continue;
         }
-        let trimmed = line.trim_start();
+        let trimmed = source.line(idx).trim_start();
         if !trimmed.starts_with("if ") && !trimmed.starts_with("elif ") {
             continue;
         }
@@ -344,16 +351,18 @@ impl RefactorRule for ExtractPredicateRule {
             doc_url:
                 "https://rohaquinlop.github.io/complexipy/refactoring-rules/#c005-extract-predicate"
                     .to_string(),
+            region_kinds: vec![RegionKind::BooleanCondition],
+            min_total: 0,
         })
     }
 
     fn check(
         &self,
         region: &ComplexityRegion,
-        source: &str,
+        source: &SourceIndex,
         function_complexity: u64,
     ) -> Option<RefactorPlan> {
-        if region.kind != RegionKind::BooleanCondition || region.boolean < 2 {
+        if region.boolean < 2 {
             return None;
         }
 
@@ -403,19 +412,17 @@ impl RefactorRule for FlattenTryRule {
             doc_url:
                 "https://rohaquinlop.github.io/complexipy/refactoring-rules/#c011-flatten-tryexcept"
                     .to_string(),
+            region_kinds: vec![RegionKind::Try],
+            min_total: 0,
         })
     }
 
     fn check(
         &self,
         region: &ComplexityRegion,
-        _source: &str,
+        _source: &SourceIndex,
         function_complexity: u64,
     ) -> Option<RefactorPlan> {
-        if region.kind != RegionKind::Try {
-            return None;
-        }
-
         let nested_try = find_nested_try(region)?;
         let estimated_reduction = nested_try.structural.max(1);
 
@@ -471,21 +478,18 @@ impl RefactorRule for CollapsibleIfRule {
             doc_url:
                 "https://rohaquinlop.github.io/complexipy/refactoring-rules/#c007-collapsible-if"
                     .to_string(),
+            region_kinds: vec![RegionKind::If],
+            min_total: 0,
         })
     }
 
     fn check(
         &self,
         region: &ComplexityRegion,
-        source: &str,
+        source: &SourceIndex,
         function_complexity: u64,
     ) -> Option<RefactorPlan> {
-        if region.kind != RegionKind::If {
-            return None;
-        }
-
-        let lines: Vec<&str> = source.lines().collect();
-        let chain = collect_if_chain(region, &lines);
+        let chain = collect_if_chain(region, source);
 
         if chain.len() < 2 {
             return None;
@@ -497,10 +501,10 @@ impl RefactorRule for CollapsibleIfRule {
         let mut conditions_extracted = true;
         for r in &chain {
             let line_idx = (r.line_start.saturating_sub(1)) as usize;
-            if line_idx >= lines.len() {
+            if line_idx >= source.line_count() {
                 return None;
             }
-            match extract_condition_from_line(lines[line_idx].trim_start()) {
+            match extract_condition_from_line(source.line(line_idx).trim_start()) {
                 Some(cond) => conditions.push(cond),
                 None => {
                     conditions_extracted = false;
@@ -510,11 +514,11 @@ impl RefactorRule for CollapsibleIfRule {
         }
 
         let outermost = chain[0];
-        let outer_indent =
-            get_indentation_from_str(lines[(outermost.line_start.saturating_sub(1)) as usize]);
+        let outer_line_idx = (outermost.line_start.saturating_sub(1)) as usize;
+        let outer_indent = source.indent(outer_line_idx);
         let indent_step = detect_indent_step(
-            &lines[(outermost.line_start.saturating_sub(1)) as usize
-                ..((outermost.line_end as usize).min(lines.len()))],
+            source,
+            outer_line_idx..(outermost.line_end as usize).min(source.line_count()),
         );
         let body_indent = outer_indent + indent_step;
 
@@ -523,12 +527,12 @@ impl RefactorRule for CollapsibleIfRule {
                 break;
             }
             let next = chain[i + 1];
-            let r_end = (r.line_end as usize).min(lines.len());
-            let next_end = (next.line_end as usize).min(lines.len());
+            let r_end = (r.line_end as usize).min(source.line_count());
+            let next_end = (next.line_end as usize).min(source.line_count());
 
-            for line in &lines[next_end..r_end] {
-                let trimmed = line.trim_start();
-                let indent = get_indentation_from_str(line);
+            for idx in next_end..r_end {
+                let trimmed = source.line(idx).trim_start();
+                let indent = source.indent(idx);
                 if !trimmed.is_empty() && indent == body_indent {
                     return None;
                 }
@@ -540,7 +544,7 @@ impl RefactorRule for CollapsibleIfRule {
                 outermost,
                 innermost,
                 &conditions,
-                &lines,
+                source,
             ))
         } else {
             None
@@ -561,7 +565,7 @@ impl RefactorRule for CollapsibleIfRule {
         let boolean_count = if conditions_extracted {
             let combined = combine_conditions_chain(&conditions);
             match parse_expression(&combined) {
-                Ok(parsed) => count_bool_ops(*parsed.into_syntax().body, region.nesting),
+                Ok(parsed) => count_bool_ops(&parsed.into_syntax().body, region.nesting),
                 Err(_) => fallback_boolean_count(&chain),
             }
         } else {
@@ -600,17 +604,16 @@ impl RefactorRule for CollapsibleIfRule {
 /// holds no guardable chain — callers fall back to `help` text then.
 fn generate_loop_guard_suggestion(
     region: &ComplexityRegion,
-    source: &str,
+    source: &SourceIndex,
 ) -> Option<CodeSuggestion> {
-    let lines: Vec<&str> = source.lines().collect();
     let start = (region.line_start.saturating_sub(1)) as usize;
-    let end = (region.line_end as usize).min(lines.len());
+    let end = (region.line_end as usize).min(source.line_count());
 
-    if start >= lines.len() {
+    if start >= source.line_count() {
         return None;
     }
 
-    let base_indent = get_indentation_from_str(lines[start]);
+    let base_indent = source.indent(start);
 
     let mut guards = Vec::new();
     let mut current_region: Option<&ComplexityRegion> = None;
@@ -624,10 +627,10 @@ fn generate_loop_guard_suggestion(
 
     while let Some(r) = current_region {
         let line_idx = (r.line_start.saturating_sub(1)) as usize;
-        if line_idx >= lines.len() {
+        if line_idx >= source.line_count() {
             break;
         }
-        let condition = match extract_condition_from_line(lines[line_idx].trim_start()) {
+        let condition = match extract_condition_from_line(source.line(line_idx).trim_start()) {
             Some(cond) => cond,
             None => break,
         };
@@ -635,8 +638,8 @@ fn generate_loop_guard_suggestion(
 
         if r.children.len() == 1
             && r.children[0].kind == RegionKind::If
-            && !has_else_branch(r, &lines)
-            && !has_else_branch(&r.children[0], &lines)
+            && !has_else_branch(r, source)
+            && !has_else_branch(&r.children[0], source)
         {
             current_region = Some(&r.children[0]);
             continue;
@@ -649,31 +652,31 @@ fn generate_loop_guard_suggestion(
     // dangling `else` inside the body. A first chain member with its own
     // `else`/`elif` cannot become a guard either — the guard would skip the
     // `else` branch entirely.
-    if has_else_branch(region, &lines)
+    if has_else_branch(region, source)
         || guards.is_empty()
-        || has_else_branch(guards[0].0, &lines)
+        || has_else_branch(guards[0].0, source)
     {
         return None;
     }
 
     let innermost = guards.last().unwrap().0;
     let innermost_line_idx = (innermost.line_start.saturating_sub(1)) as usize;
-    let innermost_end = (innermost.line_end as usize).min(lines.len());
+    let innermost_end = (innermost.line_end as usize).min(source.line_count());
     let chain_start_idx = (guards[0].0.line_start.saturating_sub(1)) as usize;
 
     // The body indent and step come from the first chain member's own line:
     // the header may span several lines, so its continuation lines cannot be
     // trusted to reveal the step. Header continuation lines fall into the
     // leading range below and pass through unchanged.
-    let loop_body_indent = get_indentation_from_str(lines[chain_start_idx]);
+    let loop_body_indent = source.indent(chain_start_idx);
     let indent_step = loop_body_indent.saturating_sub(base_indent);
 
     let mut result = Vec::new();
-    result.push(lines[start].to_string());
+    result.push(source.line(start).to_string());
     result.extend(
-        lines[(start + 1)..chain_start_idx]
-            .iter()
-            .map(|line| (*line).to_string()),
+        source
+            .lines((start + 1)..chain_start_idx)
+            .map(str::to_string),
     );
 
     for (_, guard) in &guards {
@@ -684,22 +687,19 @@ fn generate_loop_guard_suggestion(
         ));
     }
 
-    for line in &lines[(innermost_line_idx + 1)..innermost_end] {
-        let trimmed = line.trim_start();
+    for idx in (innermost_line_idx + 1)..innermost_end {
+        let trimmed = source.line(idx).trim_start();
         if trimmed.is_empty() {
             result.push(String::new());
             continue;
         }
-        let current_indent = get_indentation_from_str(line);
-        let shifted = current_indent.saturating_sub(indent_step * guards.len());
+        let shifted = source
+            .indent(idx)
+            .saturating_sub(indent_step * guards.len());
         let padding = " ".repeat(shifted);
         result.push(format!("{}{}", padding, trimmed));
     }
-    result.extend(
-        lines[innermost_end..end]
-            .iter()
-            .map(|line| (*line).to_string()),
-    );
+    result.extend(source.lines(innermost_end..end).map(str::to_string));
 
     Some(CodeSuggestion {
         replacement: result.join("\n"),
@@ -713,10 +713,10 @@ fn generate_loop_guard_suggestion(
 }
 
 /// Detect the indentation step (spaces per level) from a block of code.
-fn detect_indent_step(lines: &[&str]) -> usize {
-    for i in 1..lines.len() {
-        let prev_indent = get_indentation_from_str(lines[i - 1]);
-        let curr_indent = get_indentation_from_str(lines[i]);
+fn detect_indent_step(source: &SourceIndex, lines: Range<usize>) -> usize {
+    for idx in (lines.start + 1)..lines.end {
+        let prev_indent = source.indent(idx - 1);
+        let curr_indent = source.indent(idx);
         if curr_indent > prev_indent {
             return curr_indent - prev_indent;
         }
@@ -731,18 +731,16 @@ fn detect_indent_step(lines: &[&str]) -> usize {
 /// keeps the snippet parseable on its own.
 fn generate_predicate_suggestion(
     region: &ComplexityRegion,
-    source: &str,
+    source: &SourceIndex,
 ) -> Option<CodeSuggestion> {
-    let lines: Vec<&str> = source.lines().collect();
     let start = (region.line_start.saturating_sub(1)) as usize;
 
-    if start >= lines.len() {
+    if start >= source.line_count() {
         return None;
     }
 
-    let line = lines[start];
-    let condition = extract_condition_from_line(line.trim_start())?;
-    let base_indent = get_indentation_from_str(line);
+    let condition = extract_condition_from_line(source.line(start).trim_start())?;
+    let base_indent = source.indent(start);
 
     let predicate_indent = " ".repeat(base_indent);
     let body_indent = " ".repeat(base_indent + 4);
@@ -764,10 +762,6 @@ fn generate_predicate_suggestion(
     })
 }
 
-fn get_indentation_from_str(line: &str) -> usize {
-    line.len() - line.trim_start().len()
-}
-
 /// Extract the boolean condition text from an `if` / `elif` / `while` statement line.
 ///
 /// Returns `None` when the condition cannot be extracted with confidence — for example
@@ -784,6 +778,8 @@ fn get_indentation_from_str(line: &str) -> usize {
 /// walrus operators are not treated as terminators either. The statement colon is the
 /// first `:` found at bracket depth 0 outside of any string literal. A `#` reached
 /// outside a string ends the scan (nothing after it can contain the statement colon).
+/// Every character it looks for is ASCII, so it steps through bytes: the bytes of
+/// a multi-byte character can never be mistaken for one of them.
 fn extract_condition_from_line(line: &str) -> Option<String> {
     let trimmed = line.trim_start();
 
@@ -797,25 +793,23 @@ fn extract_condition_from_line(line: &str) -> Option<String> {
         return None;
     };
 
-    let chars: Vec<(usize, char)> = trimmed.char_indices().collect();
+    let bytes = trimmed.as_bytes();
     let mut i = 0;
     let mut depth: i32 = 0;
-    let mut string_state: Option<(char, bool)> = None;
+    let mut string_state: Option<(u8, bool)> = None;
     let mut colon_byte: Option<usize> = None;
 
-    while i < chars.len() {
-        let (byte_idx, c) = chars[i];
+    while i < bytes.len() {
+        let c = bytes[i];
 
         if let Some((quote, triple)) = string_state {
-            if c == '\\' {
+            if c == b'\\' {
                 i += 2;
                 continue;
             }
             if c == quote {
-                let closes_triple = triple
-                    && i + 2 < chars.len()
-                    && chars[i + 1].1 == quote
-                    && chars[i + 2].1 == quote;
+                let closes_triple =
+                    triple && bytes.get(i + 1) == Some(&quote) && bytes.get(i + 2) == Some(&quote);
                 if triple {
                     if closes_triple {
                         string_state = None;
@@ -834,26 +828,26 @@ fn extract_condition_from_line(line: &str) -> Option<String> {
         }
 
         match c {
-            '#' => break,
-            '\'' | '"' => {
-                let is_triple = i + 2 < chars.len() && chars[i + 1].1 == c && chars[i + 2].1 == c;
+            b'#' => break,
+            b'\'' | b'"' => {
+                let is_triple = bytes.get(i + 1) == Some(&c) && bytes.get(i + 2) == Some(&c);
                 string_state = Some((c, is_triple));
                 i += if is_triple { 3 } else { 1 };
             }
-            '(' | '[' | '{' => {
+            b'(' | b'[' | b'{' => {
                 depth += 1;
                 i += 1;
             }
-            ')' | ']' | '}' => {
+            b')' | b']' | b'}' => {
                 depth -= 1;
                 i += 1;
             }
-            ':' if depth == 0 => {
-                if i + 1 < chars.len() && chars[i + 1].1 == '=' {
+            b':' if depth == 0 => {
+                if bytes.get(i + 1) == Some(&b'=') {
                     i += 2;
                     continue;
                 }
-                colon_byte = Some(byte_idx);
+                colon_byte = Some(i);
                 break;
             }
             _ => {
@@ -870,19 +864,19 @@ fn extract_condition_from_line(line: &str) -> Option<String> {
     Some(condition.to_string())
 }
 
-fn has_else_branch(region: &ComplexityRegion, lines: &[&str]) -> bool {
+fn has_else_branch(region: &ComplexityRegion, source: &SourceIndex) -> bool {
     let start = (region.line_start.saturating_sub(1)) as usize;
-    let end = (region.line_end as usize).min(lines.len());
+    let end = (region.line_end as usize).min(source.line_count());
 
-    if start >= lines.len() {
+    if start >= source.line_count() {
         return false;
     }
 
-    let base_indent = get_indentation_from_str(lines[start]);
+    let base_indent = source.indent(start);
 
-    for line in &lines[start..end] {
-        let trimmed = line.trim_start();
-        let current_indent = get_indentation_from_str(line);
+    for idx in start..end {
+        let trimmed = source.line(idx).trim_start();
+        let current_indent = source.indent(idx);
 
         if current_indent == base_indent
             && (trimmed.starts_with("else:") || trimmed.starts_with("elif "))
@@ -898,28 +892,29 @@ fn generate_collapsible_if_suggestion_chain(
     outermost: &ComplexityRegion,
     innermost: &ComplexityRegion,
     conditions: &[String],
-    lines: &[&str],
+    source: &SourceIndex,
 ) -> CodeSuggestion {
     let outer_line_idx = (outermost.line_start.saturating_sub(1)) as usize;
     let inner_line_idx = (innermost.line_start.saturating_sub(1)) as usize;
-    let inner_end = (innermost.line_end as usize).min(lines.len());
+    let inner_end = (innermost.line_end as usize).min(source.line_count());
 
-    let outer_indent = get_indentation_from_str(lines[outer_line_idx]);
-    let indent_step = detect_indent_step(&lines[outer_line_idx..inner_end]);
+    let outer_indent = source.indent(outer_line_idx);
+    let indent_step = detect_indent_step(source, outer_line_idx..inner_end);
 
     let combined = combine_conditions_chain(conditions);
 
     let body_start = inner_line_idx + 1;
     let chain_depth = conditions.len();
     let mut body_lines = Vec::new();
-    for line in &lines[body_start..inner_end] {
-        let trimmed = line.trim_start();
+    for idx in body_start..inner_end {
+        let trimmed = source.line(idx).trim_start();
         if trimmed.is_empty() {
             body_lines.push(String::new());
             continue;
         }
-        let current_indent = get_indentation_from_str(line);
-        let shifted = current_indent.saturating_sub(indent_step * (chain_depth - 1));
+        let shifted = source
+            .indent(idx)
+            .saturating_sub(indent_step * (chain_depth - 1));
         let padding = " ".repeat(shifted);
         body_lines.push(format!("{}{}", padding, trimmed));
     }
@@ -943,27 +938,31 @@ fn generate_collapsible_if_suggestion_chain(
 /// without being fooled by `" or "` inside a string literal or a `:=` nested
 /// inside a call.
 fn mask_nested(condition: &str) -> String {
-    let chars: Vec<char> = condition.chars().collect();
-    let mut out = String::with_capacity(chars.len());
+    let bytes = condition.as_bytes();
+    // Byte length of the character starting at byte `i`.
+    let char_len = |i: usize| condition[i..].chars().next().map_or(1, char::len_utf8);
+    let mut out = String::with_capacity(condition.len());
     let mut i = 0;
     let mut depth: i32 = 0;
-    let mut string_state: Option<(char, bool)> = None;
+    let mut string_state: Option<(u8, bool)> = None;
 
-    while i < chars.len() {
-        let c = chars[i];
+    while i < bytes.len() {
+        let c = bytes[i];
 
         if let Some((quote, triple)) = string_state {
             out.push('x');
-            if c == '\\' {
-                if i + 1 < chars.len() {
+            if c == b'\\' {
+                if i + 1 < bytes.len() {
                     out.push('x');
+                    i += 1 + char_len(i + 1);
+                } else {
+                    i += 1;
                 }
-                i += 2;
                 continue;
             }
             if c == quote {
                 let closes_triple =
-                    triple && i + 2 < chars.len() && chars[i + 1] == quote && chars[i + 2] == quote;
+                    triple && bytes.get(i + 1) == Some(&quote) && bytes.get(i + 2) == Some(&quote);
                 if triple {
                     if closes_triple {
                         out.push('x');
@@ -979,13 +978,13 @@ fn mask_nested(condition: &str) -> String {
                 }
                 continue;
             }
-            i += 1;
+            i += char_len(i);
             continue;
         }
 
         match c {
-            '\'' | '"' => {
-                let is_triple = i + 2 < chars.len() && chars[i + 1] == c && chars[i + 2] == c;
+            b'\'' | b'"' => {
+                let is_triple = bytes.get(i + 1) == Some(&c) && bytes.get(i + 2) == Some(&c);
                 string_state = Some((c, is_triple));
                 out.push('x');
                 if is_triple {
@@ -996,19 +995,24 @@ fn mask_nested(condition: &str) -> String {
                     i += 1;
                 }
             }
-            '(' | '[' | '{' => {
+            b'(' | b'[' | b'{' => {
                 depth += 1;
                 out.push('x');
                 i += 1;
             }
-            ')' | ']' | '}' => {
+            b')' | b']' | b'}' => {
                 depth -= 1;
                 out.push('x');
                 i += 1;
             }
             _ => {
-                out.push(if depth > 0 { 'x' } else { c });
-                i += 1;
+                let len = char_len(i);
+                if depth > 0 {
+                    out.push('x');
+                } else {
+                    out.push_str(&condition[i..i + len]);
+                }
+                i += len;
             }
         }
     }
@@ -1046,7 +1050,10 @@ fn combine_conditions_chain(conditions: &[String]) -> String {
 /// - Current region has != 1 child
 /// - Child is not an If
 /// - Current or child has else/elif
-fn collect_if_chain<'a>(region: &'a ComplexityRegion, lines: &[&str]) -> Vec<&'a ComplexityRegion> {
+fn collect_if_chain<'a>(
+    region: &'a ComplexityRegion,
+    source: &SourceIndex,
+) -> Vec<&'a ComplexityRegion> {
     let mut chain = vec![region];
     let mut current = region;
 
@@ -1058,7 +1065,7 @@ fn collect_if_chain<'a>(region: &'a ComplexityRegion, lines: &[&str]) -> Vec<&'a
         if child.kind != RegionKind::If {
             break;
         }
-        if has_else_branch(current, lines) || has_else_branch(child, lines) {
+        if has_else_branch(current, source) || has_else_branch(child, source) {
             break;
         }
         chain.push(child);
@@ -1080,7 +1087,7 @@ fn fallback_boolean_count(chain: &[&ComplexityRegion]) -> u64 {
 /// (a branch, an else/elif, or the end of the nesting).
 fn collect_loop_if_chain<'a>(
     region: &'a ComplexityRegion,
-    lines: &[&str],
+    source: &SourceIndex,
 ) -> Vec<&'a ComplexityRegion> {
     let mut chain = Vec::new();
     let mut current = region.children.iter().find(|c| c.kind == RegionKind::If);
@@ -1089,8 +1096,8 @@ fn collect_loop_if_chain<'a>(
         chain.push(r);
         current = if r.children.len() == 1
             && r.children[0].kind == RegionKind::If
-            && !has_else_branch(r, lines)
-            && !has_else_branch(&r.children[0], lines)
+            && !has_else_branch(r, source)
+            && !has_else_branch(&r.children[0], source)
         {
             Some(&r.children[0])
         } else {
@@ -1,17 +1,41 @@
+use super::source::SourceIndex;
 use super::types::RefactorRule;
 use crate::classes::{CodeSuggestion, RefactorPlan};
-use crate::cognitive_complexity::function_level_cognitive_complexity_shared;
-use crate::refactor_plans::ComplexityRegion;
+use crate::cognitive_complexity::{AnalysisMode, function_level_cognitive_complexity_shared};
+use crate::refactor_plans::{ComplexityRegion, PlanScope, RegionKind};
 use ruff_python_parser::parse_module;
 use std::collections::HashMap;
 
+/// Fewest top-level regions of one function whose checks are split between
+/// threads. Checking a region is a walk over a few lines, so smaller
+/// functions cost less to check than to hand to the pool.
+#[cfg(feature = "python")]
+const PARALLEL_MIN_REGIONS: usize = 16;
+
+/// Fewest spliceable plans of one function measured in parallel.
+#[cfg(feature = "python")]
+const PARALLEL_MIN_PLANS: usize = 4;
+
+/// Fewest source lines re-parsed across all the spliceable plans of one
+/// function (plans times lines in scope) before they are measured in
+/// parallel: each measurement re-parses and re-scores its scope, and below
+/// this the re-parses finish before the pool would pick them up.
+#[cfg(feature = "python")]
+const PARALLEL_MIN_MEASURED_LINES: u64 = 1_000;
+
 pub struct RuleRegistry {
     rules: Vec<Box<dyn RefactorRule>>,
+    /// For each region kind, indexed by `kind as usize`, the rules declaring
+    /// that kind as `(index into rules, min_total)`, in registration order.
+    by_kind: Vec<Vec<(usize, u64)>>,
 }
 
 impl RuleRegistry {
     pub fn new() -> Self {
-        let mut registry = Self { rules: Vec::new() };
+        let mut registry = Self {
+            rules: Vec::new(),
+            by_kind: vec![Vec::new(); RegionKind::ALL.len()],
+        };
         registry.register_defaults();
         registry
     }
@@ -29,6 +53,12 @@ impl RuleRegistry {
     }
 
     pub fn register(&mut self, rule: Box<dyn RefactorRule>) {
+        let meta = rule.metadata();
+        for kind in RegionKind::ALL {
+            if meta.region_kinds.is_empty() || meta.region_kinds.contains(&kind) {
+                self.by_kind[kind as usize].push((self.rules.len(), meta.min_total));
+            }
+        }
         self.rules.push(rule);
     }
 
@@ -53,19 +83,20 @@ impl RuleRegistry {
     /// Returns the selected plans (capped at 5) plus a count of additional
     /// plans that survived dedup but were dropped purely by the cap, so
     /// callers can render "... and N more suggestions" instead of silently
-    /// truncating.
+    /// truncating. Up to `jobs` region subtrees are checked, and plans
+    /// measured, at once on the current rayon pool; the result does not
+    /// depend on `jobs`.
     #[must_use]
     pub fn analyze(
         &self,
         regions: &[ComplexityRegion],
-        source: &str,
+        source: &SourceIndex,
         function_complexity: u64,
-        is_module: bool,
+        scope: &PlanScope,
+        jobs: usize,
     ) -> (Vec<RefactorPlan>, u64) {
-        let mut plans = Vec::new();
-
-        self.collect_plans(regions, source, function_complexity, &mut plans);
-        self.measure_plans(&mut plans, source, is_module);
+        let mut plans = self.check_regions(regions, source, function_complexity, jobs);
+        self.measure_plans(&mut plans, source, scope, jobs);
 
         plans.retain(|plan| plan.estimated_reduction >= 1);
 
@@ -76,35 +107,82 @@ impl RuleRegistry {
     /// Plans whose measurement fails keep their formula estimate with
     /// `reduction_is_measured = false` — never a panic, never a fabricated
     /// measured number.
-    fn measure_plans(&self, plans: &mut [RefactorPlan], source: &str, is_module: bool) {
-        for plan in plans.iter_mut() {
-            let Some(suggestion) = &plan.suggestion else {
-                continue;
-            };
-            if !suggestion.spliceable {
-                continue;
-            }
-            let Some(measured) = measure_reduction(plan, suggestion, source, is_module) else {
-                continue;
-            };
-            plan.estimated_reduction = measured;
-            plan.estimated_complexity_after = plan
-                .current_complexity
-                .saturating_sub(measured);
-            plan.reduction_is_measured = true;
+    fn measure_plans(
+        &self,
+        plans: &mut [RefactorPlan],
+        source: &SourceIndex,
+        scope: &PlanScope,
+        jobs: usize,
+    ) {
+        let mut spliceable: Vec<&mut RefactorPlan> = plans
+            .iter_mut()
+            .filter(|plan| plan.suggestion.as_ref().is_some_and(|s| s.spliceable))
+            .collect();
+        #[cfg(feature = "python")]
+        if jobs > 1
+            && spliceable.len() >= PARALLEL_MIN_PLANS
+            && spliceable.len() as u64 * scope_lines(scope) >= PARALLEL_MIN_MEASURED_LINES
+        {
+            use rayon::prelude::*;
+            let chunk_len = spliceable.len().div_ceil(jobs);
+            spliceable.par_chunks_mut(chunk_len).for_each(|chunk| {
+                for plan in chunk {
+                    measure_plan(plan, source, scope);
+                }
+            });
+            return;
+        }
+        #[cfg(not(feature = "python"))]
+        let _ = jobs;
+        for plan in &mut spliceable {
+            measure_plan(plan, source, scope);
         }
     }
 
+    /// The plans the rules find in `regions` and their descendants, in the
+    /// order a depth-first walk offers them, whether or not the top-level
+    /// regions are split between threads.
+    fn check_regions(
+        &self,
+        regions: &[ComplexityRegion],
+        source: &SourceIndex,
+        function_complexity: u64,
+        jobs: usize,
+    ) -> Vec<RefactorPlan> {
+        #[cfg(feature = "python")]
+        if jobs > 1 && regions.len() >= PARALLEL_MIN_REGIONS {
+            use rayon::prelude::*;
+            let chunk_len = regions.len().div_ceil(jobs);
+            let chunks: Vec<Vec<RefactorPlan>> = regions
+                .par_chunks(chunk_len)
+                .map(|chunk| {
+                    let mut plans = Vec::new();
+                    self.collect_plans(chunk, source, function_complexity, &mut plans);
+                    plans
+                })
+                .collect();
+            return chunks.concat();
+        }
+        #[cfg(not(feature = "python"))]
+        let _ = jobs;
+        let mut plans = Vec::new();
+        self.collect_plans(regions, source, function_complexity, &mut plans);
+        plans
+    }
+
     fn collect_plans(
         &self,
         regions: &[ComplexityRegion],
-        source: &str,
+        source: &SourceIndex,
         function_complexity: u64,
         plans: &mut Vec<RefactorPlan>,
     ) {
         for region in regions {
-            for rule in &self.rules {
-                if let Some(plan) = rule.check(region, source, function_complexity) {
+            for &(index, min_total) in &self.by_kind[region.kind as usize] {
+                if region.total < min_total {
+                    continue;
+                }
+                if let Some(plan) = self.rules[index].check(region, source, function_complexity) {
                     plans.push(plan);
                 }
             }
@@ -120,55 +198,162 @@ impl Default for RuleRegistry {
     }
 }
 
-fn splice_plan(plan: &RefactorPlan, suggestion: &CodeSuggestion, source: &str) -> Option<String> {
-    let start: usize = plan.line_start.saturating_sub(1) as usize;
-    let end: usize = plan.line_end as usize;
-    let lines: Vec<&str> = source.lines().collect();
-    if start > end || end > lines.len() {
+/// Lines `scope` covers, an upper bound on what measuring one plan in it
+/// re-parses.
+#[cfg(feature = "python")]
+fn scope_lines(scope: &PlanScope) -> u64 {
+    match scope {
+        PlanScope::Function {
+            line_start,
+            line_end,
+        } => line_end.saturating_sub(*line_start) + 1,
+        PlanScope::Module { statements } => statements
+            .iter()
+            .map(|(start, end)| end.saturating_sub(*start) + 1)
+            .sum(),
+    }
+}
+
+/// Replace `plan`'s formula estimate with the reduction measured by
+/// applying its suggestion, when that measurement succeeds.
+fn measure_plan(plan: &mut RefactorPlan, source: &SourceIndex, scope: &PlanScope) {
+    let Some(suggestion) = &plan.suggestion else {
+        return;
+    };
+    let Some(measured) = measure_reduction(plan, suggestion, source, scope) else {
+        return;
+    };
+    plan.estimated_reduction = measured;
+    plan.estimated_complexity_after = plan.current_complexity.saturating_sub(measured);
+    plan.reduction_is_measured = true;
+}
+
+/// Lines `first..=last` of the source, with the lines of `plan` replaced by
+/// its suggestion.
+fn splice_plan(
+    plan: &RefactorPlan,
+    suggestion: &CodeSuggestion,
+    source: &SourceIndex,
+    (first, last): (u64, u64),
+) -> Option<String> {
+    if plan.line_start < first || plan.line_end > last || plan.line_start > plan.line_end {
         return None;
     }
-    let mut spliced = Vec::with_capacity(lines.len() + 1);
-    spliced.extend(lines[..start].iter().copied());
+    let line = |number: u64| source.get(number as usize - 1);
+    let mut spliced = Vec::with_capacity((last - first + 1) as usize);
+    for number in first..plan.line_start {
+        spliced.push(line(number)?);
+    }
     spliced.push(suggestion.replacement.as_str());
-    spliced.extend(lines[end..].iter().copied());
+    for number in plan.line_end + 1..=last {
+        spliced.push(line(number)?);
+    }
     Some(spliced.join("\n"))
 }
 
-/// The target is `<module>` for script-mode plans (module-level regions
-/// only reach the registry through the `is_module` call); otherwise it is
-/// the function with the greatest `line_start` still before the plan's
-/// region — the splice only shifts lines after the region, so the
-/// containing function's start is unchanged between the two parses.
+/// Re-scores only the code `scope` says the plan's function is scored
+/// from: the function itself, or for `<module>` the module-level
+/// statements the plan's lines touch. The rest of the module cannot change
+/// that score, so the reduction is the one a re-parse of the whole spliced
+/// module would give.
 ///
-/// Returns `None` when the spliced source cannot be parsed or the target
-/// cannot be located; the caller keeps the formula estimate then.
+/// Returns `None` when the spliced code cannot be parsed or the plan lies
+/// outside its scope; the caller keeps the formula estimate then.
 fn measure_reduction(
     plan: &RefactorPlan,
     suggestion: &CodeSuggestion,
-    source: &str,
-    is_module: bool,
+    source: &SourceIndex,
+    scope: &PlanScope,
 ) -> Option<u64> {
-    let spliced = splice_plan(plan, suggestion, source)?;
-    let parsed = parse_module(&spliced).ok()?;
-    let (functions, _) = function_level_cognitive_complexity_shared(
-        &parsed.into_suite(),
-        &spliced,
-        true,
-        true,
-        false,
-    );
+    match scope {
+        PlanScope::Function {
+            line_start,
+            line_end,
+        } => {
+            let spliced = splice_plan(plan, suggestion, source, (*line_start, *line_end))?;
+            let new_complexity = function_complexity(&spliced, plan.line_start - line_start + 1)?;
+            Some(plan.current_complexity.saturating_sub(new_complexity))
+        }
+        PlanScope::Module { statements } => {
+            let (first, last) = statement_block(statements, plan.line_start, plan.line_end)?;
+            let block = (first..=last)
+                .map(|number| source.get(number as usize - 1))
+                .collect::<Option<Vec<&str>>>()?
+                .join("\n");
+            let spliced = splice_plan(plan, suggestion, source, (first, last))?;
+            let before = module_complexity(&block)?;
+            let after = module_complexity(&spliced)?;
+            Some(before.saturating_sub(after))
+        }
+    }
+}
+
+/// The lines of the module-level statements that share a line with
+/// `line_start..=line_end`, widened until no statement is cut in two.
+fn statement_block(
+    statements: &[(u64, u64)],
+    line_start: u64,
+    line_end: u64,
+) -> Option<(u64, u64)> {
+    let (mut first, mut last) = (line_start, line_end);
+    let mut found = false;
+    loop {
+        let mut widened = false;
+        for &(start, end) in statements {
+            if start <= last && end >= first {
+                found = true;
+                if start < first || end > last {
+                    first = first.min(start);
+                    last = last.max(end);
+                    widened = true;
+                }
+            }
+        }
+        if !widened {
+            return found.then_some((first, last));
+        }
+    }
+}
 
-    let new_complexity = if is_module {
-        functions.iter().find(|f| f.name == "<module>")?.complexity
+/// The score of the function a plan at line `plan_line` of `code` belongs
+/// to: the one with the greatest start still before the plan. `code` holds
+/// one function or method; a method keeps its indentation and is parsed in
+/// a placeholder class, which does not change its score.
+fn function_complexity(code: &str, plan_line: u64) -> Option<u64> {
+    let indented = code.starts_with([' ', '\t', '\x0c']);
+    let wrapped;
+    let (code, plan_line) = if indented {
+        wrapped = format!("class _:\n{code}");
+        (wrapped.as_str(), plan_line + 1)
     } else {
-        let containing = functions
-            .iter()
-            .filter(|f| f.name != "<module>" && f.line_start <= plan.line_start)
-            .max_by_key(|f| f.line_start)?;
-        containing.complexity
+        (code, plan_line)
     };
+    let parsed = parse_module(code).ok()?;
+    let (functions, _) = function_level_cognitive_complexity_shared(
+        parsed.suite(),
+        code,
+        false,
+        true,
+        AnalysisMode::ScoreOnly,
+    );
+    let containing = functions
+        .iter()
+        .filter(|f| f.line_start <= plan_line)
+        .max_by_key(|f| f.line_start)?;
+    Some(containing.complexity)
+}
 
-    Some(plan.current_complexity.saturating_sub(new_complexity))
+/// The `<module>` score of `code`.
+fn module_complexity(code: &str) -> Option<u64> {
+    let parsed = parse_module(code).ok()?;
+    let (functions, _) = function_level_cognitive_complexity_shared(
+        parsed.suite(),
+        code,
+        true,
+        true,
+        AnalysisMode::ScoreOnly,
+    );
+    Some(functions.iter().find(|f| f.name == "<module>")?.complexity)
 }
 
 /// Sorts by effectiveness/reduction/line, then keeps only non-overlapping
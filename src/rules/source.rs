@@ -0,0 +1,74 @@
+use crate::line_index::LineIndex;
+use std::ops::Range;
+use std::sync::Arc;
+
+/// The lines of a module as the refactor rules read them, split once per
+/// file instead of once per region a rule inspects. The lines are the ones
+/// [`LineIndex`] finds, kept with an owned copy of the source so deferred
+/// plans can outlive the analysis.
+pub struct SourceIndex {
+    source: Arc<str>,
+    /// Byte range of each line without its line ending, like the items of
+    /// `str::lines`.
+    lines: Vec<Range<usize>>,
+    /// Bytes of leading whitespace on each line.
+    indents: Vec<usize>,
+}
+
+impl SourceIndex {
+    pub fn new(source: Arc<str>) -> Self {
+        let index = LineIndex::new(&source);
+        let lines: Vec<Range<usize>> = (0..index.line_count())
+            .filter_map(|idx| index.line_range(idx))
+            .collect();
+        let indents = lines
+            .iter()
+            .map(|range| {
+                let line = &source[range.clone()];
+                line.len() - line.trim_start().len()
+            })
+            .collect();
+        SourceIndex {
+            source,
+            lines,
+            indents,
+        }
+    }
+
+    pub fn line_count(&self) -> usize {
+        self.lines.len()
+    }
+
+    /// The 0-based line `idx`. Panics when it is out of range, like
+    /// indexing a slice of lines.
+    pub fn line(&self, idx: usize) -> &str {
+        &self.source[self.lines[idx].clone()]
+    }
+
+    /// The 0-based line `idx`, or `None` when it is out of range.
+    pub fn get(&self, idx: usize) -> Option<&str> {
+        self.lines.get(idx).map(|range| &self.source[range.clone()])
+    }
+
+    /// The lines in `range`. Panics when it is out of range, like slicing.
+    pub fn lines(&self, range: Range<usize>) -> impl Iterator<Item = &str> + '_ {
+        self.lines[range]
+            .iter()
+            .map(|range| &self.source[range.clone()])
+    }
+
+    /// Bytes of leading whitespace on the 0-based line `idx`.
+    pub fn indent(&self, idx: usize) -> usize {
+        self.indents[idx]
+    }
+}
+
+impl From<&str> for SourceIndex {
+    fn from(source: &str) -> Self {
+        SourceIndex::new(Arc::from(source))
+    }
+}
+
+#[cfg(test)]
+#[path = "../tests/rules/source.rs"]
+mod tests;
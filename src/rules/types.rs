@@ -3,7 +3,8 @@ use serde::{Deserialize, Serialize};
 pub use crate::classes::{Applicability, RuleCategory};
 
 use crate::classes::RefactorPlan;
-use crate::refactor_plans::ComplexityRegion;
+use crate::refactor_plans::{ComplexityRegion, RegionKind};
+use crate::rules::source::SourceIndex;
 
 #[derive(Clone, Debug, Serialize, Deserialize)]
 pub struct RuleMetadata {
@@ -23,6 +24,14 @@ pub struct RuleMetadata {
     /// - 1: Default fallback
     pub effectiveness: u8,
     pub doc_url: String,
+    /// Region kinds the rule applies to; empty means every kind. The
+    /// registry only offers a region to the rules that list its kind, so
+    /// `check` does not test the kind again.
+    #[serde(skip)]
+    pub region_kinds: Vec<RegionKind>,
+    /// Smallest region `total` the rule applies to. Regions below it are
+    /// never offered to the rule, so `check` does not test it again.
+    pub min_total: u64,
 }
 
 impl RuleMetadata {
@@ -58,10 +67,12 @@ impl RuleMetadata {
 pub trait RefactorRule: Sync + Send {
     fn metadata(&self) -> &'static RuleMetadata;
 
+    /// A plan for `region`, which the registry has already matched against
+    /// `region_kinds` and `min_total`.
     fn check(
         &self,
         region: &ComplexityRegion,
-        source: &str,
+        source: &SourceIndex,
         function_complexity: u64,
     ) -> Option<crate::classes::RefactorPlan>;
 }
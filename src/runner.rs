@@ -1,139 +1,228 @@
 use crate::classes::{FileComplexity, IgnoredLocation, RemovableIgnore};
-use crate::cognitive_complexity::{code_complexity, function_level_cognitive_complexity_shared};
-use crate::helpers::exclude::get_paths_to_process;
-use crate::utils::{collect_ignored_locations, filter_removable_ignores, get_repo_name};
+use crate::cognitive_complexity::{
+    AnalysisMode, PARALLEL_MODULE_MIN_BYTES, analyze_code, check_nesting_depth,
+    function_level_cognitive_complexity_shared, unparsed_code_complexity,
+};
+use crate::helpers::clone::{ClonedRepo, clone_all, clone_repo, is_repo_url};
+use crate::helpers::exclude::{PathFilter, Shard, get_paths_to_process};
+use crate::helpers::pipeline::{
+    DEFAULT_PATH_QUEUE_DEPTH, DEFAULT_READ_QUEUE_DEPTH, PipelineOptions, resolve_jobs, run_pipeline,
+};
+use crate::helpers::schedule::{CostHistory, FileCost, Schedule};
+use crate::helpers::stack::{analysis_pool, on_analysis_stack};
+use crate::line_index::LineIndex;
+use crate::utils::{
+    IgnoreMarkers, collect_ignored_locations, filter_removable_ignores, may_add_complexity,
+};
+use crossbeam_channel::Receiver;
 use indicatif::ProgressBar;
 use indicatif::ProgressStyle;
 use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
-use regex::Regex;
 use ruff_python_parser::parse_module;
-use std::env;
 use std::path;
-use std::process;
-use std::sync::{Arc, Mutex, OnceLock};
-use std::thread;
-use tempfile::tempdir;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Mutex, OnceLock};
+use std::time::Duration;
 
 struct ProcessOptions {
     quiet: bool,
     exclude: Vec<String>,
     check_script: bool,
     no_ignore: bool,
+    mode: AnalysisMode,
+    stats: bool,
+    shard: Option<Shard>,
+    pipeline: PipelineOptions,
+    history: CostHistory,
+    costs: Mutex<Vec<FileCost>>,
 }
 
 type ComplexitiesAndFailedPaths = (Vec<FileComplexity>, Vec<String>);
 
 #[pyfunction]
-#[pyo3(signature = (paths, quiet, exclude, check_script=false, no_ignore=false, invocation_path="."))]
+#[pyo3(signature = (
+    paths,
+    quiet,
+    exclude,
+    check_script=false,
+    no_ignore=false,
+    invocation_path=".",
+    jobs=None,
+    path_queue_depth=None,
+    read_queue_depth=None,
+    stats=false,
+    schedule="discovery",
+    cost_history=None,
+    shard=None,
+    score_only=false,
+    refactor_plans=false,
+    plan_jobs=None
+))]
+#[allow(clippy::too_many_arguments)]
 pub fn main(
+    py: Python<'_>,
     paths: Vec<String>,
     quiet: bool,
     exclude: Vec<String>,
     check_script: bool,
     no_ignore: bool,
     invocation_path: &str,
+    jobs: Option<usize>,
+    path_queue_depth: Option<usize>,
+    read_queue_depth: Option<usize>,
+    stats: bool,
+    schedule: &str,
+    cost_history: Option<String>,
+    shard: Option<(usize, usize)>,
+    score_only: bool,
+    refactor_plans: bool,
+    plan_jobs: Option<usize>,
 ) -> PyResult<ComplexitiesAndFailedPaths> {
-    let _ = invocation_path;
-
-    let mut successful = Vec::new();
-    let mut failed_paths = Vec::new();
-
-    for path in paths {
-        let is_url = is_repo_url(&path);
-        let path_obj = path::Path::new(&path);
-        let exists = path_obj.exists();
-        let is_dir = path_obj.is_dir();
+    let schedule = Schedule::parse(schedule).map_err(PyValueError::new_err)?;
+    let shard = shard
+        .map(|(index, count)| Shard::new(index, count))
+        .transpose()
+        .map_err(PyValueError::new_err)?;
+    let cost_history = cost_history.map(path::PathBuf::from);
+    let opts = ProcessOptions {
+        quiet,
+        exclude,
+        check_script,
+        no_ignore,
+        mode: AnalysisMode::new(score_only, refactor_plans, plan_jobs),
+        stats,
+        shard,
+        pipeline: PipelineOptions {
+            jobs,
+            path_queue_depth: path_queue_depth.unwrap_or(DEFAULT_PATH_QUEUE_DEPTH),
+            read_queue_depth: read_queue_depth.unwrap_or(DEFAULT_READ_QUEUE_DEPTH),
+            schedule,
+        },
+        history: CostHistory::default(),
+        costs: Mutex::new(Vec::new()),
+    };
+    py.detach(|| {
+        let mut opts = opts;
+        if let Some(history_path) = cost_history.as_deref() {
+            opts.history = CostHistory::load(history_path);
+        }
+        let result = analyze_paths(paths, &opts, invocation_path);
+        if let Some(history_path) = cost_history.as_deref() {
+            let mut history = opts.history;
+            history.record(opts.costs.into_inner().unwrap_or_default());
+            let _ = history.save(history_path);
+        }
+        result
+    })
+}
 
-        if !exists && !is_url {
-            failed_paths.push(path.to_string());
+fn analyze_paths(
+    paths: Vec<String>,
+    opts: &ProcessOptions,
+    invocation_path: &str,
+) -> PyResult<ComplexitiesAndFailedPaths> {
+    let is_url: Vec<bool> = paths.iter().map(|path| is_repo_url(path)).collect();
+    let urls: Vec<(usize, String)> = paths
+        .iter()
+        .enumerate()
+        .filter(|(index, _)| is_url[*index])
+        .map(|(index, path)| (index, path.clone()))
+        .collect();
+    let pending_clones = urls.len();
+    let clones = clone_all(urls);
+
+    // Local paths are analyzed while the clones download; each clone is then
+    // analyzed as soon as it lands. Outcomes are kept per argument so the
+    // output follows the order of `paths` whichever clone finishes first.
+    let mut outcomes: Vec<Option<ComplexitiesAndFailedPaths>> =
+        paths.iter().map(|_| None).collect();
+    for (index, path) in paths.iter().enumerate() {
+        if is_url[index] {
             continue;
         }
+        let path_obj = path::Path::new(path);
+        let outcome = if path_obj.exists() {
+            process_path(path, path_obj.is_dir(), opts, invocation_path)
+                .unwrap_or_else(|_| (Vec::new(), vec![path.to_string()]))
+        } else {
+            (Vec::new(), vec![path.to_string()])
+        };
+        outcomes[index] = Some(outcome);
+    }
 
-        let opts = ProcessOptions {
-            quiet,
-            exclude: exclude.clone(),
-            check_script,
-            no_ignore,
+    for _ in 0..pending_clones {
+        let Some((index, cloned)) = next_clone(&clones, opts.quiet) else {
+            break;
         };
+        outcomes[index] = Some(match cloned {
+            Ok(repo) => evaluate_clone(&repo, opts),
+            Err(_) => (Vec::new(), vec![paths[index].clone()]),
+        });
+    }
 
-        match process_path(&path, is_dir, is_url, &opts, invocation_path) {
-            Ok((mut complexities, mut f_paths)) => {
+    let mut successful = Vec::new();
+    let mut failed_paths = Vec::new();
+    for (index, outcome) in outcomes.into_iter().enumerate() {
+        match outcome {
+            Some((mut complexities, mut f_paths)) => {
                 successful.append(&mut complexities);
                 failed_paths.append(&mut f_paths);
             }
-            Err(_) => failed_paths.push(path.to_string()),
+            None => failed_paths.push(paths[index].clone()),
         }
     }
 
     Ok((successful, failed_paths))
 }
 
+/// Wait for the next finished clone, showing a spinner only while actually
+/// blocked on git.
+fn next_clone(
+    clones: &Receiver<(usize, Result<ClonedRepo, String>)>,
+    quiet: bool,
+) -> Option<(usize, Result<ClonedRepo, String>)> {
+    if let Ok(cloned) = clones.try_recv() {
+        return Some(cloned);
+    }
+    let spinner = (!quiet).then(|| {
+        let pb = ProgressBar::new_spinner();
+        pb.set_style(ProgressStyle::default_spinner());
+        pb.set_message("Cloning repository...");
+        pb.enable_steady_tick(Duration::from_millis(100));
+        pb
+    });
+    let cloned = clones.recv().ok();
+    if let Some(pb) = spinner {
+        pb.finish_and_clear();
+    }
+    cloned
+}
+
+/// Analyze a cloned repository. Paths are reported relative to the clone's
+/// temporary directory, so they start with the repository name.
+fn evaluate_clone(repo: &ClonedRepo, opts: &ProcessOptions) -> ComplexitiesAndFailedPaths {
+    let (mut file_complexities, failed_paths) = evaluate_dir(
+        &repo.path().to_string_lossy(),
+        opts,
+        &repo.base().to_string_lossy(),
+        false,
+    );
+    sort_file_complexities(&mut file_complexities);
+    (file_complexities, failed_paths)
+}
+
 fn process_path(
     path: &str,
     is_dir: bool,
-    is_url: bool,
     opts: &ProcessOptions,
     invocation_path: &str,
 ) -> Result<ComplexitiesAndFailedPaths, PyErr> {
     let mut file_complexities = Vec::new();
     let mut failed_paths = Vec::new();
 
-    if is_url {
-        let dir = tempdir()?;
-        let repo_name = get_repo_name(path)?;
-        env::set_current_dir(&dir)?;
-        let cloning_done = Arc::new(Mutex::new(false));
-        let cloning_done_clone = Arc::clone(&cloning_done);
-        let path_clone = path.to_owned();
-
-        thread::spawn(move || {
-            let _ = process::Command::new("git")
-                .args(["clone", &path_clone])
-                .output();
-            if let Ok(mut done) = cloning_done_clone.lock() {
-                *done = true;
-            }
-        });
-
-        let mut progress_bar = if opts.quiet {
-            None
-        } else {
-            let pb = ProgressBar::new_spinner();
-            pb.set_style(ProgressStyle::default_spinner());
-            pb.set_message("Cloning repository...");
-            Some(pb)
-        };
-
-        loop {
-            match cloning_done.lock() {
-                Ok(done) if *done => break,
-                Ok(_) => {
-                    if let Some(pb) = progress_bar.as_ref() {
-                        pb.tick();
-                    }
-                    thread::sleep(std::time::Duration::from_millis(100));
-                }
-                Err(_) => {
-                    if let Some(pb) = progress_bar.take() {
-                        pb.finish_and_clear();
-                    }
-                    return Err(PyValueError::new_err("Failed to track cloning progress"));
-                }
-            }
-        }
-
-        if let Some(pb) = progress_bar {
-            pb.finish_and_clear();
-        }
-
-        let repo_path = dir.path().join(&repo_name).to_string_lossy().to_string();
-        let (complexities, f_paths) = evaluate_dir(&repo_path, opts, invocation_path);
-        dir.close()?;
-        file_complexities = complexities;
-        failed_paths = f_paths;
-    } else if is_dir {
-        let (complexities, f_paths) = evaluate_dir(path, opts, invocation_path);
+    if is_dir {
+        let (complexities, f_paths) = evaluate_dir(path, opts, invocation_path, true);
         file_complexities = complexities;
         failed_paths = f_paths;
     } else {
@@ -149,7 +238,22 @@ fn process_path(
             .ok()
             .and_then(|p| p.to_str())
             .unwrap_or(path);
-        if let Ok(complexity) = file_complexity(path, &inv_str, opts.check_script, opts.no_ignore) {
+        // A file argument is sharded by its path relative to the invocation
+        // directory, the path it is reported under.
+        if opts
+            .shard
+            .is_some_and(|shard| !shard.contains(&rel.replace('\\', "/")))
+        {
+            return Ok((file_complexities, failed_paths));
+        }
+        if let Ok(complexity) = analyze_file(
+            path,
+            &inv_str,
+            opts.check_script,
+            opts.no_ignore,
+            opts.mode,
+            &AtomicUsize::new(0),
+        ) {
             let mut complexity = complexity;
             complexity.path = rel.to_string();
             file_complexities.push(complexity);
@@ -158,87 +262,225 @@ fn process_path(
         }
     }
 
+    sort_file_complexities(&mut file_complexities);
+    Ok((file_complexities, failed_paths))
+}
+
+fn sort_file_complexities(file_complexities: &mut [FileComplexity]) {
     file_complexities
         .iter_mut()
         .for_each(|f| f.functions.sort_by_key(|f| (f.complexity, f.name.clone())));
     file_complexities.sort_by_key(|f| (f.path.clone(), f.file_name.clone(), f.complexity));
-    Ok((file_complexities, failed_paths))
 }
 
+/// Analyze the Python files under `path`. Measured per-file costs are added
+/// to `opts.costs` when `record_costs` is set; temporary clones skip it so
+/// their throwaway paths never reach the cost history.
 fn evaluate_dir(
     path: &str,
     opts: &ProcessOptions,
     invocation_path: &str,
+    record_costs: bool,
 ) -> ComplexitiesAndFailedPaths {
     let inv_abs = path::Path::new(invocation_path)
         .canonicalize()
         .unwrap_or_else(|_| path::Path::new(invocation_path).to_path_buf());
     let base_dir = inv_abs.to_string_lossy().replace('\\', "/");
-    let files_paths_to_process = match get_paths_to_process(path, opts.exclude.clone()) {
-        Ok(paths) => paths,
+    let filter = match PathFilter::new(&opts.exclude) {
+        Ok(filter) => filter.with_shard(opts.shard),
         Err(e) => return (vec![], vec![format!("{}: {}", path, e)]),
     };
 
-    if opts.quiet {
-        let results: Vec<_> = files_paths_to_process
-            .iter()
-            .map(|file_path| {
-                match file_complexity(file_path, &base_dir, opts.check_script, opts.no_ignore) {
-                    Ok(file_complexity) => (Some(file_complexity), None),
-                    Err(_) => (None, Some(file_path.clone())),
-                }
+    let progress_bar = if opts.quiet {
+        None
+    } else {
+        let pb = ProgressBar::new(0);
+        let bar_style = indicatif::ProgressStyle::default_bar()
+            .template(
+                "{spinner:.green} [{elapsed_precise}] {bar:40.cyan/blue} {pos:>7}/{len:7} {msg}",
+            )
+            .unwrap_or_else(|_| indicatif::ProgressStyle::default_bar())
+            .progress_chars("##-");
+        pb.set_style(bar_style);
+        Some(pb)
+    };
+
+    let on_discovered = || {
+        if let Some(pb) = progress_bar.as_ref() {
+            pb.inc_length(1);
+        }
+    };
+    // Large modules fan their top-level definitions out on a rayon pool
+    // capped at --jobs, built the first time such a module shows up.
+    let module_pool: OnceLock<Option<rayon::ThreadPool>> = OnceLock::new();
+    let prefiltered = AtomicUsize::new(0);
+    let analyze = |file_path: &str, code: String| {
+        let analyze_here = || {
+            analyze_source(
+                file_path,
+                &base_dir,
+                &code,
+                opts.check_script,
+                opts.no_ignore,
+                opts.mode,
+                &prefiltered,
+            )
+        };
+        let pool = (code.len() >= PARALLEL_MODULE_MIN_BYTES)
+            .then(|| {
+                module_pool.get_or_init(|| {
+                    analysis_pool()
+                        .num_threads(resolve_jobs(opts.pipeline.jobs, usize::MAX))
+                        .build()
+                        .ok()
+                })
             })
-            .collect();
-        let mut complexities = Vec::new();
-        let mut failed_paths = Vec::new();
-        for (success, error_path) in results {
-            match (success, error_path) {
-                (Some(file_complexity), None) => complexities.push(file_complexity),
-                (None, Some(failed_path)) => failed_paths.push(failed_path),
-                _ => unreachable!(),
-            }
+            .and_then(Option::as_ref);
+        let result = match pool {
+            Some(pool) => pool.install(analyze_here),
+            None => analyze_here(),
         }
-        return (complexities, failed_paths);
-    }
-
-    let pb = ProgressBar::new(files_paths_to_process.len() as u64);
-    let bar_style = indicatif::ProgressStyle::default_bar()
-        .template("{spiner:.green} [{elapsed_precise}] {bar:40.cyan/blue} {pos:>7}/{len:7} {msg}")
-        .unwrap_or_else(|_| indicatif::ProgressStyle::default_bar())
-        .progress_chars("##-");
-    pb.set_style(bar_style);
-
-    let results: Vec<_> = files_paths_to_process
-        .iter()
-        .map(|file_path| {
+        .map_err(|_| file_path.to_string());
+        if let Some(pb) = progress_bar.as_ref() {
             pb.inc(1);
-            match file_complexity(file_path, &base_dir, opts.check_script, opts.no_ignore) {
-                Ok(file_complexity) => (Some(file_complexity), None),
-                Err(_) => (None, Some(file_path.clone())),
-            }
-        })
-        .collect();
+        }
+        result
+    };
+
+    let run = run_pipeline(
+        path,
+        &filter,
+        &opts.pipeline,
+        &opts.history,
+        on_discovered,
+        analyze,
+    );
+    if record_costs && let Ok(mut costs) = opts.costs.lock() {
+        costs.extend(run.costs);
+    }
 
     let mut complexities = Vec::new();
     let mut failed_paths = Vec::new();
-    for (success, error_path) in results {
-        match (success, error_path) {
-            (Some(file_complexity), None) => complexities.push(file_complexity),
-            (None, Some(failed_path)) => failed_paths.push(failed_path),
-            _ => unreachable!(),
+    for result in run.results {
+        match result {
+            Ok(file_complexity) => complexities.push(file_complexity),
+            Err(failed_path) => failed_paths.push(failed_path),
         }
     }
-    pb.finish_and_clear();
+    failed_paths.sort_unstable();
+    if let Some(pb) = progress_bar {
+        pb.finish_and_clear();
+    }
+    if opts.stats {
+        eprintln!(
+            "{}: {}\n  prefilter  {} of {} files skipped without parsing",
+            path,
+            run.stats,
+            prefiltered.load(Ordering::Relaxed),
+            run.stats.files
+        );
+    }
     (complexities, failed_paths)
 }
 
 #[pyfunction]
-#[pyo3(signature = (file_path, base_path, check_script=false, no_ignore=false))]
+#[pyo3(signature = (file_path, base_path, check_script=false, no_ignore=false, score_only=false))]
 pub fn file_complexity(
+    py: Python<'_>,
     file_path: &str,
     base_path: &str,
     check_script: bool,
     no_ignore: bool,
+    score_only: bool,
+) -> PyResult<FileComplexity> {
+    let mode = AnalysisMode::new(score_only, true, None);
+    py.detach(|| {
+        analyze_file(
+            file_path,
+            base_path,
+            check_script,
+            no_ignore,
+            mode,
+            &AtomicUsize::new(0),
+        )
+    })
+}
+
+/// The Python files `main` would analyze for `paths`, as sorted
+/// `(file_path, base_path)` pairs ready for [`file_complexity`], so the work
+/// can be handed out to other processes. Repository URLs are not cloned and
+/// are returned as failed paths, like paths that do not exist.
+#[pyfunction]
+#[pyo3(signature = (paths, exclude, invocation_path="."))]
+pub fn discover_files(
+    py: Python<'_>,
+    paths: Vec<String>,
+    exclude: Vec<String>,
+    invocation_path: &str,
+) -> PyResult<(Vec<(String, String)>, Vec<String>)> {
+    let inv_abs = path::Path::new(invocation_path)
+        .canonicalize()
+        .unwrap_or_else(|_| path::Path::new(invocation_path).to_path_buf());
+    let base_dir = inv_abs.to_string_lossy().replace('\\', "/");
+    py.detach(|| {
+        let mut files = Vec::new();
+        let mut failed_paths = Vec::new();
+        for path_str in paths {
+            let path_obj = path::Path::new(&path_str);
+            if is_repo_url(&path_str) {
+                failed_paths.push(path_str);
+            } else if path_obj.is_dir() {
+                match get_paths_to_process(&path_str, exclude.clone()) {
+                    Ok(found) => files.extend(found.into_iter().map(|f| (f, base_dir.clone()))),
+                    Err(e) => failed_paths.push(format!("{}: {}", path_str, e)),
+                }
+            } else if path_obj.is_file() {
+                let file_abs = path_obj
+                    .canonicalize()
+                    .unwrap_or_else(|_| path_obj.to_path_buf());
+                files.push((
+                    file_abs.to_string_lossy().replace('\\', "/"),
+                    base_dir.clone(),
+                ));
+            } else {
+                failed_paths.push(path_str);
+            }
+        }
+        Ok((files, failed_paths))
+    })
+}
+
+/// GIL-free body of [`file_complexity`], shared with the directory runner.
+fn analyze_file(
+    file_path: &str,
+    base_path: &str,
+    check_script: bool,
+    no_ignore: bool,
+    mode: AnalysisMode,
+    prefiltered: &AtomicUsize,
+) -> PyResult<FileComplexity> {
+    let code = std::fs::read_to_string(file_path)?;
+    analyze_source(
+        file_path,
+        base_path,
+        &code,
+        check_script,
+        no_ignore,
+        mode,
+        prefiltered,
+    )
+}
+
+/// Score the already-read source `code` of `file_path`. Sources that cannot
+/// add any complexity are not parsed; each one is counted in `prefiltered`.
+fn analyze_source(
+    file_path: &str,
+    base_path: &str,
+    code: &str,
+    check_script: bool,
+    no_ignore: bool,
+    mode: AnalysisMode,
+    prefiltered: &AtomicUsize,
 ) -> PyResult<FileComplexity> {
     let path = path::Path::new(file_path);
     let file_name = path
@@ -250,14 +492,18 @@ pub fn file_complexity(
         .ok()
         .and_then(|p| p.to_str())
         .unwrap_or(file_path);
-    let code = std::fs::read_to_string(file_path)?;
-    let code_complexity = match code_complexity(&code, check_script, no_ignore) {
-        Ok(v) => v,
-        Err(e) => {
-            return Err(PyValueError::new_err(format!(
-                "Failed to process file '{}': {}",
-                file_path, e
-            )));
+    let code_complexity = if !may_add_complexity(code) {
+        prefiltered.fetch_add(1, Ordering::Relaxed);
+        unparsed_code_complexity(code, check_script)
+    } else {
+        match analyze_code(code, check_script, no_ignore, mode) {
+            Ok(v) => v,
+            Err(e) => {
+                return Err(PyValueError::new_err(format!(
+                    "Failed to process file '{}': {}",
+                    file_path, e
+                )));
+            }
         }
     };
     Ok(FileComplexity {
@@ -283,7 +529,8 @@ pub fn collect_file_ignored_locations(
     let code = std::fs::read_to_string(file_path).map_err(|e| {
         PyValueError::new_err(format!("Failed to read file '{}': {}", file_path, e))
     })?;
-    let locations = collect_ignored_locations(&code);
+    let lines = LineIndex::new(&code);
+    let locations = collect_ignored_locations(&IgnoreMarkers::new(&lines));
     Ok(locations
         .into_iter()
         .map(|(line, comment)| IgnoredLocation {
@@ -297,6 +544,7 @@ pub fn collect_file_ignored_locations(
 #[pyfunction]
 #[pyo3(signature = (paths, exclude, invocation_path="."))]
 pub fn collect_all_ignored_locations(
+    py: Python<'_>,
     paths: Vec<String>,
     exclude: Vec<String>,
     invocation_path: &str,
@@ -304,12 +552,13 @@ pub fn collect_all_ignored_locations(
     let _invocation_dir = path::Path::new(invocation_path)
         .canonicalize()
         .unwrap_or_else(|_| path::Path::new(invocation_path).to_path_buf());
-    collect_locations(&paths, &exclude, collect_file_ignored_locations)
+    py.detach(|| collect_locations(&paths, &exclude, collect_file_ignored_locations))
 }
 
 #[pyfunction]
 #[pyo3(signature = (paths, exclude, max_complexity_allowed, invocation_path="."))]
 pub fn collect_removable_ignored_locations(
+    py: Python<'_>,
     paths: Vec<String>,
     exclude: Vec<String>,
     max_complexity_allowed: u64,
@@ -318,8 +567,10 @@ pub fn collect_removable_ignored_locations(
     let _invocation_dir = path::Path::new(invocation_path)
         .canonicalize()
         .unwrap_or_else(|_| path::Path::new(invocation_path).to_path_buf());
-    collect_locations(&paths, &exclude, |file_path, base_dir| {
-        collect_removable_ignores_from_file(file_path, base_dir, max_complexity_allowed)
+    py.detach(|| {
+        collect_locations(&paths, &exclude, |file_path, base_dir| {
+            collect_removable_ignores_from_file(file_path, base_dir, max_complexity_allowed)
+        })
     })
 }
 
@@ -393,60 +644,18 @@ where
     Ok((all_locations, failed_paths))
 }
 
-fn is_repo_url(path: &str) -> bool {
-    static REPO_URL_RE: OnceLock<Regex> = OnceLock::new();
-    let re = REPO_URL_RE.get_or_init(|| {
-        Regex::new(r"^(https:\/\/|http:\/\/|www\.|git@)(github|gitlab)\.com(\/[\w.-]+){2,}$")
-            .expect("valid repository pattern")
-    });
-    re.is_match(path)
-}
-
-fn clone_repo_to_tempdir(url: &str) -> PyResult<(tempfile::TempDir, String)> {
-    let dir = tempdir()?;
-    let repo_name = get_repo_name(url)?;
-    env::set_current_dir(&dir)?;
-    let cloning_done = Arc::new(Mutex::new(false));
-    let cloning_done_clone = Arc::clone(&cloning_done);
-    let path_clone = url.to_owned();
-
-    thread::spawn(move || {
-        let _ = process::Command::new("git")
-            .args(["clone", &path_clone])
-            .output();
-        if let Ok(mut done) = cloning_done_clone.lock() {
-            *done = true;
-        }
-    });
-
-    loop {
-        match cloning_done.lock() {
-            Ok(done) if *done => break,
-            Ok(_) => {
-                thread::sleep(std::time::Duration::from_millis(100));
-            }
-            Err(_) => {
-                return Err(PyValueError::new_err("Failed to track cloning progress"));
-            }
-        }
-    }
-
-    let repo_path = dir.path().join(&repo_name).to_string_lossy().to_string();
-    Ok((dir, repo_path))
-}
-
 fn collect_from_url<T, F>(url: &str, exclude: &[String], collect_file: F) -> PyResult<Vec<T>>
 where
     F: Fn(&str, &str) -> PyResult<Vec<T>>,
 {
-    let (dir, repo_path) = clone_repo_to_tempdir(url)?;
+    let repo = clone_repo(url).map_err(PyValueError::new_err)?;
+    let repo_path = repo.path().to_string_lossy().replace('\\', "/");
     let files =
         get_paths_to_process(&repo_path, exclude.to_vec()).map_err(PyValueError::new_err)?;
-    let base_dir = path::Path::new(&repo_path)
+    let base_dir = repo
+        .base()
         .canonicalize()
-        .unwrap_or_else(|_| path::Path::new(&repo_path).to_path_buf())
-        .parent()
-        .unwrap_or(path::Path::new("."))
+        .unwrap_or_else(|_| repo.base().to_path_buf())
         .to_string_lossy()
         .replace('\\', "/");
 
@@ -457,7 +666,6 @@ where
         }
     }
 
-    dir.close()?;
     Ok(locations)
 }
 
@@ -475,20 +683,25 @@ fn collect_removable_ignores_from_file(
     let code = std::fs::read_to_string(file_path).map_err(|e| {
         PyValueError::new_err(format!("Failed to read file '{}': {}", file_path, e))
     })?;
-    let locations = collect_ignored_locations(&code);
+    let lines = LineIndex::new(&code);
+    let locations = collect_ignored_locations(&IgnoreMarkers::new(&lines));
     if locations.is_empty() {
         return Ok(vec![]);
     }
-    let parsed = parse_module(&code)
-        .map_err(|e| PyValueError::new_err(format!("Failed to parse code: {}", e)))?;
-    let ast_body = parsed.into_suite();
-    let (functions, _) = function_level_cognitive_complexity_shared(
-        &ast_body,
-        &code,
-        false,
-        true,
-        false,
-    );
+    let functions = on_analysis_stack(|| {
+        let parsed = parse_module(&code)
+            .map_err(|e| PyValueError::new_err(format!("Failed to parse code: {}", e)))?;
+        let ast_body = parsed.into_suite();
+        check_nesting_depth(&ast_body).map_err(PyValueError::new_err)?;
+        let (functions, _) = function_level_cognitive_complexity_shared(
+            &ast_body,
+            &code,
+            false,
+            true,
+            AnalysisMode::ScoreOnly,
+        );
+        Ok::<_, PyErr>(functions)
+    })?;
     let removable = filter_removable_ignores(&locations, &functions, max_complexity_allowed);
     Ok(removable
         .into_iter()
@@ -0,0 +1,174 @@
+//! Unit tests for the boolean-operator counting in `crate::utils`.
+//!
+//! Wired in from `src/utils.rs` via `#[cfg(test)] #[path = ...] mod bool_ops_tests;`
+//! so this stays a child module of the code it tests.
+
+use super::count_bool_ops;
+use ruff_python_ast::{self as ast, Stmt};
+use ruff_python_parser::parse_module;
+use std::time::Instant;
+
+/// The recursive count `count_bool_ops` used for boolean and unary
+/// expressions before the per-depth tally, kept as the reference.
+fn reference_changes(expr: &ast::Expr, prev_pr: &ast::Expr) -> u64 {
+    let mut complexity: u64 = 0;
+
+    match expr {
+        ast::Expr::BoolOp(b) => match prev_pr {
+            ast::Expr::BoolOp(p) => {
+                if b.op != p.op {
+                    complexity += 1;
+                }
+
+                for value in p.values.iter() {
+                    complexity += reference_changes(value, expr);
+                }
+            }
+            ast::Expr::UnaryOp(p) => {
+                complexity = 1 + reference_changes(&p.operand, expr);
+            }
+            _ => {}
+        },
+        ast::Expr::UnaryOp(..) => match prev_pr {
+            ast::Expr::BoolOp(p) => {
+                for value in p.values.iter() {
+                    complexity += reference_changes(value, expr);
+                }
+            }
+            ast::Expr::UnaryOp(p) => {
+                complexity = reference_changes(&p.operand, expr);
+            }
+            _ => {}
+        },
+        _ => {}
+    }
+
+    complexity
+}
+
+fn reference_count(expr: &ast::Expr) -> u64 {
+    match expr {
+        ast::Expr::BoolOp(b) => {
+            1 + b
+                .values
+                .iter()
+                .map(|value| reference_changes(value, expr))
+                .sum::<u64>()
+        }
+        ast::Expr::UnaryOp(u) => reference_changes(&u.operand, expr),
+        _ => 0,
+    }
+}
+
+fn with_expression<T>(source: &str, f: impl FnOnce(&ast::Expr) -> T) -> T {
+    let parsed = parse_module(source).unwrap();
+    let Stmt::Expr(statement) = &parsed.suite()[0] else {
+        panic!("{source:?} is not an expression statement");
+    };
+    f(&statement.value)
+}
+
+/// xorshift64, so the generated expressions are the same on every run.
+struct Rng(u64);
+
+impl Rng {
+    fn below(&mut self, n: u64) -> u64 {
+        self.0 ^= self.0 << 13;
+        self.0 ^= self.0 >> 7;
+        self.0 ^= self.0 << 17;
+        self.0 % n
+    }
+}
+
+fn random_expression(rng: &mut Rng, depth: u32, next_name: &mut u32) -> String {
+    let choice = if depth == 0 { 0 } else { rng.below(10) };
+    match choice {
+        0..=2 => {
+            *next_name += 1;
+            format!("x{next_name}")
+        }
+        3 => format!("not {}", random_expression(rng, depth - 1, next_name)),
+        4 => format!("-({})", random_expression(rng, depth - 1, next_name)),
+        _ => {
+            let op = if rng.below(2) == 0 { " and " } else { " or " };
+            let values: Vec<String> = (0..2 + rng.below(3))
+                .map(|_| random_expression(rng, depth - 1, next_name))
+                .collect();
+            format!("({})", values.join(op))
+        }
+    }
+}
+
+#[test]
+fn counts_match_the_recursive_reference_on_random_expressions() {
+    let mut rng = Rng(0x9e37_79b9_7f4a_7c15);
+    for _ in 0..2_000 {
+        let depth = 1 + rng.below(6) as u32;
+        let source = random_expression(&mut rng, depth, &mut 0);
+        with_expression(&source, |expr| {
+            assert_eq!(count_bool_ops(expr, 0), reference_count(expr), "{source}");
+        });
+    }
+}
+
+/// A balanced tree over `terms` names whose operator alternates with depth
+/// and which negates every third subtree, like generated validation code.
+fn mixed_expression(terms: usize) -> String {
+    fn build(lo: usize, hi: usize, depth: usize) -> String {
+        if hi - lo == 1 {
+            return format!("x{lo}");
+        }
+        let mid = (lo + hi) / 2;
+        let op = if depth % 2 == 0 { "and" } else { "or" };
+        let expression = format!(
+            "({} {op} {})",
+            build(lo, mid, depth + 1),
+            build(mid, hi, depth + 1)
+        );
+        if (lo + depth) % 3 == 0 {
+            format!("not {expression}")
+        } else {
+            expression
+        }
+    }
+    build(0, terms, 0)
+}
+
+#[test]
+fn thousand_term_mixed_expressions_match_the_reference() {
+    let flat: Vec<String> = (0..1_000)
+        .map(|i| match i % 3 {
+            0 => format!("x{i}"),
+            1 => format!("not x{i}"),
+            _ => format!("(x{i} or y{i})"),
+        })
+        .collect();
+    let sources = [
+        mixed_expression(1_000),
+        format!("not {}", mixed_expression(1_000)),
+        flat.join(" and "),
+    ];
+    for source in &sources {
+        with_expression(source, |expr| {
+            assert_eq!(count_bool_ops(expr, 0), reference_count(expr));
+        });
+    }
+}
+
+/// Scores 1,000-term mixed boolean expressions; run with
+/// `cargo test --release mixed_boolean_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn mixed_boolean_benchmark() {
+    let source = mixed_expression(1_000);
+    with_expression(&source, |expr| {
+        let start = Instant::now();
+        let mut total = 0;
+        for _ in 0..1_000 {
+            total += count_bool_ops(expr, 0);
+        }
+        let elapsed = start.elapsed();
+        assert_eq!(total, 1_000 * reference_count(expr));
+        println!("scored a 1,000-term expression 1,000 times in {elapsed:?}");
+    });
+}
@@ -0,0 +1,838 @@
+//! Unit tests for `crate::cognitive_complexity`.
+//!
+//! Wired in from `src/cognitive_complexity.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests and can reach its
+//! private helpers through `super::`.
+
+use super::{
+    AnalysisMode, MAX_NESTING_DEPTH, PARALLEL_MODULE_MIN_BYTES, WalkArena, check_nesting_depth,
+    is_ignored, module_cognitive_complexity, nesting_depth, statement_cognitive_complexity_shared,
+};
+use crate::classes::{FunctionComplexity, LineComplexities, LineComplexity};
+use crate::helpers::stack::on_analysis_stack;
+use crate::line_index::LineIndex;
+use crate::refactor_plans::{ComplexityRegion, ComplexityResult, RegionKind};
+use crate::utils::IgnoreMarkers;
+use ruff_python_ast::{self as ast, Stmt, visitor::Visitor};
+use ruff_python_parser::parse_module;
+use std::alloc::{GlobalAlloc, Layout, System};
+use std::cell::Cell;
+use std::path::{Path, PathBuf};
+use std::time::Instant;
+
+type Snapshot = (
+    String,
+    u64,
+    u64,
+    u64,
+    Vec<(u64, u64)>,
+    Vec<(String, u64, u64, u64)>,
+    u64,
+);
+
+fn snapshot(functions: &[FunctionComplexity]) -> Vec<Snapshot> {
+    functions
+        .iter()
+        .map(|f| {
+            (
+                f.name.clone(),
+                f.complexity,
+                f.line_start,
+                f.line_end,
+                f.line_complexities
+                    .iter()
+                    .map(|l| (l.line, l.complexity))
+                    .collect(),
+                f.refactor_plans
+                    .iter()
+                    .map(|p| {
+                        (
+                            p.rule_id.clone(),
+                            p.line_start,
+                            p.line_end,
+                            p.estimated_reduction,
+                        )
+                    })
+                    .collect(),
+                f.additional_refactor_plans,
+            )
+        })
+        .collect()
+}
+
+fn large_module() -> String {
+    let mut code = String::from("import os\n\n");
+    let mut i = 0;
+    while code.len() < PARALLEL_MODULE_MIN_BYTES * 2 {
+        code.push_str(&format!(
+            "def func_{i}(a, b, c):\n    for x in a:\n        if x:\n            if b and c or a:\n                while b:\n                    if c:\n                        return func_{i}(a, b, c)\n    return a\n\n\
+class Model{i}:\n    def method(self, v):\n        if v:\n            return 1\n        elif v is None:\n            return 2\n        elif v == 3:\n            return 3\n        elif v == 4:\n            return 4\n        return 0\n\n\
+if os.environ.get('X_{i}') and os.environ.get('Y'):\n    pass\n\n"
+        ));
+        i += 1;
+    }
+    code
+}
+
+#[test]
+fn parallel_analysis_matches_serial_output() {
+    let code = large_module();
+    let parsed = parse_module(&code).unwrap();
+    for check_script in [false, true] {
+        let (serial, serial_total) = module_cognitive_complexity(
+            parsed.suite(),
+            &code,
+            check_script,
+            false,
+            AnalysisMode::Full,
+            false,
+        );
+        let (parallel, parallel_total) = module_cognitive_complexity(
+            parsed.suite(),
+            &code,
+            check_script,
+            false,
+            AnalysisMode::Full,
+            true,
+        );
+        assert_eq!(serial_total, parallel_total);
+        assert_eq!(snapshot(&serial), snapshot(&parallel));
+        assert!(serial.iter().any(|f| !f.refactor_plans.is_empty()));
+    }
+}
+
+/// Whole-module analysis of a ~50k-line file, where per-statement line
+/// lookups used to rescan the source; run with
+/// `cargo test --release large_file_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn large_file_benchmark() {
+    let mut code = String::new();
+    let mut i = 0;
+    while code.lines().count() < 50_000 {
+        code.push_str(&format!(
+            "def handler_{i}(event, context):\n    for record in event:\n        if record and context:\n            try:\n                value = record['v'] or 0\n            except KeyError:\n                value = None\n        elif record is None:\n            continue\n    return value\n\n"
+        ));
+        i += 1;
+    }
+    let parsed = parse_module(&code).unwrap();
+
+    let start = Instant::now();
+    let (functions, _) = module_cognitive_complexity(
+        parsed.suite(),
+        &code,
+        false,
+        false,
+        AnalysisMode::NoPlans,
+        false,
+    );
+    let elapsed = start.elapsed();
+
+    assert_eq!(functions.len(), i);
+    println!(
+        "analyzed {} lines ({} functions) in {:?}",
+        code.lines().count(),
+        functions.len(),
+        elapsed
+    );
+}
+
+/// Counts the heap allocations of the current thread while counting is on,
+/// so a test can assert that the walker never copies AST subtrees.
+struct CountingAllocator;
+
+thread_local! {
+    static COUNTING: Cell<bool> = const { Cell::new(false) };
+    static ALLOCATIONS: Cell<usize> = const { Cell::new(0) };
+}
+
+unsafe impl GlobalAlloc for CountingAllocator {
+    unsafe fn alloc(&self, layout: Layout) -> *mut u8 {
+        if COUNTING.try_with(Cell::get).unwrap_or(false) {
+            let _ = ALLOCATIONS.try_with(|count| count.set(count.get() + 1));
+        }
+        unsafe { System.alloc(layout) }
+    }
+
+    unsafe fn dealloc(&self, ptr: *mut u8, layout: Layout) {
+        unsafe { System.dealloc(ptr, layout) }
+    }
+}
+
+#[global_allocator]
+static ALLOCATOR: CountingAllocator = CountingAllocator;
+
+fn count_allocations<T>(f: impl FnOnce() -> T) -> (T, usize) {
+    ALLOCATIONS.with(|count| count.set(0));
+    COUNTING.with(|counting| counting.set(true));
+    let value = f();
+    COUNTING.with(|counting| counting.set(false));
+    (value, ALLOCATIONS.with(Cell::get))
+}
+
+fn dict_assignment(entries: usize) -> String {
+    let values: Vec<String> = (0..entries)
+        .map(|i| format!("'k{i}': a and b or not c_{i} if d else [e for e in f if e]"))
+        .collect();
+    format!("x = {{{}}}\n", values.join(", "))
+}
+
+#[test]
+fn walking_an_expression_allocates_independently_of_its_size() {
+    let walk = |code: &str| {
+        let parsed = parse_module(code).unwrap();
+        let lines = LineIndex::new(code);
+        let statement = &parsed.suite()[0];
+        let mut arena = WalkArena::default();
+        count_allocations(|| {
+            statement_cognitive_complexity_shared(statement, 0, &lines, &mut arena, None)
+        })
+    };
+
+    let (small_complexity, small_allocations) = walk(&dict_assignment(10));
+    let (large_complexity, large_allocations) = walk(&dict_assignment(2_000));
+    assert!(large_complexity > small_complexity);
+    assert_eq!(small_allocations, large_allocations);
+}
+
+/// The separate search for a direct recursive call that `analyze_function`
+/// ran after the complexity walk, kept as the reference for the fused walk.
+struct RecursionFinder<'a> {
+    name: &'a str,
+    found: Option<usize>,
+}
+
+impl<'a> Visitor<'a> for RecursionFinder<'a> {
+    fn visit_stmt(&mut self, stmt: &'a Stmt) {
+        if self.found.is_some() {
+            return;
+        }
+        if matches!(stmt, Stmt::FunctionDef(_) | Stmt::ClassDef(_)) {
+            return;
+        }
+        ast::visitor::walk_stmt(self, stmt);
+    }
+
+    fn visit_expr(&mut self, expr: &'a ast::Expr) {
+        if self.found.is_some() {
+            return;
+        }
+        if let ast::Expr::Call(c) = expr
+            && let ast::Expr::Name(n) = c.func.as_ref()
+            && n.id.as_str() == self.name
+        {
+            self.found = Some(usize::from(c.range.start()));
+            return;
+        }
+        if matches!(expr, ast::Expr::Lambda(_)) {
+            return;
+        }
+        ast::visitor::walk_expr(self, expr);
+    }
+}
+
+type Score = (String, u64, Vec<(u64, u64)>);
+
+/// Score every function of `code` with the fused walk.
+fn fused_scores(code: &str) -> Vec<Score> {
+    let parsed = parse_module(code).unwrap();
+    let (functions, _) = module_cognitive_complexity(
+        parsed.suite(),
+        code,
+        false,
+        false,
+        AnalysisMode::NoPlans,
+        false,
+    );
+    functions
+        .iter()
+        .map(|f| {
+            let lines = f.line_complexities.iter();
+            (
+                f.name.clone(),
+                f.complexity,
+                lines.map(|l| (l.line, l.complexity)).collect(),
+            )
+        })
+        .collect()
+}
+
+/// Score every function of `code` in two passes: the complexity walk without
+/// a recursion scan, then a [`RecursionFinder`] over the body.
+fn two_pass_scores(code: &str) -> Vec<Score> {
+    let parsed = parse_module(code).unwrap();
+    let lines = LineIndex::new(code);
+    let markers = IgnoreMarkers::new(&lines);
+    let mut functions = Vec::new();
+    for node in parsed.suite() {
+        match node {
+            Stmt::FunctionDef(f) => functions.push((node, f, f.name.to_string())),
+            Stmt::ClassDef(c) => {
+                for node in c.body.iter() {
+                    if let Stmt::FunctionDef(f) = node {
+                        functions.push((node, f, format!("{}::{}", c.name, f.name)));
+                    }
+                }
+            }
+            _ => {}
+        }
+    }
+    functions
+        .into_iter()
+        .filter(|(_, f, _)| !is_ignored(f, &lines, Some(&markers)))
+        .map(|(node, f, name)| {
+            let mut arena = WalkArena::default();
+            let mut complexity =
+                statement_cognitive_complexity_shared(node, 0, &lines, &mut arena, None);
+            let mut finder = RecursionFinder {
+                name: f.name.as_str(),
+                found: None,
+            };
+            ast::visitor::walk_body(&mut finder, &f.body);
+            let mut line_complexities = arena.line_complexities.clone();
+            if let Some(offset) = finder.found {
+                complexity += 1;
+                line_complexities.push(LineComplexity {
+                    line: lines.line_number(offset),
+                    complexity: 1,
+                });
+            }
+            let line_complexities = LineComplexities::from(line_complexities);
+            let lines = line_complexities.iter();
+            (
+                name,
+                complexity,
+                lines.map(|l| (l.line, l.complexity)).collect(),
+            )
+        })
+        .collect()
+}
+
+fn python_files(dir: &Path, files: &mut Vec<PathBuf>) {
+    for entry in std::fs::read_dir(dir).unwrap() {
+        let path = entry.unwrap().path();
+        if path.is_dir() {
+            python_files(&path, files);
+        } else if path.extension().is_some_and(|ext| ext == "py") {
+            files.push(path);
+        }
+    }
+}
+
+/// Conformance suite for the fused walk: every Python file under `tests/`
+/// scores exactly as it did with the separate recursion pass.
+#[test]
+fn fused_walk_matches_two_pass_scores_on_test_fixtures() {
+    let mut files = Vec::new();
+    python_files(
+        &Path::new(env!("CARGO_MANIFEST_DIR")).join("tests"),
+        &mut files,
+    );
+    files.sort();
+
+    let mut scored = 0;
+    for path in files {
+        let code = std::fs::read_to_string(&path).unwrap();
+        if parse_module(&code).is_err() {
+            continue;
+        }
+        assert_eq!(
+            fused_scores(&code),
+            two_pass_scores(&code),
+            "{}",
+            path.display()
+        );
+        scored += 1;
+    }
+    assert!(scored >= 50, "only {scored} fixtures were scored");
+}
+
+#[test]
+fn fused_walk_finds_recursion_wherever_the_separate_pass_did() {
+    let code = r#"
+def in_elif(n):
+    if n:
+        pass
+    elif in_elif(n - 1):
+        pass
+
+def in_loop_header(n):
+    for x in in_loop_header(n):
+        pass
+    while in_loop_header(n):
+        pass
+
+def in_with(n):
+    with open(n) as f, in_with(f) as g:
+        pass
+
+def in_handler(n):
+    try:
+        pass
+    except in_handler(n):
+        pass
+    finally:
+        del in_handler(n)[0]
+
+def in_match(n):
+    match n:
+        case 1 if in_match(n - 1):
+            pass
+
+def in_nested_scopes(n, default=in_nested_scopes):
+    def inner():
+        return in_nested_scopes(n)
+    class Local:
+        def method(self):
+            return in_nested_scopes(n)
+    return lambda: in_nested_scopes(n)
+
+def decorator(fn):
+    def wrapper(*args):
+        return decorator(fn)(*args)
+    return decorator(wrapper)
+
+def first_call_wins(n):
+    if n:
+        x: int = 1
+        return first_call_wins(
+            n - 1
+        )
+    elif first_call_wins(n):
+        pass
+    return [first_call_wins(i) for i in n]
+
+class Tree:
+    def walk(self, node):
+        for child in node.children:
+            walk(child)
+        assert walk(node), walk(node)
+"#;
+    let fused = fused_scores(code);
+    assert_eq!(fused, two_pass_scores(code));
+
+    let complexity = |name: &str| fused.iter().find(|f| f.0 == name).unwrap().1;
+    assert_eq!(complexity("in_elif"), 3);
+    assert_eq!(complexity("in_nested_scopes"), 0);
+    assert_eq!(complexity("decorator"), 1);
+}
+
+fn walk_function(code: &str) -> ComplexityResult {
+    let parsed = parse_module(code).unwrap();
+    let lines = LineIndex::new(code);
+    let mut arena = WalkArena::default();
+    let complexity =
+        statement_cognitive_complexity_shared(&parsed.suite()[0], 0, &lines, &mut arena, None);
+    arena.finish(complexity, true)
+}
+
+#[test]
+fn arena_regions_assemble_into_the_nested_tree() {
+    let result = walk_function(
+        "def f(a, b):\n    for x in a:\n        if x and b or a:\n            while b:\n                pass\n    try:\n        pass\n    except E:\n        pass\n",
+    );
+    assert_eq!(result.complexity, 9);
+
+    let shape = |region: &ComplexityRegion| (region.kind as u8, region.total, region.line_start);
+    let roots: Vec<_> = result.regions.iter().map(shape).collect();
+    assert_eq!(
+        roots,
+        vec![
+            (RegionKind::Loop as u8, 8, 2),
+            (RegionKind::Try as u8, 1, 6)
+        ]
+    );
+    let branch = &result.regions[0].children[0];
+    assert_eq!(shape(branch), (RegionKind::If as u8, 7, 3));
+    let leaves: Vec<_> = branch.children.iter().map(shape).collect();
+    assert_eq!(
+        leaves,
+        vec![
+            (RegionKind::BooleanCondition as u8, 2, 3),
+            (RegionKind::Loop as u8, 3, 4)
+        ]
+    );
+}
+
+#[test]
+fn reused_arenas_start_empty() {
+    let code = large_module();
+    let parsed = parse_module(&code).unwrap();
+    let (first, _) = module_cognitive_complexity(
+        parsed.suite(),
+        &code,
+        true,
+        false,
+        AnalysisMode::Full,
+        false,
+    );
+    let (second, _) = module_cognitive_complexity(
+        parsed.suite(),
+        &code,
+        true,
+        false,
+        AnalysisMode::Full,
+        false,
+    );
+    assert_eq!(snapshot(&first), snapshot(&second));
+
+    let small = "def g(x):\n    if x:\n        return 1\n";
+    let parsed = parse_module(small).unwrap();
+    let (functions, _) = module_cognitive_complexity(
+        parsed.suite(),
+        small,
+        false,
+        false,
+        AnalysisMode::Full,
+        false,
+    );
+    assert_eq!(functions[0].line_complexities.len(), 2);
+}
+
+/// Walks a function nested 200 blocks deep, where every line and region
+/// used to be copied once per enclosing block; run with
+/// `cargo test --release deep_nesting_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn deep_nesting_benchmark() {
+    let depth = 200;
+    let mut code = String::from("def deep(x):\n");
+    for level in 1..=depth {
+        code.push_str(&"    ".repeat(level));
+        code.push_str(if level % 2 == 0 {
+            "for y in x:\n"
+        } else {
+            "if x and y:\n"
+        });
+    }
+    code.push_str(&"    ".repeat(depth + 1));
+    code.push_str("pass\n");
+    let parsed = parse_module(&code).unwrap();
+
+    let start = Instant::now();
+    let (functions, _) = module_cognitive_complexity(
+        parsed.suite(),
+        &code,
+        false,
+        false,
+        AnalysisMode::Full,
+        false,
+    );
+    let elapsed = start.elapsed();
+
+    assert_eq!(functions[0].line_complexities.len(), depth);
+    println!("walked {depth} nested blocks in {elapsed:?}");
+}
+
+/// Compares the memory of the line complexities the walk records with the
+/// packed pairs the results keep, over this repository's Python sources and
+/// a generated module; run with
+/// `cargo test --release line_complexities_memory_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn line_complexities_memory_benchmark() {
+    let root = Path::new(env!("CARGO_MANIFEST_DIR"));
+    let mut files = Vec::new();
+    python_files(&root.join("complexipy"), &mut files);
+    python_files(&root.join("tests"), &mut files);
+    let mut sources: Vec<String> = files
+        .iter()
+        .map(|path| std::fs::read_to_string(path).unwrap())
+        .collect();
+    sources.push(large_module());
+
+    let (mut recorded, mut kept) = (0, 0);
+    let mut arena = WalkArena::default();
+    for code in &sources {
+        let parsed = parse_module(code).unwrap();
+        let lines = LineIndex::new(code);
+        for node in parsed.suite() {
+            arena.clear();
+            let complexity =
+                statement_cognitive_complexity_shared(node, 0, &lines, &mut arena, None);
+            recorded += arena.line_complexities.len();
+            kept += arena.finish(complexity, false).line_complexities.len();
+        }
+    }
+
+    assert_eq!(kept, recorded);
+    let unpacked = recorded * std::mem::size_of::<LineComplexity>();
+    let packed = kept * std::mem::size_of::<[u32; 2]>();
+    assert!(packed < unpacked);
+    println!(
+        "{} files: {recorded} lines, {unpacked} bytes as LineComplexity, {packed} bytes packed",
+        sources.len(),
+    );
+}
+
+type Totals = (String, u64, u64, u64);
+
+fn totals(code: &str, check_script: bool, mode: AnalysisMode) -> (Vec<Totals>, u64) {
+    let parsed = parse_module(code).unwrap();
+    let (functions, total) =
+        module_cognitive_complexity(parsed.suite(), code, check_script, false, mode, false);
+    if mode == AnalysisMode::ScoreOnly {
+        assert!(functions.iter().all(|f| f.line_complexities.is_empty()));
+        assert!(functions.iter().all(|f| f.refactor_plans.is_empty()));
+    }
+    let functions = functions
+        .into_iter()
+        .map(|f| (f.name, f.complexity, f.line_start, f.line_end))
+        .collect();
+    (functions, total)
+}
+
+#[test]
+fn score_only_keeps_the_totals_and_line_ranges_of_full_analysis() {
+    let mut files = Vec::new();
+    python_files(
+        &Path::new(env!("CARGO_MANIFEST_DIR")).join("tests"),
+        &mut files,
+    );
+    let mut sources: Vec<String> = files
+        .iter()
+        .map(|path| std::fs::read_to_string(path).unwrap())
+        .collect();
+    sources.push(large_module());
+
+    for code in &sources {
+        for check_script in [false, true] {
+            assert_eq!(
+                totals(code, check_script, AnalysisMode::ScoreOnly),
+                totals(code, check_script, AnalysisMode::Full),
+            );
+        }
+    }
+
+    // The thread's arena records lines again after a score-only walk.
+    let code = large_module();
+    let parsed = parse_module(&code).unwrap();
+    let (functions, _) = module_cognitive_complexity(
+        parsed.suite(),
+        &code,
+        false,
+        false,
+        AnalysisMode::NoPlans,
+        false,
+    );
+    assert!(functions.iter().all(|f| !f.line_complexities.is_empty()));
+}
+
+type PlanSnapshot = (String, Vec<(String, u64, u64, u64)>, u64);
+
+fn plan_snapshot(functions: &[FunctionComplexity]) -> Vec<PlanSnapshot> {
+    functions
+        .iter()
+        .map(|f| {
+            let (plans, additional) = f.plans();
+            let plans = plans
+                .iter()
+                .map(|p| {
+                    (
+                        p.rule_id.clone(),
+                        p.line_start,
+                        p.line_end,
+                        p.estimated_reduction,
+                    )
+                })
+                .collect();
+            (f.name.clone(), plans, additional)
+        })
+        .collect()
+}
+
+#[test]
+fn deferred_plans_match_the_plans_built_during_analysis() {
+    let mut files = Vec::new();
+    python_files(
+        &Path::new(env!("CARGO_MANIFEST_DIR")).join("tests"),
+        &mut files,
+    );
+    let mut planned = 0;
+    for path in &files {
+        let code = std::fs::read_to_string(path).unwrap();
+        let parsed = parse_module(&code).unwrap();
+        for check_script in [false, true] {
+            let analyze = |mode| {
+                module_cognitive_complexity(parsed.suite(), &code, check_script, false, mode, false)
+            };
+            let (full, full_total) = analyze(AnalysisMode::Full);
+            let (deferred, deferred_total) =
+                analyze(AnalysisMode::DeferredPlans { plan_jobs: None });
+            let (serial, _) = analyze(AnalysisMode::DeferredPlans { plan_jobs: Some(1) });
+            let (no_plans, _) = analyze(AnalysisMode::NoPlans);
+
+            assert_eq!(deferred_total, full_total);
+            assert!(
+                deferred
+                    .iter()
+                    .all(|f| f.deferred_plans.is_some() && f.refactor_plans.is_empty())
+            );
+            assert!(no_plans.iter().all(|f| f.deferred_plans.is_none()));
+            assert!(
+                plan_snapshot(&no_plans)
+                    .iter()
+                    .all(|(_, plans, _)| plans.is_empty())
+            );
+
+            // Clones share the plans, so they are built once for all.
+            let copies = deferred.clone();
+            assert_eq!(plan_snapshot(&deferred), plan_snapshot(&full), "{path:?}");
+            assert_eq!(snapshot(&deferred), snapshot(&no_plans));
+            assert_eq!(plan_snapshot(&copies), plan_snapshot(&full));
+            assert_eq!(plan_snapshot(&serial), plan_snapshot(&full));
+            planned += plan_snapshot(&full)
+                .iter()
+                .filter(|(_, plans, _)| !plans.is_empty())
+                .count();
+        }
+    }
+    assert!(planned > 0);
+}
+
+/// Throughput of the analysis modes on a ~50k-line module; run with
+/// `cargo test --release analysis_mode_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn analysis_mode_benchmark() {
+    let mut code = String::new();
+    while code.lines().count() < 50_000 {
+        code.push_str(&large_module());
+    }
+    let parsed = parse_module(&code).unwrap();
+    let megabytes = code.len() as f64 / (1024.0 * 1024.0);
+
+    for mode in [
+        AnalysisMode::Full,
+        AnalysisMode::DeferredPlans { plan_jobs: None },
+        AnalysisMode::NoPlans,
+        AnalysisMode::ScoreOnly,
+    ] {
+        let start = Instant::now();
+        let (functions, _) =
+            module_cognitive_complexity(parsed.suite(), &code, false, false, mode, false);
+        let elapsed = start.elapsed();
+        println!(
+            "{mode:?}: {} functions in {elapsed:?} ({:.1} MiB/s)",
+            functions.len(),
+            megabytes / elapsed.as_secs_f64()
+        );
+    }
+}
+
+/// A function whose body nests `depth` blocks, alternating `if` and `with`,
+/// indented one space per level to keep the source small.
+fn nested_blocks(depth: usize) -> String {
+    let mut code = String::from("def deep(x):\n");
+    for level in 1..=depth {
+        code.push_str(&" ".repeat(level));
+        code.push_str(if level % 2 == 1 {
+            "if x:\n"
+        } else {
+            "with x:\n"
+        });
+    }
+    code.push_str(&" ".repeat(depth + 1));
+    code.push_str("pass\n");
+    code
+}
+
+/// A function returning `depth` nested calls, each wrapping a conditional
+/// expression whose `else` branch holds the next call.
+fn nested_expressions(depth: usize) -> String {
+    let mut expr = String::from("x");
+    for _ in 0..depth {
+        expr = format!("g(a if b else {expr})");
+    }
+    format!("def deep(x):\n    return {expr}\n")
+}
+
+/// Parse, check and score `code` the way `analyze_code` does, from a thread
+/// whose stack is far too small for the walk itself.
+fn analyze_from_small_stack(code: String, mode: AnalysisMode) -> (usize, Vec<FunctionComplexity>) {
+    std::thread::Builder::new()
+        .stack_size(256 * 1024)
+        .spawn(move || {
+            on_analysis_stack(|| {
+                let parsed = parse_module(&code).unwrap();
+                check_nesting_depth(parsed.suite()).unwrap();
+                let (functions, _) =
+                    module_cognitive_complexity(parsed.suite(), &code, false, false, mode, true);
+                (nesting_depth(parsed.suite()), functions)
+            })
+        })
+        .unwrap()
+        .join()
+        .unwrap()
+}
+
+#[test]
+fn nesting_depth_counts_the_enclosing_compound_statements() {
+    let cases = [
+        ("x = 1\n", 0),
+        ("def f():\n    pass\n", 1),
+        (
+            "class A:\n    def f(self):\n        if x:\n            pass\n",
+            3,
+        ),
+        (
+            "try:\n    pass\nexcept E:\n    for y in x:\n        pass\n",
+            2,
+        ),
+        (
+            "match x:\n    case 1:\n        while x:\n            pass\n",
+            2,
+        ),
+        ("if x:\n    pass\nelse:\n    with x:\n        pass\n", 2),
+    ];
+    for (code, depth) in cases {
+        let parsed = parse_module(code).unwrap();
+        assert_eq!(nesting_depth(parsed.suite()), depth, "{code:?}");
+    }
+}
+
+#[test]
+fn five_thousand_nested_blocks_do_not_exhaust_the_stack() {
+    let depth = 5000;
+    assert!(depth < MAX_NESTING_DEPTH);
+    // Only the `if` blocks add nesting; the `with` blocks in between do not.
+    let ifs = depth as u64 / 2;
+    for mode in [AnalysisMode::NoPlans, AnalysisMode::ScoreOnly] {
+        let (nesting, functions) = analyze_from_small_stack(nested_blocks(depth), mode);
+        assert_eq!(nesting, depth + 1);
+        assert_eq!(functions[0].complexity, ifs * (ifs + 1) / 2);
+        if mode == AnalysisMode::NoPlans {
+            assert_eq!(functions[0].line_complexities.len(), depth);
+        }
+    }
+}
+
+#[test]
+fn five_thousand_nested_expressions_do_not_exhaust_the_stack() {
+    let depth = 5000;
+    let (nesting, functions) =
+        analyze_from_small_stack(nested_expressions(depth), AnalysisMode::NoPlans);
+    assert_eq!(nesting, 1);
+    let depth = depth as u64;
+    assert_eq!(functions[0].complexity, depth * (depth + 1) / 2);
+}
+
+/// Parses and scores 5,000 nested blocks and 5,000 nested expressions on an
+/// analysis stack; run with
+/// `cargo test --release deep_nesting_stack_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn deep_nesting_stack_benchmark() {
+    for (name, code) in [
+        ("blocks", nested_blocks(5000)),
+        ("expressions", nested_expressions(5000)),
+    ] {
+        let start = Instant::now();
+        let (_, functions) = analyze_from_small_stack(code, AnalysisMode::Full);
+        println!(
+            "{name}: complexity {} in {:?}",
+            functions[0].complexity,
+            start.elapsed()
+        );
+    }
+}
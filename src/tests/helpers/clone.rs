@@ -0,0 +1,108 @@
+//! Unit tests for `crate::helpers::clone`.
+//!
+//! Wired in from `src/helpers/clone.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::{clone_all, clone_repo, is_repo_url, rejects_sparse_options};
+use std::fs;
+use std::path::Path;
+use std::process::Command;
+
+fn run_git(dir: &Path, args: &[&str]) {
+    let status = Command::new("git")
+        .args(args)
+        .current_dir(dir)
+        .env("GIT_AUTHOR_NAME", "test")
+        .env("GIT_AUTHOR_EMAIL", "test@example.com")
+        .env("GIT_COMMITTER_NAME", "test")
+        .env("GIT_COMMITTER_EMAIL", "test@example.com")
+        .status()
+        .unwrap();
+    assert!(status.success(), "git {:?} failed", args);
+}
+
+/// A bare repository `<tmp>/project.git` holding a small Python package.
+fn bare_repo() -> tempfile::TempDir {
+    let dir = tempfile::tempdir().unwrap();
+    let work = dir.path().join("work");
+    fs::create_dir_all(work.join("pkg/sub")).unwrap();
+    fs::write(
+        work.join("pkg/sub/deep.py"),
+        "def f(x):\n    if x:\n        return 1\n",
+    )
+    .unwrap();
+    fs::write(work.join("top.py"), "def g():\n    return 2\n").unwrap();
+    fs::write(work.join("README.md"), "not python\n").unwrap();
+    run_git(&work, &["init", "--quiet"]);
+    run_git(&work, &["add", "."]);
+    run_git(&work, &["commit", "--quiet", "-m", "init"]);
+    run_git(
+        dir.path(),
+        &["clone", "--quiet", "--bare", "work", "project.git"],
+    );
+    dir
+}
+
+#[test]
+fn recognizes_remote_and_local_repositories() {
+    assert!(is_repo_url("https://github.com/rohaquinlop/complexipy"));
+    assert!(is_repo_url("git@gitlab.com/group/project.git"));
+    assert!(is_repo_url("file:///srv/git/project.git"));
+    assert!(!is_repo_url("https://example.com/project"));
+
+    let dir = bare_repo();
+    assert!(is_repo_url(
+        dir.path().join("project.git").to_str().unwrap()
+    ));
+    assert!(!is_repo_url(dir.path().join("work").to_str().unwrap()));
+}
+
+#[test]
+fn checks_out_only_python_files() {
+    let dir = bare_repo();
+    let url = format!("file://{}", dir.path().join("project.git").display());
+    let cwd = std::env::current_dir().unwrap();
+
+    let repo = clone_repo(&url).unwrap();
+    assert_eq!(std::env::current_dir().unwrap(), cwd);
+    assert!(repo.path().ends_with("project"));
+    assert!(repo.path().join("pkg/sub/deep.py").is_file());
+    assert!(repo.path().join("top.py").is_file());
+    assert!(!repo.path().join("README.md").exists());
+
+    let base = repo.base().to_path_buf();
+    drop(repo);
+    assert!(!base.exists());
+}
+
+#[test]
+fn clones_concurrently_and_reports_failures() {
+    let dir = bare_repo();
+    let good = format!("file://{}", dir.path().join("project.git").display());
+    let missing = format!("file://{}", dir.path().join("missing.git").display());
+
+    let mut results: Vec<_> = clone_all(vec![(0, good.clone()), (1, missing), (2, good)])
+        .iter()
+        .collect();
+    results.sort_by_key(|(index, _)| *index);
+
+    assert_eq!(results.len(), 3);
+    assert!(results[0].1.is_ok());
+    assert!(results[1].1.is_err());
+    assert!(results[2].1.is_ok());
+}
+
+#[test]
+fn falls_back_only_when_git_rejects_the_sparse_options() {
+    assert!(rejects_sparse_options(
+        "error: unknown option `sparse'\nusage: git clone [<options>] [--] <repo> [<dir>]"
+    ));
+    assert!(!rejects_sparse_options(
+        "fatal: '/srv/missing.git' does not appear to be a git repository"
+    ));
+
+    let dir = tempfile::tempdir().unwrap();
+    let missing = format!("file://{}", dir.path().join("missing.git").display());
+    let error = clone_repo(&missing).err().unwrap();
+    assert!(error.contains("missing.git"), "{}", error);
+}
@@ -0,0 +1,179 @@
+//! Unit tests for `crate::helpers::exclude`.
+//!
+//! Wired in from `src/helpers/exclude.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::{PathFilter, Shard, get_paths_to_process, walk_python_files};
+use std::collections::BTreeSet;
+use std::fs;
+use std::path::Path;
+use std::sync::Mutex;
+use std::time::Instant;
+
+fn touch(root: &Path, relative: &str) {
+    let path = root.join(relative);
+    fs::create_dir_all(path.parent().unwrap()).unwrap();
+    fs::write(path, "def f():\n    return 1\n").unwrap();
+}
+
+fn discover(root: &Path, excludes: &[&str]) -> Vec<String> {
+    let canonical = root.canonicalize().unwrap();
+    let prefix = format!("{}/", canonical.to_string_lossy().replace('\\', "/"));
+    get_paths_to_process(
+        root.to_str().unwrap(),
+        excludes.iter().map(|s| s.to_string()).collect(),
+    )
+    .unwrap()
+    .into_iter()
+    .map(|p| p.strip_prefix(&prefix).unwrap_or(&p).to_string())
+    .collect()
+}
+
+fn fixture() -> tempfile::TempDir {
+    let dir = tempfile::tempdir().unwrap();
+    for file in [
+        "main.py",
+        "notes.txt",
+        "pkg/mod.py",
+        "pkg/deep/inner.py",
+        "exclude_dir/a.py",
+        "exclude_dir/nested/b.py",
+    ] {
+        touch(dir.path(), file);
+    }
+    dir
+}
+
+#[test]
+fn finds_only_python_files_sorted_and_absolute() {
+    let dir = fixture();
+    let found = get_paths_to_process(dir.path().to_str().unwrap(), vec![]).unwrap();
+    let mut sorted = found.clone();
+    sorted.sort();
+    assert_eq!(found, sorted);
+    assert!(found.iter().all(|p| Path::new(p).is_absolute()));
+    assert_eq!(
+        discover(dir.path(), &[]),
+        vec![
+            "exclude_dir/a.py",
+            "exclude_dir/nested/b.py",
+            "main.py",
+            "pkg/deep/inner.py",
+            "pkg/mod.py",
+        ]
+    );
+}
+
+#[test]
+fn excludes_are_relative_to_the_root() {
+    let dir = fixture();
+    // A bare file name only matches at the root; `*` never crosses `/`.
+    assert_eq!(discover(dir.path(), &["inner.py"]).len(), 5);
+    assert_eq!(discover(dir.path(), &["*.py"]).len(), 4);
+    assert_eq!(
+        discover(dir.path(), &["pkg/deep/inner.py"]),
+        vec!["exclude_dir/a.py", "exclude_dir/nested/b.py", "main.py", "pkg/mod.py"]
+    );
+    assert_eq!(discover(dir.path(), &["**/inner.py"]).len(), 4);
+}
+
+#[test]
+fn directory_patterns_prune_the_subtree() {
+    let dir = fixture();
+    let expected = vec!["main.py", "pkg/deep/inner.py", "pkg/mod.py"];
+    assert_eq!(discover(dir.path(), &["exclude_dir/**"]), expected);
+    assert_eq!(discover(dir.path(), &["**/exclude_dir/**"]), expected);
+    assert_eq!(discover(dir.path(), &["exclude_dir"]), expected);
+}
+
+#[test]
+fn respects_gitignore_inside_a_repository() {
+    let dir = fixture();
+    fs::create_dir(dir.path().join(".git")).unwrap();
+    fs::write(dir.path().join(".gitignore"), "pkg/\n").unwrap();
+    assert_eq!(
+        discover(dir.path(), &[]),
+        vec!["exclude_dir/a.py", "exclude_dir/nested/b.py", "main.py"]
+    );
+}
+
+#[test]
+fn invalid_pattern_is_reported() {
+    let dir = fixture();
+    let err = get_paths_to_process(dir.path().to_str().unwrap(), vec!["a[".to_string()]);
+    assert!(err.unwrap_err().starts_with("Failed to apply exclude patterns"));
+}
+
+fn discover_shard(root: &Path, index: usize, count: usize) -> BTreeSet<String> {
+    let canonical = root.canonicalize().unwrap();
+    let prefix = format!("{}/", canonical.to_string_lossy().replace('\\', "/"));
+    let filter = PathFilter::new(&[])
+        .unwrap()
+        .with_shard(Some(Shard::new(index, count).unwrap()));
+    let found = Mutex::new(BTreeSet::new());
+    walk_python_files(root.to_str().unwrap(), &filter, |file| {
+        let relative = file.path.strip_prefix(&prefix).unwrap().to_string();
+        found.lock().unwrap().insert(relative);
+    });
+    found.into_inner().unwrap()
+}
+
+#[test]
+fn shards_partition_the_files() {
+    let dir = tempfile::tempdir().unwrap();
+    for i in 0..60 {
+        touch(dir.path(), &format!("pkg_{}/module_{i}.py", i % 5));
+    }
+    let all: BTreeSet<String> = discover(dir.path(), &[]).into_iter().collect();
+
+    let shards: Vec<_> = (1..=4).map(|i| discover_shard(dir.path(), i, 4)).collect();
+    let mut union = BTreeSet::new();
+    for shard in &shards {
+        assert!(!shard.is_empty());
+        assert!(shard.is_disjoint(&union));
+        union.extend(shard.iter().cloned());
+    }
+    assert_eq!(union, all);
+
+    // Assignment depends only on the relative path, not on where the tree lives.
+    let copy = tempfile::tempdir().unwrap();
+    for relative in &all {
+        touch(copy.path(), relative);
+    }
+    assert_eq!(discover_shard(copy.path(), 2, 4), shards[1]);
+    assert_eq!(discover_shard(dir.path(), 1, 1), all);
+}
+
+#[test]
+fn invalid_shards_are_rejected() {
+    assert!(Shard::new(0, 4).is_err());
+    assert!(Shard::new(5, 4).is_err());
+    assert!(Shard::new(1, 0).is_err());
+    assert!(Shard::new(4, 4).is_ok());
+}
+
+/// Discovery benchmark over a synthetic tree; run with
+/// `cargo test --release discovery_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn discovery_benchmark() {
+    let dir = tempfile::tempdir().unwrap();
+    for package in 0..200 {
+        for module in 0..100 {
+            touch(dir.path(), &format!("pkg_{package}/sub/module_{module}.py"));
+        }
+        touch(dir.path(), &format!("pkg_{package}/build/generated.py"));
+        fs::write(dir.path().join(format!("pkg_{package}/README.md")), "").unwrap();
+    }
+
+    let start = Instant::now();
+    let found = get_paths_to_process(
+        dir.path().to_str().unwrap(),
+        vec!["**/build/**".to_string()],
+    )
+    .unwrap();
+    let elapsed = start.elapsed();
+
+    assert_eq!(found.len(), 200 * 100);
+    println!("discovered {} files in {:?}", found.len(), elapsed);
+}
@@ -0,0 +1,185 @@
+//! Unit tests for `crate::helpers::pipeline`.
+//!
+//! Wired in from `src/helpers/pipeline.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::{PipelineOptions, resolve_jobs, run_pipeline};
+use crate::helpers::exclude::PathFilter;
+use crate::helpers::schedule::{CostHistory, Schedule};
+use crate::helpers::stack::on_analysis_stack;
+use std::fs;
+use std::path::Path;
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+fn tree(files: usize) -> tempfile::TempDir {
+    let dir = tempfile::tempdir().unwrap();
+    for i in 0..files {
+        let path = dir.path().join(format!("pkg_{}/module_{i}.py", i % 7));
+        fs::create_dir_all(path.parent().unwrap()).unwrap();
+        fs::write(path, format!("def f_{i}():\n    return {i}\n")).unwrap();
+    }
+    dir
+}
+
+fn run(root: &Path, jobs: Option<usize>, depth: usize) -> (Vec<String>, usize, usize) {
+    run_with(root, jobs, depth, Schedule::Discovery)
+}
+
+fn run_with(
+    root: &Path,
+    jobs: Option<usize>,
+    depth: usize,
+    schedule: Schedule,
+) -> (Vec<String>, usize, usize) {
+    let options = PipelineOptions {
+        jobs,
+        path_queue_depth: depth,
+        read_queue_depth: depth,
+        schedule,
+    };
+    let discovered = AtomicUsize::new(0);
+    let run = run_pipeline(
+        root.to_str().unwrap(),
+        &PathFilter::new(&[]).unwrap(),
+        &options,
+        &CostHistory::default(),
+        || {
+            discovered.fetch_add(1, Ordering::Relaxed);
+        },
+        |path: &str, code: String| {
+            if code.contains("return 3\n") {
+                Err(path.to_string())
+            } else {
+                Ok(code)
+            }
+        },
+    );
+    let mut ok: Vec<String> = run.results.into_iter().filter_map(Result::ok).collect();
+    ok.sort();
+    assert_eq!(run.stats.files, discovered.load(Ordering::Relaxed));
+    assert_eq!(run.costs.len(), run.stats.files);
+    (ok, run.stats.files, run.stats.jobs)
+}
+
+#[test]
+fn explicit_jobs_are_capped_by_work_items() {
+    assert_eq!(resolve_jobs(Some(8), 100), 8);
+    assert_eq!(resolve_jobs(Some(8), 9), 3);
+}
+
+#[test]
+fn tiny_inputs_stay_serial() {
+    assert_eq!(resolve_jobs(Some(8), 1), 1);
+    assert_eq!(resolve_jobs(None, 3), 1);
+    assert_eq!(resolve_jobs(None, 0), 1);
+}
+
+#[test]
+fn zero_jobs_falls_back_to_available_parallelism() {
+    let available = std::thread::available_parallelism()
+        .map(|n| n.get())
+        .unwrap_or(1);
+    assert_eq!(resolve_jobs(Some(0), 10_000), available.min(2_500));
+}
+
+#[test]
+fn every_file_is_analyzed_once_regardless_of_queue_depth() {
+    let dir = tree(200);
+    let (serial, files, _) = run(dir.path(), Some(1), 1024);
+    assert_eq!(files, 200);
+    assert_eq!(serial.len(), 199);
+    for depth in [1, 2, 16] {
+        let (parallel, files, _) = run(dir.path(), Some(4), depth);
+        assert_eq!(files, 200);
+        assert_eq!(parallel, serial);
+    }
+}
+
+#[test]
+fn small_inputs_use_a_single_job() {
+    let dir = tree(3);
+    let (_, files, jobs) = run(dir.path(), Some(8), 1);
+    assert_eq!(files, 3);
+    assert_eq!(jobs, 1);
+
+    let dir = tree(40);
+    let (_, _, jobs) = run(dir.path(), Some(4), 1);
+    assert_eq!(jobs, 4);
+}
+
+#[test]
+fn largest_first_analyzes_the_same_files() {
+    let dir = tree(50);
+    let (discovery, _, _) = run_with(dir.path(), Some(4), 2, Schedule::Discovery);
+    let (largest_first, files, _) = run_with(dir.path(), Some(4), 2, Schedule::LargestFirst);
+    assert_eq!(files, 50);
+    assert_eq!(largest_first, discovery);
+}
+
+#[test]
+fn largest_first_queues_by_size() {
+    let dir = tree(3);
+    fs::write(dir.path().join("big.py"), "x = 1\n".repeat(1000)).unwrap();
+    let options = PipelineOptions {
+        jobs: Some(1),
+        path_queue_depth: 16,
+        read_queue_depth: 16,
+        schedule: Schedule::LargestFirst,
+    };
+    let run = run_pipeline(
+        dir.path().to_str().unwrap(),
+        &PathFilter::new(&[]).unwrap(),
+        &options,
+        &CostHistory::default(),
+        || {},
+        |path: &str, _code: String| Ok::<_, String>(path.to_string()),
+    );
+    let first = run.results.into_iter().next().unwrap().unwrap();
+    assert!(first.ends_with("/big.py"));
+}
+
+#[test]
+fn workers_run_on_analysis_stacks() {
+    let dir = tree(20);
+    let options = PipelineOptions {
+        jobs: Some(4),
+        path_queue_depth: 4,
+        read_queue_depth: 4,
+        schedule: Schedule::Discovery,
+    };
+    let run = run_pipeline(
+        dir.path().to_str().unwrap(),
+        &PathFilter::new(&[]).unwrap(),
+        &options,
+        &CostHistory::default(),
+        || {},
+        |_path: &str, _code: String| {
+            let worker = std::thread::current().id();
+            Ok::<_, String>(on_analysis_stack(|| std::thread::current().id()) == worker)
+        },
+    );
+    assert_eq!(run.results.len(), 20);
+    assert!(run.results.into_iter().all(|in_place| in_place == Ok(true)));
+}
+
+#[test]
+fn a_panicking_worker_does_not_hang_the_pipeline() {
+    let dir = tree(200);
+    let options = PipelineOptions {
+        jobs: Some(4),
+        path_queue_depth: 1,
+        read_queue_depth: 1,
+        schedule: Schedule::Discovery,
+    };
+    let panicked = std::panic::catch_unwind(std::panic::AssertUnwindSafe(|| {
+        run_pipeline(
+            dir.path().to_str().unwrap(),
+            &PathFilter::new(&[]).unwrap(),
+            &options,
+            &CostHistory::default(),
+            || {},
+            |_path: &str, _code: String| -> Result<(), String> { panic!("analysis failed") },
+        )
+    }));
+    assert!(panicked.is_err());
+}
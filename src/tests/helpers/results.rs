@@ -0,0 +1,168 @@
+//! Unit tests for `crate::helpers::results`.
+//!
+//! Wired in from `src/helpers/results.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::{MergeOptions, MergedResults};
+use std::fs;
+use std::path::Path;
+
+fn write(dir: &Path, name: &str, content: &str) -> String {
+    let path = dir.join(name);
+    fs::write(&path, content).unwrap();
+    path.to_str().unwrap().to_string()
+}
+
+fn merge(inputs: &[&str], options: &MergeOptions) -> Vec<(String, String, u64, u64)> {
+    let mut merged = MergedResults::default();
+    for path in inputs {
+        merged.read_file(path, options).unwrap();
+    }
+    merged
+        .into_files()
+        .into_iter()
+        .flat_map(|file| {
+            file.functions.into_iter().map(move |function| {
+                (
+                    format!("{}/{}", file.path, file.file_name),
+                    function.name,
+                    function.complexity,
+                    function.line_start,
+                )
+            })
+        })
+        .collect()
+}
+
+const SHARD_1: &str = r#"[
+  {"path": "pkg/a.py", "file_name": "a.py", "function_name": "f", "complexity": 3,
+   "line_start": 4, "line_end": 9, "refactor_plans": []},
+  {"path": "pkg/b.py", "file_name": "b.py", "function_name": "g", "complexity": 20,
+   "line_start": 1, "line_end": 30, "refactor_plans": []}
+]"#;
+
+const SHARD_2: &str = r#"[
+  {"path": "pkg/c.py", "file_name": "c.py", "function_name": "h", "complexity": 7,
+   "line_start": 2, "line_end": 5, "refactor_plans": []},
+  {"path": "pkg/a.py", "file_name": "a.py", "function_name": "k", "complexity": 1,
+   "line_start": 12, "line_end": 14, "refactor_plans": []}
+]"#;
+
+const SNAPSHOT: &str = r#"[
+  {"path": "pkg/d.py", "file_name": "d.py",
+   "functions": [{"name": "big", "complexity": 40}, {"name": "small", "complexity": 2}]}
+]"#;
+
+#[test]
+fn merges_json_reports_and_snapshots_sorted_by_path() {
+    let dir = tempfile::tempdir().unwrap();
+    let first = write(dir.path(), "shard-1.json", SHARD_1);
+    let snapshot = write(dir.path(), "snapshot.json", SNAPSHOT);
+
+    assert_eq!(
+        merge(&[&first, &snapshot], &MergeOptions::default()),
+        vec![
+            ("pkg/a.py/a.py".to_string(), "f".to_string(), 3, 4),
+            ("pkg/b.py/b.py".to_string(), "g".to_string(), 20, 1),
+            ("pkg/d.py/d.py".to_string(), "small".to_string(), 2, 1),
+            ("pkg/d.py/d.py".to_string(), "big".to_string(), 40, 1),
+        ]
+    );
+}
+
+#[test]
+fn a_later_input_replaces_the_functions_of_a_file() {
+    let dir = tempfile::tempdir().unwrap();
+    let first = write(dir.path(), "shard-1.json", SHARD_1);
+    let second = write(dir.path(), "shard-2.json", SHARD_2);
+
+    let merged = merge(&[&first, &second, &first], &MergeOptions::default());
+    let a_functions: Vec<_> = merged
+        .iter()
+        .filter(|(path, ..)| path == "pkg/a.py/a.py")
+        .map(|(_, name, ..)| name.as_str())
+        .collect();
+    assert_eq!(a_functions, vec!["f"]);
+    assert_eq!(merged.len(), 3);
+}
+
+#[test]
+fn threshold_drops_passing_functions_while_streaming() {
+    let dir = tempfile::tempdir().unwrap();
+    let first = write(dir.path(), "shard-1.json", SHARD_1);
+    let snapshot = write(dir.path(), "snapshot.json", SNAPSHOT);
+    let options = MergeOptions {
+        keep_plans: false,
+        max_complexity: Some(15),
+    };
+
+    let names: Vec<String> = merge(&[&first, &snapshot], &options)
+        .into_iter()
+        .map(|(_, name, ..)| name)
+        .collect();
+    assert_eq!(names, vec!["g", "big"]);
+}
+
+#[test]
+fn malformed_input_is_reported() {
+    let dir = tempfile::tempdir().unwrap();
+    let truncated = write(dir.path(), "truncated.json", &SHARD_1[..40]);
+    let object = write(dir.path(), "object.json", "{}");
+
+    let mut merged = MergedResults::default();
+    let options = MergeOptions::default();
+    assert!(merged.read_file(&truncated, &options).is_err());
+    assert!(merged.read_file(&object, &options).is_err());
+    let missing = dir.path().join("missing.json");
+    let missing = missing.to_str().unwrap();
+    assert!(merged.read_file(missing, &options).is_err());
+}
+
+#[test]
+fn an_input_truncated_after_some_rows_adds_nothing() {
+    let dir = tempfile::tempdir().unwrap();
+    let first = write(dir.path(), "shard-1.json", SHARD_1);
+    // Cut after the row for `pkg/c.py`, partway through the one for `pkg/a.py`.
+    let cut = SHARD_2.find("\"k\"").unwrap();
+    let truncated = write(dir.path(), "truncated.json", &SHARD_2[..cut]);
+
+    let mut merged = MergedResults::default();
+    let options = MergeOptions::default();
+    merged.read_file(&first, &options).unwrap();
+    assert!(merged.read_file(&truncated, &options).is_err());
+
+    let names: Vec<(String, String)> = merged
+        .into_files()
+        .into_iter()
+        .flat_map(|file| {
+            let path = file.path;
+            file.functions
+                .into_iter()
+                .map(move |function| (path.clone(), function.name))
+        })
+        .collect();
+    assert_eq!(
+        names,
+        vec![
+            ("pkg/a.py".to_string(), "f".to_string()),
+            ("pkg/b.py".to_string(), "g".to_string()),
+        ]
+    );
+}
+
+#[test]
+fn a_file_below_the_threshold_still_replaces_earlier_rows() {
+    let dir = tempfile::tempdir().unwrap();
+    let first = write(dir.path(), "shard-1.json", SHARD_1);
+    let second = write(dir.path(), "shard-2.json", SHARD_2);
+    let options = MergeOptions {
+        keep_plans: false,
+        max_complexity: Some(2),
+    };
+
+    let paths: Vec<String> = merge(&[&first, &second], &options)
+        .into_iter()
+        .map(|(path, ..)| path)
+        .collect();
+    assert_eq!(paths, vec!["pkg/b.py/b.py", "pkg/c.py/c.py"]);
+}
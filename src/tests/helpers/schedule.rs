@@ -0,0 +1,101 @@
+//! Unit tests for `crate::helpers::schedule`.
+//!
+//! Wired in from `src/helpers/schedule.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::{CostHistory, FileCost, Schedule};
+
+fn cost(path: &str, bytes: u64, nanos: u64) -> FileCost {
+    FileCost {
+        path: path.to_string(),
+        bytes,
+        nanos,
+    }
+}
+
+fn order(history: &CostHistory, files: &[(&str, u64)]) -> Vec<String> {
+    let mut files: Vec<(String, u64)> = files
+        .iter()
+        .map(|(path, bytes)| (path.to_string(), *bytes))
+        .collect();
+    history.order_largest_first(&mut files);
+    files.into_iter().map(|(path, _)| path).collect()
+}
+
+#[test]
+fn parses_schedule_names() {
+    assert_eq!(Schedule::parse("discovery"), Ok(Schedule::Discovery));
+    assert_eq!(Schedule::parse("largest-first"), Ok(Schedule::LargestFirst));
+    assert!(Schedule::parse("random").is_err());
+}
+
+#[test]
+fn without_history_orders_by_size_then_path() {
+    let history = CostHistory::default();
+    assert_eq!(
+        order(&history, &[("b.py", 10), ("c.py", 500), ("a.py", 10)]),
+        vec!["c.py", "a.py", "b.py"]
+    );
+}
+
+#[test]
+fn measured_time_beats_file_size() {
+    let mut history = CostHistory::default();
+    // A small file that was slow to analyze, and a large one that was fast.
+    history.record([cost("dense.py", 100, 90_000), cost("data.py", 10_000, 10_000)]);
+    assert_eq!(
+        order(&history, &[("data.py", 10_000), ("dense.py", 100)]),
+        vec!["dense.py", "data.py"]
+    );
+}
+
+#[test]
+fn new_files_use_the_measured_rate() {
+    let mut history = CostHistory::default();
+    history.record([cost("known.py", 1_000, 1_000_000)]);
+    // 1000 ns/byte: a new 2 KB file outweighs the known 1 ms file.
+    assert_eq!(
+        order(&history, &[("known.py", 1_000), ("new.py", 2_000)]),
+        vec!["new.py", "known.py"]
+    );
+}
+
+#[test]
+fn history_round_trips_and_tolerates_garbage() {
+    let dir = tempfile::tempdir().unwrap();
+    let path = dir.path().join("costs");
+    assert_eq!(order(&CostHistory::load(&path), &[("a.py", 1), ("b.py", 2)]), vec!["b.py", "a.py"]);
+
+    let mut history = CostHistory::default();
+    history.record([cost("a.py", 1, 1_000_000)]);
+    history.save(&path).unwrap();
+    let loaded = CostHistory::load(&path);
+    assert_eq!(order(&loaded, &[("a.py", 1), ("b.py", 2)]), vec!["a.py", "b.py"]);
+
+    std::fs::write(&path, "not json").unwrap();
+    assert_eq!(order(&CostHistory::load(&path), &[("a.py", 1), ("b.py", 2)]), vec!["b.py", "a.py"]);
+}
+
+#[test]
+fn recording_a_run_drops_files_it_did_not_see() {
+    let mut history = CostHistory::default();
+    history.record([cost("old.py", 10, 100), cost("kept.py", 10, 100)]);
+    history.record([cost("kept.py", 20, 300)]);
+    assert_eq!(history.files.len(), 1);
+    assert_eq!(history.files["kept.py"].nanos, 300);
+}
+
+#[test]
+fn saving_leaves_no_temporary_files_behind() {
+    let dir = tempfile::tempdir().unwrap();
+    let path = dir.path().join("costs");
+    let mut history = CostHistory::default();
+    history.record([cost("a.py", 1, 1_000)]);
+    history.save(&path).unwrap();
+    history.save(&path).unwrap();
+    let names: Vec<_> = std::fs::read_dir(dir.path())
+        .unwrap()
+        .map(|entry| entry.unwrap().file_name())
+        .collect();
+    assert_eq!(names, vec!["costs"]);
+}
@@ -0,0 +1,53 @@
+//! Unit tests for `crate::helpers::stack`.
+//!
+//! Wired in from `src/helpers/stack.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::{ON_ANALYSIS_STACK, analysis_pool, on_analysis_stack};
+use std::cell::Cell;
+use std::thread;
+
+/// Recurse `depth` times with a 1 KiB frame, well past what a 2 MiB stack
+/// holds.
+fn deep(depth: usize) -> usize {
+    let frame = std::hint::black_box([depth as u8; 1024]);
+    if depth == 0 {
+        return frame[0] as usize;
+    }
+    deep(depth - 1) + usize::from(frame[1023] == depth as u8)
+}
+
+#[test]
+fn runs_on_a_large_stack_from_a_small_one() {
+    let depth = thread::Builder::new()
+        .stack_size(256 * 1024)
+        .spawn(|| on_analysis_stack(|| deep(8 * 1024)))
+        .unwrap()
+        .join()
+        .unwrap();
+    assert!(depth > 0);
+}
+
+#[test]
+fn runs_in_place_once_on_an_analysis_stack() {
+    let (outer, inner) = on_analysis_stack(|| {
+        let outer = thread::current().id();
+        (outer, on_analysis_stack(|| thread::current().id()))
+    });
+    assert_eq!(outer, inner);
+    assert_ne!(outer, thread::current().id());
+}
+
+#[test]
+fn panics_reach_the_caller() {
+    let result = std::panic::catch_unwind(|| on_analysis_stack(|| panic!("walk failed")));
+    let payload = result.unwrap_err();
+    assert_eq!(payload.downcast_ref::<&str>(), Some(&"walk failed"));
+}
+
+#[test]
+fn pool_threads_are_marked() {
+    let pool = analysis_pool().num_threads(2).build().unwrap();
+    assert!(pool.install(|| ON_ANALYSIS_STACK.with(Cell::get)));
+    assert!(pool.install(|| deep(8 * 1024)) > 0);
+}
@@ -0,0 +1,146 @@
+//! Unit tests for `crate::utils::IgnoreMarkers`.
+//!
+//! Wired in from `src/utils.rs` via `#[cfg(test)] #[path = ...] mod ignore_markers_tests;`
+//! so this stays a child module of the code it tests.
+
+use super::{IgnoreMarkers, collect_ignored_locations, extract_comment_marker};
+use crate::line_index::LineIndex;
+use std::path::{Path, PathBuf};
+
+/// The per-call lookup `IgnoreMarkers::find` replaces, which ran the marker
+/// regexes over the lines around `line_number` on every call.
+fn reference_find(line_number: u64, lines: &LineIndex) -> Option<&'static str> {
+    if line_number == 0 {
+        return None;
+    }
+
+    let line_count = lines.line_count();
+    let line = |idx: usize| lines.line(idx).unwrap_or_default();
+    let idx = (line_number as usize).saturating_sub(1);
+
+    let signature_has_marker = |def_idx: usize| -> Option<&'static str> {
+        let max_scan = (def_idx + 20).min(line_count);
+        for line in (def_idx..max_scan).map(line) {
+            if let Some(marker) = extract_comment_marker(line) {
+                return Some(marker);
+            }
+            if line.contains(':') {
+                break;
+            }
+        }
+        None
+    };
+
+    if idx < line_count
+        && let Some(marker) = extract_comment_marker(line(idx))
+    {
+        return Some(marker);
+    }
+
+    if idx > 0
+        && let Some(marker) = extract_comment_marker(line(idx - 1))
+    {
+        return Some(marker);
+    }
+
+    if idx < line_count && line(idx).trim_start().starts_with("def ") {
+        return signature_has_marker(idx);
+    }
+
+    if idx < line_count && line(idx).trim_start().starts_with('@') {
+        let max_scan = (idx + 10).min(line_count);
+        for i in (idx + 1)..max_scan {
+            let current = line(i).trim();
+            if current.starts_with("def ") {
+                if let Some(marker) = signature_has_marker(i) {
+                    return Some(marker);
+                }
+                if let Some(marker) = extract_comment_marker(line(i - 1)) {
+                    return Some(marker);
+                }
+                break;
+            }
+            if !current.is_empty() && !current.trim_start().starts_with('@') {
+                break;
+            }
+        }
+    }
+
+    None
+}
+
+const SOURCES: &[&str] = &[
+    "",
+    "# complexipy: ignore",
+    "def f():  # complexipy: ignore\n    pass\n",
+    "# noqa: complexipy\ndef f():\n    pass\n",
+    "def f(\n    a,  # NOQA : Complexipy\n    b,\n):\n    pass\n",
+    "@decorator\n# complexipy: ignore\n\n@other(x='#')\ndef f():\n    pass\n",
+    "x = '# complexipy: ignore'\ndef f():\n    pass\n",
+    "class A:\n    @property\n    def f(self):  # noqa: complexipy\r\n        return 1\r\n",
+    "def f():  # a comment\n    # complexipy: ignore\n    def g():\n        pass\n",
+];
+
+fn python_files(dir: &Path, files: &mut Vec<PathBuf>) {
+    for entry in std::fs::read_dir(dir).unwrap() {
+        let path = entry.unwrap().path();
+        if path.is_dir() {
+            python_files(&path, files);
+        } else if path.extension().is_some_and(|ext| ext == "py") {
+            files.push(path);
+        }
+    }
+}
+
+#[test]
+fn find_matches_the_per_call_scan_on_every_line() {
+    let mut files = Vec::new();
+    python_files(
+        &Path::new(env!("CARGO_MANIFEST_DIR")).join("tests"),
+        &mut files,
+    );
+    let mut sources: Vec<String> = SOURCES.iter().map(|s| s.to_string()).collect();
+    sources.extend(
+        files
+            .iter()
+            .map(|path| std::fs::read_to_string(path).unwrap()),
+    );
+
+    let mut suppressed = 0;
+    for source in &sources {
+        let lines = LineIndex::new(source);
+        let markers = IgnoreMarkers::new(&lines);
+        for line_number in 0..=lines.line_count() as u64 + 1 {
+            let found = markers.find(line_number);
+            assert_eq!(
+                found,
+                reference_find(line_number, &lines),
+                "{source:?}:{line_number}"
+            );
+            suppressed += usize::from(found.is_some());
+        }
+    }
+    assert!(suppressed > 0);
+}
+
+#[test]
+fn locations_are_reported_at_the_def_line() {
+    let source = "@staticmethod\ndef f(a):  # complexipy: ignore\n    pass\n\n\ndef g():\n    pass\n\n# noqa: complexipy\ndef h():\n    pass\n";
+    let lines = LineIndex::new(source);
+    assert_eq!(
+        collect_ignored_locations(&IgnoreMarkers::new(&lines)),
+        vec![
+            (2, "# complexipy: ignore".to_string()),
+            (10, "# noqa: complexipy".to_string()),
+        ]
+    );
+}
+
+#[test]
+fn sources_without_markers_have_an_empty_index() {
+    let source = "def f(x):  # a plain comment\n    return x  # another\n";
+    let lines = LineIndex::new(source);
+    let markers = IgnoreMarkers::new(&lines);
+    assert!(markers.is_empty());
+    assert!(collect_ignored_locations(&markers).is_empty());
+}
@@ -0,0 +1,62 @@
+//! Unit tests for `crate::classes::LineComplexities`.
+//!
+//! Wired in from `src/classes.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::{LineComplexities, LineComplexity};
+use crate::cognitive_complexity::{AnalysisMode, function_level_cognitive_complexity_shared};
+use ruff_python_parser::parse_module;
+
+fn pairs(lines: &LineComplexities) -> Vec<(u64, u64)> {
+    lines.iter().map(|l| (l.line, l.complexity)).collect()
+}
+
+fn entries(pairs: &[(u64, u64)]) -> Vec<LineComplexity> {
+    pairs
+        .iter()
+        .map(|&(line, complexity)| LineComplexity { line, complexity })
+        .collect()
+}
+
+#[test]
+fn entries_are_kept_in_order() {
+    let walk = entries(&[(5, 1), (3, 0), (2, 2), (5, 2), (u64::MAX, 1)]);
+    let lines = LineComplexities::from(walk);
+    assert_eq!(
+        pairs(&lines),
+        vec![(5, 1), (3, 0), (2, 2), (5, 2), (u32::MAX as u64, 1)]
+    );
+    assert_eq!(lines.len(), 5);
+    assert!(lines.get(5).is_none());
+    assert_eq!(LineComplexities::from(entries(&[(1, 0), (2, 0)])).len(), 2);
+}
+
+#[test]
+fn serialized_as_a_list_of_line_complexities() {
+    let lines = LineComplexities::from(entries(&[(7, 1), (2, 2)]));
+    let json = serde_json::to_string(&lines).unwrap();
+    assert_eq!(
+        json,
+        r#"[{"line":7,"complexity":1},{"line":2,"complexity":2}]"#
+    );
+    let parsed: LineComplexities = serde_json::from_str(&json).unwrap();
+    assert_eq!(parsed, lines);
+}
+
+#[test]
+fn functions_keep_every_line_the_walk_records() {
+    let code = "def f(a, b):\n    x = 1\n    if a: x = a or b\n    for y in b:\n        if y:\n            x += y\n    return x\n";
+    let parsed = parse_module(code).unwrap();
+    let (functions, _) = function_level_cognitive_complexity_shared(
+        parsed.suite(),
+        code,
+        false,
+        false,
+        AnalysisMode::NoPlans,
+    );
+    assert_eq!(functions[0].complexity, 5);
+    assert_eq!(
+        pairs(&functions[0].line_complexities),
+        vec![(2, 0), (3, 1), (3, 1), (4, 1), (5, 2), (6, 0), (7, 0)]
+    );
+}
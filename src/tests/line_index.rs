@@ -0,0 +1,59 @@
+//! Unit tests for `crate::line_index`.
+//!
+//! Wired in from `src/line_index.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::LineIndex;
+
+/// The lookups `LineIndex` replaces: count the newlines before the offset,
+/// and the characters since the last one.
+fn scan_line(offset: usize, code: &str) -> u64 {
+    (code[..offset].matches('\n').count() + 1) as u64
+}
+
+fn scan_column(offset: usize, code: &str) -> u64 {
+    let before = &code[..offset];
+    let start = before.rfind('\n').map_or(0, |i| i + 1);
+    (before[start..].chars().count() + 1) as u64
+}
+
+const SOURCES: &[&str] = &[
+    "",
+    "\n",
+    "x = 1",
+    "x = 1\n",
+    "def f():\n    return 1\n\n\ndef g():\n    pass",
+    "s = 'ñandú'\nif s:  # café\n    t = \"日本語\"; u = 1\n",
+    "a = 1\r\nb = 2\r\n\r\nc = 3\r",
+];
+
+#[test]
+fn lookups_match_a_full_rescan_at_every_char_boundary() {
+    for source in SOURCES {
+        let index = LineIndex::new(source);
+        for offset in (0..=source.len()).filter(|&i| source.is_char_boundary(i)) {
+            assert_eq!(index.line_number(offset), scan_line(offset, source));
+            assert_eq!(index.column_number(offset), scan_column(offset, source));
+        }
+    }
+}
+
+#[test]
+fn lines_match_str_lines() {
+    for source in SOURCES {
+        let index = LineIndex::new(source);
+        let expected: Vec<&str> = source.lines().collect();
+        assert_eq!(index.line_count(), expected.len(), "{source:?}");
+        assert_eq!(index.lines().collect::<Vec<_>>(), expected, "{source:?}");
+        assert_eq!(index.line(expected.len()), None);
+    }
+}
+
+#[test]
+fn columns_count_characters_not_bytes() {
+    let source = "x = 'é'; y = 1\n";
+    let index = LineIndex::new(source);
+    let y = source.find('y').unwrap();
+    assert_eq!(index.column_number(y), 10);
+    assert_eq!(y + 1, 11);
+}
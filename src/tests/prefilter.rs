@@ -0,0 +1,129 @@
+//! Unit tests for `crate::utils::may_add_complexity`.
+//!
+//! Wired in from `src/utils.rs` via `#[cfg(test)] #[path = ...] mod prefilter_tests;`
+//! so this stays a child module of the code it tests.
+
+use super::may_add_complexity;
+use crate::cognitive_complexity::{AnalysisMode, function_level_cognitive_complexity_shared};
+use ruff_python_parser::parse_module;
+use std::path::{Path, PathBuf};
+use std::time::Instant;
+
+const SKIPPED: &[&str] = &[
+    "",
+    "from .models import User, Group\n__all__ = ['User', 'Group']\n",
+    "VERSION = (1, 2, 3)\nDEBUG = not True\nOFFSET = -(-1)\n",
+    "class Config:\n    name = 'x'\n    defaults = {'a': 1}\n",
+    "with open(path) as handle:\n    data = handle.read()\n",
+    "try:\n    import ujson as json\nfinally:\n    pass\n",
+    "default = undefined\nformat = iffy\nmatches = orders\n",
+    "x = café_if\n",
+];
+
+const PARSED: &[&str] = &[
+    "def f():\n    pass\n",
+    "async def f():\n    pass\n",
+    "x = a and b\n",
+    "x = a or b\n",
+    "x = 1if y else 2\n",
+    "x = [y for y in z]\n",
+    "while x:\n    pass\n",
+    "try:\n    pass\nexcept(ValueError):\n    pass\n",
+    "match x:\n    case 1:\n        pass\n",
+    "x = (a)and(b)\n",
+    "# def is only in a comment\n",
+];
+
+fn python_files(dir: &Path, files: &mut Vec<PathBuf>) {
+    for entry in std::fs::read_dir(dir).unwrap() {
+        let path = entry.unwrap().path();
+        if path.is_dir() {
+            python_files(&path, files);
+        } else if path.extension().is_some_and(|ext| ext == "py") {
+            files.push(path);
+        }
+    }
+}
+
+/// Scores `code` with a full parse, with and without script mode.
+fn scores(code: &str) -> [(usize, u64, u64); 2] {
+    let parsed = parse_module(code).unwrap();
+    [false, true].map(|check_script| {
+        let (functions, total) = function_level_cognitive_complexity_shared(
+            parsed.suite(),
+            code,
+            check_script,
+            false,
+            AnalysisMode::ScoreOnly,
+        );
+        let module = functions
+            .iter()
+            .find(|f| f.name == "<module>")
+            .map_or(0, |f| f.complexity);
+        (functions.len(), total, module)
+    })
+}
+
+#[test]
+fn sources_without_keywords_are_skipped() {
+    for code in SKIPPED {
+        assert!(!may_add_complexity(code), "{code:?}");
+    }
+    for code in PARSED {
+        assert!(may_add_complexity(code), "{code:?}");
+    }
+}
+
+#[test]
+fn skipped_sources_score_nothing() {
+    let mut files = Vec::new();
+    python_files(
+        &Path::new(env!("CARGO_MANIFEST_DIR")).join("tests"),
+        &mut files,
+    );
+    let mut sources: Vec<String> = SKIPPED.iter().map(|s| s.to_string()).collect();
+    // Every line of the fixtures on its own, to cover many more
+    // module-level statements than the files hold whole.
+    for path in &files {
+        let code = std::fs::read_to_string(path).unwrap();
+        sources.extend(code.lines().map(|line| format!("{}\n", line.trim_start())));
+        sources.push(code);
+    }
+
+    let mut skipped = 0;
+    for code in &sources {
+        if may_add_complexity(code) || parse_module(code).is_err() {
+            continue;
+        }
+        skipped += 1;
+        assert_eq!(scores(code), [(0, 0, 0), (1, 0, 0)], "{code:?}");
+    }
+    assert!(skipped > SKIPPED.len());
+}
+
+/// Compares the prefilter with a full parse over generated constant modules;
+/// run with `cargo test --release prefilter_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn prefilter_benchmark() {
+    let mut code = String::from("from .base import *\n\n");
+    let mut i = 0;
+    while code.len() < 4 * 1024 * 1024 {
+        code.push_str(&format!(
+            "SETTING_{i} = {{'name': 'setting_{i}', 'values': [{i}, -{i}], 'enabled': True}}\n"
+        ));
+        i += 1;
+    }
+
+    let start = Instant::now();
+    assert!(!may_add_complexity(&code));
+    let scanned = start.elapsed();
+    let start = Instant::now();
+    let parsed = parse_module(&code).unwrap();
+    let parsed_in = start.elapsed();
+    drop(parsed);
+    println!(
+        "{} bytes: prefilter {scanned:?}, parse {parsed_in:?}",
+        code.len()
+    );
+}
@@ -4,7 +4,7 @@
 //! so this stays a child module of the code it tests and can reach that
 //! module's private helpers through `super::` without widening visibility.
 
-use crate::classes::FunctionComplexity;
+use crate::classes::{FunctionComplexity, LineComplexities};
 
 fn function(name: &str, complexity: u64, line_start: u64, line_end: u64) -> FunctionComplexity {
     FunctionComplexity {
@@ -12,9 +12,10 @@ fn function(name: &str, complexity: u64, line_start: u64, line_end: u64) -> Func
         complexity,
         line_start,
         line_end,
-        line_complexities: vec![],
+        line_complexities: LineComplexities::default(),
         refactor_plans: vec![],
         additional_refactor_plans: 0,
+        deferred_plans: None,
     }
 }
 
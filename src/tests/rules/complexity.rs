@@ -9,6 +9,7 @@ use super::{
     fallback_boolean_count, generate_loop_guard_suggestion, needs_parens_for_and,
 };
 use crate::refactor_plans::{ComplexityRegion, RegionKind};
+use crate::rules::SourceIndex;
 
 fn combine(parts: &[&str]) -> String {
     let owned: Vec<String> = parts.iter().map(|s| s.to_string()).collect();
@@ -113,6 +114,14 @@ fn extracts_condition_with_colon_inside_string_literal() {
     );
 }
 
+#[test]
+fn extracts_condition_around_non_ascii_text() {
+    assert_eq!(
+        extract_condition_from_line(r#"if nombre == "ñandú:\é":  # año: 2024"#),
+        Some(r#"nombre == "ñandú:\é""#.to_string())
+    );
+}
+
 #[test]
 fn extracts_condition_with_fstring_format_spec_colon() {
     assert_eq!(
@@ -178,6 +187,10 @@ fn if_region(nesting: u64, children: Vec<ComplexityRegion>) -> ComplexityRegion
     }
 }
 
+fn index(lines: &[&str]) -> SourceIndex {
+    SourceIndex::from(lines.join("\n").as_str())
+}
+
 #[test]
 fn collect_loop_if_chain_walks_a_pure_nested_chain() {
     let lines = [
@@ -192,7 +205,7 @@ fn collect_loop_if_chain_walks_a_pure_nested_chain() {
         ..Default::default()
     };
 
-    let chain = collect_loop_if_chain(&loop_region, &lines);
+    let chain = collect_loop_if_chain(&loop_region, &index(&lines));
 
     assert_eq!(chain.len(), 2);
     assert_eq!(chain[0].nesting, 1);
@@ -228,7 +241,7 @@ fn collect_loop_if_chain_stops_at_an_else_branch() {
         ..Default::default()
     };
 
-    let chain = collect_loop_if_chain(&loop_region, &lines);
+    let chain = collect_loop_if_chain(&loop_region, &index(&lines));
 
     // The inner if has an else, so only the outer if is hoistable -- the
     // else-bearing if stays behind as the chain's untouched tail.
@@ -244,7 +257,7 @@ fn collect_loop_if_chain_is_empty_without_a_nested_if() {
         ..Default::default()
     };
 
-    assert!(collect_loop_if_chain(&loop_region, &lines).is_empty());
+    assert!(collect_loop_if_chain(&loop_region, &index(&lines)).is_empty());
 }
 
 #[test]
@@ -304,7 +317,7 @@ fn loop_guard_suggestion_is_faithful_for_a_pure_chain() {
         4,
     );
 
-    let suggestion = generate_loop_guard_suggestion(&region, source).unwrap();
+    let suggestion = generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).unwrap();
     assert!(suggestion.spliceable);
     assert_eq!(
         suggestion.replacement,
@@ -317,7 +330,7 @@ fn loop_guard_suggestion_keeps_leading_statements() {
     let source = "for x in y:\n    total += x\n    if a:\n        pass\n";
     let region = loop_region(vec![if_stmt(3, 4, 1)], 4);
 
-    let suggestion = generate_loop_guard_suggestion(&region, source).unwrap();
+    let suggestion = generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).unwrap();
     assert_eq!(
         suggestion.replacement,
         "for x in y:\n    total += x\n    if not a:\n        continue\n    pass"
@@ -329,7 +342,7 @@ fn loop_guard_suggestion_keeps_trailing_statements_at_loop_indent() {
     let source = "for x in y:\n    if a:\n        pass\n    total += 1\n";
     let region = loop_region(vec![if_stmt(2, 3, 1)], 4);
 
-    let suggestion = generate_loop_guard_suggestion(&region, source).unwrap();
+    let suggestion = generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).unwrap();
     assert_eq!(
         suggestion.replacement,
         "for x in y:\n    if not a:\n        continue\n    pass\n    total += 1"
@@ -351,7 +364,7 @@ fn loop_guard_suggestion_keeps_an_else_on_the_last_chain_member() {
         6,
     );
 
-    let suggestion = generate_loop_guard_suggestion(&region, source).unwrap();
+    let suggestion = generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).unwrap();
     assert_eq!(
         suggestion.replacement,
         "for x in y:\n    if not a:\n        continue\n    if b:\n        pass\n    else:\n        pass"
@@ -365,7 +378,7 @@ fn loop_guard_suggestion_preserves_a_multiline_header() {
 
     // The header continuation lines pass through unchanged; only the body
     // is transformed.
-    let suggestion = generate_loop_guard_suggestion(&region, source).unwrap();
+    let suggestion = generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).unwrap();
     assert!(suggestion.spliceable);
     assert_eq!(
         suggestion.replacement,
@@ -379,7 +392,7 @@ fn loop_guard_suggestion_refuses_a_first_member_with_its_own_else() {
     let region = loop_region(vec![if_stmt(2, 4, 1)], 4);
 
     // The guard `if not a: continue` would skip the `else` branch entirely.
-    assert!(generate_loop_guard_suggestion(&region, source).is_none());
+    assert!(generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).is_none());
 }
 
 #[test]
@@ -394,7 +407,7 @@ fn loop_guard_suggestion_refuses_a_loop_level_else() {
     };
 
     // The loop's own `else` would dangle after the guards.
-    assert!(generate_loop_guard_suggestion(&region, source).is_none());
+    assert!(generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).is_none());
 }
 
 #[test]
@@ -403,7 +416,7 @@ fn loop_guard_suggestion_refuses_an_unextractable_condition() {
     let region = loop_region(vec![if_stmt(2, 4, 1)], 4);
 
     // The first chain member's condition spans lines; no guard text exists.
-    assert!(generate_loop_guard_suggestion(&region, source).is_none());
+    assert!(generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).is_none());
 }
 
 #[test]
@@ -424,7 +437,7 @@ fn loop_guard_suggestion_keeps_unextractable_members_in_the_survivor() {
 
     // The first member becomes a guard; the unextractable member stays in
     // the survivor block, dedented with it, unchanged.
-    let suggestion = generate_loop_guard_suggestion(&region, source).unwrap();
+    let suggestion = generate_loop_guard_suggestion(&region, &SourceIndex::from(source)).unwrap();
     assert_eq!(
         suggestion.replacement,
         "for x in y:\n    if not a:\n        continue\n    if (b and\n            c):\n        pass"
@@ -4,12 +4,19 @@
 //! so this stays a child module of the code it tests and can reach the private
 //! `RuleRegistry.rules` field through `super::` without widening its visibility.
 
-use super::{RuleRegistry, measure_reduction, select_non_overlapping, splice_plan};
+use super::{
+    RuleRegistry, measure_reduction, select_non_overlapping, splice_plan, statement_block,
+};
 use crate::classes::{Applicability, CodeSuggestion, RefactorPlan, RuleCategory};
-use crate::cognitive_complexity::function_level_cognitive_complexity_shared;
-use crate::refactor_plans::{ComplexityRegion, RegionKind};
+use crate::cognitive_complexity::{AnalysisMode, function_level_cognitive_complexity_shared};
+use crate::refactor_plans::{ComplexityRegion, PlanScope, RegionKind};
+use crate::rules::SourceIndex;
+use crate::rules::types::{RefactorRule, RuleMetadata};
 use ruff_python_parser::parse_module;
 use std::collections::HashMap;
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex, OnceLock};
+use std::time::Instant;
 
 fn plan(rule_id: &str, line_start: u64, line_end: u64, estimated_reduction: u64) -> RefactorPlan {
     RefactorPlan {
@@ -206,6 +213,7 @@ fn every_registered_rule_produces_a_plan_consistent_with_its_own_metadata() {
     for rule in &registry.rules {
         let meta = rule.metadata();
         let (region, source) = fixture_for(&meta.id);
+        let source = SourceIndex::from(source.as_str());
 
         let plan = rule.check(&region, &source, 10).unwrap_or_else(|| {
             panic!(
@@ -289,10 +297,252 @@ fn effectiveness_matches_documented_tiers() {
     }
 }
 
+/// Wraps a rule and records, by rule id, the kind and total of every
+/// region the registry offers it.
+struct Recorded {
+    rule: Box<dyn RefactorRule>,
+    offered: Arc<Mutex<Vec<(String, RegionKind, u64)>>>,
+}
+
+impl RefactorRule for Recorded {
+    fn metadata(&self) -> &'static RuleMetadata {
+        self.rule.metadata()
+    }
+
+    fn check(
+        &self,
+        region: &ComplexityRegion,
+        source: &SourceIndex,
+        function_complexity: u64,
+    ) -> Option<RefactorPlan> {
+        self.offered
+            .lock()
+            .unwrap()
+            .push((self.metadata().id.clone(), region.kind, region.total));
+        self.rule.check(region, source, function_complexity)
+    }
+}
+
+fn declares(meta: &RuleMetadata, kind: RegionKind, total: u64) -> bool {
+    (meta.region_kinds.is_empty() || meta.region_kinds.contains(&kind)) && total >= meta.min_total
+}
+
+/// Rules do not test their own region kind and total: the registry is the
+/// one place that matches regions against `region_kinds` and `min_total`.
+/// Every rule must be offered exactly the regions its metadata declares,
+/// descendants of its fixture included, and never one it rules out.
+#[test]
+fn rules_are_only_offered_the_regions_their_metadata_declares() {
+    let offered = Arc::new(Mutex::new(Vec::new()));
+    let mut registry = RuleRegistry {
+        rules: Vec::new(),
+        by_kind: vec![Vec::new(); RegionKind::ALL.len()],
+    };
+    for rule in RuleRegistry::new().rules {
+        registry.register(Box::new(Recorded {
+            rule,
+            offered: Arc::clone(&offered),
+        }));
+    }
+
+    let mut fired = 0;
+    for rule in &registry.rules {
+        let (fixture, source) = fixture_for(&rule.metadata().id);
+        let source = SourceIndex::from(source.as_str());
+        for kind in RegionKind::ALL {
+            for total in 0..8 {
+                let regions = [ComplexityRegion {
+                    kind,
+                    total,
+                    ..fixture.clone()
+                }];
+                let mut plans = Vec::new();
+                registry.collect_plans(&regions, &source, 10, &mut plans);
+                fired += plans.len();
+            }
+        }
+    }
+    assert!(fired > 0);
+
+    let offered = offered.lock().unwrap();
+    for rule in &registry.rules {
+        let meta = rule.metadata();
+        for &(kind, total) in offered
+            .iter()
+            .filter(|(id, _, _)| *id == meta.id)
+            .map(|(_, kind, total)| (kind, total))
+        {
+            assert!(
+                declares(meta, kind, total),
+                "rule {} was offered a region its metadata rules out",
+                meta.id
+            );
+        }
+        for kind in RegionKind::ALL {
+            for total in 0..8 {
+                if declares(meta, kind, total) {
+                    assert!(
+                        offered.contains(&(meta.id.clone(), kind, total)),
+                        "rule {} was never offered a region it declares",
+                        meta.id
+                    );
+                }
+            }
+        }
+    }
+}
+
+fn offer_to_every_rule(
+    registry: &RuleRegistry,
+    regions: &[ComplexityRegion],
+    source: &SourceIndex,
+    plans: &mut Vec<RefactorPlan>,
+) {
+    for region in regions {
+        for rule in &registry.rules {
+            if !declares(rule.metadata(), region.kind, region.total) {
+                continue;
+            }
+            if let Some(plan) = rule.check(region, source, 10) {
+                plans.push(plan);
+            }
+        }
+        offer_to_every_rule(registry, &region.children, source, plans);
+    }
+}
+
+fn plan_keys(plans: &[RefactorPlan]) -> Vec<(String, u64, u64)> {
+    plans
+        .iter()
+        .map(|plan| {
+            (
+                plan.rule_id.clone(),
+                plan.line_start,
+                plan.estimated_reduction,
+            )
+        })
+        .collect()
+}
+
+/// Offering each region only to the rules its kind dispatches to finds the
+/// same plans, in the same order, as matching it against the metadata of
+/// every rule.
+#[test]
+fn dispatch_finds_the_plans_of_offering_every_region_to_every_rule() {
+    let registry = RuleRegistry::new();
+    let mut found = 0;
+
+    for rule in &registry.rules {
+        let (fixture, source) = fixture_for(&rule.metadata().id);
+        let source = SourceIndex::from(source.as_str());
+        for kind in RegionKind::ALL {
+            for total in 0..8 {
+                let regions = [ComplexityRegion {
+                    kind,
+                    total,
+                    ..fixture.clone()
+                }];
+                let mut expected = Vec::new();
+                offer_to_every_rule(&registry, &regions, &source, &mut expected);
+                let mut dispatched = Vec::new();
+                registry.collect_plans(&regions, &source, 10, &mut dispatched);
+                assert_eq!(plan_keys(&dispatched), plan_keys(&expected));
+                found += expected.len();
+            }
+        }
+    }
+    assert!(found > 0);
+}
+
+/// A rule that only looks at `try` blocks, registered many times over to
+/// grow the registry.
+struct TryOnlyRule;
+
+impl RefactorRule for TryOnlyRule {
+    fn metadata(&self) -> &'static RuleMetadata {
+        static META: OnceLock<RuleMetadata> = OnceLock::new();
+        META.get_or_init(|| RuleMetadata {
+            id: "T001".to_string(),
+            name: "try_only".to_string(),
+            category: RuleCategory::Complexity,
+            description: String::new(),
+            applicability: Applicability::Informational,
+            effectiveness: 1,
+            doc_url: String::new(),
+            region_kinds: vec![RegionKind::Try],
+            min_total: 0,
+        })
+    }
+
+    fn check(
+        &self,
+        region: &ComplexityRegion,
+        _source: &SourceIndex,
+        _function_complexity: u64,
+    ) -> Option<RefactorPlan> {
+        (region.kind == RegionKind::Try).then(|| self.metadata().new_plan())
+    }
+}
+
+/// Compares offering 10k regions without a `try` to every rule with the
+/// dispatch index as the rule count grows; run with
+/// `cargo test --release rule_dispatch_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn rule_dispatch_benchmark() {
+    let kinds = [
+        RegionKind::If,
+        RegionKind::Loop,
+        RegionKind::BooleanCondition,
+        RegionKind::With,
+    ];
+    let regions: Vec<ComplexityRegion> = (0..10_000)
+        .map(|i| ComplexityRegion {
+            kind: kinds[i % kinds.len()],
+            line_start: i as u64 + 1,
+            line_end: i as u64 + 1,
+            total: 1,
+            ..Default::default()
+        })
+        .collect();
+    let source = SourceIndex::from("");
+
+    for count in [8, 64, 512] {
+        let mut registry = RuleRegistry {
+            rules: Vec::new(),
+            by_kind: vec![Vec::new(); RegionKind::ALL.len()],
+        };
+        for _ in 0..count {
+            registry.register(Box::new(TryOnlyRule));
+        }
+
+        let start = Instant::now();
+        let mut plans = Vec::new();
+        offer_to_every_rule(&registry, &regions, &source, &mut plans);
+        let every_rule = start.elapsed();
+
+        let start = Instant::now();
+        let mut dispatched = Vec::new();
+        registry.collect_plans(&regions, &source, 10, &mut dispatched);
+        let dispatch = start.elapsed();
+
+        assert!(plans.is_empty() && dispatched.is_empty());
+        println!(
+            "{count} rules, {} regions: every rule {every_rule:?}, dispatch {dispatch:?}",
+            regions.len()
+        );
+    }
+}
+
 fn module_complexity(source: &str) -> u64 {
     let parsed = parse_module(source).unwrap();
-    let (functions, _) =
-        function_level_cognitive_complexity_shared(&parsed.into_suite(), source, true, true, false);
+    let (functions, _) = function_level_cognitive_complexity_shared(
+        &parsed.into_suite(),
+        source,
+        true,
+        true,
+        AnalysisMode::ScoreOnly,
+    );
     functions
         .iter()
         .find(|f| f.name == "<module>")
@@ -349,14 +599,18 @@ fn spliceable_plan_reports_the_measured_reduction() {
     let complexity = module_complexity(&source);
     let registry = RuleRegistry::new();
 
-    let (plans, _) = registry.analyze(&regions, &source, complexity, true);
+    let scope = PlanScope::Module {
+        statements: vec![(1, 5)],
+    };
+    let lines = SourceIndex::from(source.as_str());
+    let (plans, _) = registry.analyze(&regions, &lines, complexity, &scope, 1);
 
     assert_eq!(plans.len(), 1);
     let plan = &plans[0];
     assert_eq!(plan.rule_id, "C002");
     assert!(plan.reduction_is_measured);
 
-    let spliced = splice_plan(plan, plan.suggestion.as_ref().unwrap(), &source).unwrap();
+    let spliced = splice_plan(plan, plan.suggestion.as_ref().unwrap(), &lines, (1, 5)).unwrap();
     let measured_after = module_complexity(&spliced);
     assert_eq!(
         plan.estimated_reduction,
@@ -365,6 +619,52 @@ fn spliceable_plan_reports_the_measured_reduction() {
     assert_eq!(plan.estimated_complexity_after, measured_after);
 }
 
+fn shifted(region: &ComplexityRegion, lines: u64) -> ComplexityRegion {
+    ComplexityRegion {
+        line_start: region.line_start + lines,
+        line_end: region.line_end + lines,
+        children: region
+            .children
+            .iter()
+            .map(|child| shifted(child, lines))
+            .collect(),
+        ..region.clone()
+    }
+}
+
+/// Splitting the checks and measurements of a function between threads
+/// selects the same plans, with the same measured reductions, as running
+/// them one after another.
+#[test]
+fn parallel_plans_match_the_serial_plans() {
+    let (regions, snippet) = loop_guard_regions();
+    // Enough top-level regions, and spliceable plans times scope lines, to
+    // clear the parallel thresholds.
+    let copies = 40;
+    let source = snippet.repeat(copies);
+    let regions: Vec<ComplexityRegion> = (0..copies as u64)
+        .flat_map(|copy| regions.iter().map(move |region| shifted(region, copy * 5)))
+        .collect();
+    let scope = PlanScope::Module {
+        statements: (0..copies as u64)
+            .map(|copy| (copy * 5 + 1, copy * 5 + 5))
+            .collect(),
+    };
+    let lines = SourceIndex::from(source.as_str());
+    let complexity = module_complexity(&source);
+    let registry = RuleRegistry::new();
+
+    let (serial, serial_more) = registry.analyze(&regions, &lines, complexity, &scope, 1);
+    assert_eq!(serial.len(), 5);
+    assert!(serial.iter().all(|plan| plan.reduction_is_measured));
+    for jobs in [2, 3, 16] {
+        let (parallel, parallel_more) =
+            registry.analyze(&regions, &lines, complexity, &scope, jobs);
+        assert_eq!(plan_keys(&parallel), plan_keys(&serial), "{jobs} jobs");
+        assert_eq!(parallel_more, serial_more, "{jobs} jobs");
+    }
+}
+
 /// A suggestion whose splice cannot be parsed must yield `None` from
 /// `measure_reduction` — the caller keeps the formula estimate and never
 /// panics and never prints a fabricated measured number.
@@ -380,7 +680,11 @@ fn unparseable_splice_measures_to_none() {
         spliceable: true,
     });
 
-    let measured = measure_reduction(&plan, plan.suggestion.as_ref().unwrap(), source, true);
+    let scope = PlanScope::Module {
+        statements: vec![(1, 2)],
+    };
+    let lines = SourceIndex::from(source);
+    let measured = measure_reduction(&plan, plan.suggestion.as_ref().unwrap(), &lines, &scope);
     assert!(measured.is_none());
 }
 
@@ -401,6 +705,187 @@ fn no_op_splice_measures_zero() {
         spliceable: true,
     });
 
-    let measured = measure_reduction(&plan, plan.suggestion.as_ref().unwrap(), source, false);
+    let scope = PlanScope::Function {
+        line_start: 1,
+        line_end: 2,
+    };
+    let lines = SourceIndex::from(source);
+    let measured = measure_reduction(&plan, plan.suggestion.as_ref().unwrap(), &lines, &scope);
     assert_eq!(measured, Some(0));
 }
+
+/// Decorated functions, methods and module-level statements that share
+/// lines, next to code that is not part of them.
+const SCOPED_PLANS: &str = "\
+import os; x = os.sep or '/'
+
+@decorator(a if b else c)
+def guarded(items):
+    for item in items:
+        if item:
+            if item.ready:
+                item.run()
+    return guarded(items[1:])
+
+class Jobs:
+    def run(self, jobs):
+        for job in jobs:
+            if job.ready:
+                if job.enabled:
+                    job.start()
+
+    @staticmethod
+    def check(value):
+        if value:
+            if value > 1:
+                return value
+
+for path in paths:
+    if path:
+        if path.exists():
+            print(path)
+y = (a and
+     b); z = [
+    p for p in paths
+    if p and q
+]
+if z:
+    if y:
+        print(z)
+";
+
+fn python_files(dir: &Path, files: &mut Vec<PathBuf>) {
+    for entry in std::fs::read_dir(dir).unwrap() {
+        let path = entry.unwrap().path();
+        if path.is_dir() {
+            python_files(&path, files);
+        } else if path.extension().is_some_and(|ext| ext == "py") {
+            files.push(path);
+        }
+    }
+}
+
+/// The reduction found by splicing the plan into the whole module and
+/// re-scoring all of it.
+fn whole_module_reduction(plan: &RefactorPlan, source: &str, is_module: bool) -> Option<u64> {
+    let lines = SourceIndex::from(source);
+    let whole = (1, lines.line_count() as u64);
+    let spliced = splice_plan(plan, plan.suggestion.as_ref()?, &lines, whole)?;
+    let parsed = parse_module(&spliced).ok()?;
+    let (functions, _) = function_level_cognitive_complexity_shared(
+        parsed.suite(),
+        &spliced,
+        true,
+        true,
+        AnalysisMode::ScoreOnly,
+    );
+    let new_complexity = if is_module {
+        functions.iter().find(|f| f.name == "<module>")?.complexity
+    } else {
+        functions
+            .iter()
+            .filter(|f| f.name != "<module>" && f.line_start <= plan.line_start)
+            .max_by_key(|f| f.line_start)?
+            .complexity
+    };
+    Some(plan.current_complexity.saturating_sub(new_complexity))
+}
+
+/// Measuring a plan on its own function or statements gives the reduction a
+/// re-parse of the whole spliced module gives.
+#[test]
+fn scoped_measurement_matches_the_whole_module() {
+    let mut files = Vec::new();
+    python_files(
+        &Path::new(env!("CARGO_MANIFEST_DIR")).join("tests"),
+        &mut files,
+    );
+    let mut sources = vec![SCOPED_PLANS.to_string()];
+    sources.extend(
+        files
+            .iter()
+            .map(|path| std::fs::read_to_string(path).unwrap()),
+    );
+
+    let mut measured = 0;
+    let mut module_measured = 0;
+    for source in &sources {
+        let Ok(parsed) = parse_module(source) else {
+            continue;
+        };
+        let (functions, _) = function_level_cognitive_complexity_shared(
+            parsed.suite(),
+            source,
+            true,
+            false,
+            AnalysisMode::Full,
+        );
+        for function in &functions {
+            let is_module = function.name == "<module>";
+            for plan in &function.refactor_plans {
+                if !plan.reduction_is_measured {
+                    continue;
+                }
+                assert_eq!(
+                    Some(plan.estimated_reduction),
+                    whole_module_reduction(plan, source, is_module),
+                    "{} in {source:?}",
+                    function.name
+                );
+                measured += 1;
+                module_measured += usize::from(is_module);
+            }
+        }
+    }
+    assert!(measured > 0);
+    assert!(module_measured > 0);
+}
+
+#[test]
+fn module_plans_are_measured_on_whole_statements() {
+    let statements = [(1, 1), (3, 4), (4, 6), (8, 9)];
+    assert_eq!(statement_block(&statements, 5, 5), Some((3, 6)));
+    assert_eq!(statement_block(&statements, 1, 1), Some((1, 1)));
+    assert_eq!(statement_block(&statements, 8, 8), Some((8, 9)));
+    assert_eq!(statement_block(&statements, 7, 7), None);
+}
+
+/// Compares measuring every plan of a ~4k-line module on its own function
+/// with re-parsing the whole spliced module; run with
+/// `cargo test --release scoped_measurement_benchmark -- --ignored --nocapture`.
+#[test]
+#[ignore]
+fn scoped_measurement_benchmark() {
+    let source: String = (0..500)
+        .map(|i| {
+            format!(
+                "def f_{i}(items):\n    for item in items:\n        if item:\n            if item.ready:\n                item.run()\n    return items\n\n\n"
+            )
+        })
+        .collect();
+    let parsed = parse_module(&source).unwrap();
+    let start = Instant::now();
+    let (functions, _) = function_level_cognitive_complexity_shared(
+        parsed.suite(),
+        &source,
+        false,
+        false,
+        AnalysisMode::Full,
+    );
+    let scoped = start.elapsed();
+    let plans: Vec<&RefactorPlan> = functions
+        .iter()
+        .flat_map(|f| &f.refactor_plans)
+        .filter(|plan| plan.reduction_is_measured)
+        .collect();
+    let start = Instant::now();
+    for plan in &plans {
+        assert!(whole_module_reduction(plan, &source, false).is_some());
+    }
+    println!(
+        "{} lines, {} measured plans: scoped analysis {scoped:?}, whole-module measurement alone {:?}",
+        source.lines().count(),
+        plans.len(),
+        start.elapsed()
+    );
+}
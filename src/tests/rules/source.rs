@@ -0,0 +1,32 @@
+//! Unit tests for `crate::rules::source`.
+//!
+//! Wired in from `src/rules/source.rs` via `#[cfg(test)] #[path = ...] mod tests;`
+//! so this stays a child module of the code it tests.
+
+use super::SourceIndex;
+
+const SOURCES: &[&str] = &[
+    "",
+    "\n",
+    "x = 1",
+    "x = 1\n",
+    "def f():\n    return 1\n\n\ndef g():\n\tpass",
+    "s = 'ñandú'\nif s:  # café\n    t = \"日本語\"; u = 1\n",
+    "a = 1\r\nb = 2\r\n\r\n  c = 3\r",
+];
+
+#[test]
+fn lines_and_indents_match_str_lines() {
+    for source in SOURCES {
+        let index = SourceIndex::from(*source);
+        let expected: Vec<&str> = source.lines().collect();
+        assert_eq!(index.line_count(), expected.len(), "{source:?}");
+        assert_eq!(index.lines(0..expected.len()).collect::<Vec<_>>(), expected);
+        for (idx, line) in expected.iter().enumerate() {
+            assert_eq!(index.line(idx), *line);
+            assert_eq!(index.get(idx), Some(*line));
+            assert_eq!(index.indent(idx), line.len() - line.trim_start().len());
+        }
+        assert_eq!(index.get(expected.len()), None);
+    }
+}
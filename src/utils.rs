@@ -1,4 +1,6 @@
 #[cfg(any(feature = "python", feature = "wasm"))]
+use crate::line_index::LineIndex;
+#[cfg(any(feature = "python", feature = "wasm"))]
 use regex::Regex;
 #[cfg(any(feature = "python", feature = "wasm"))]
 use ruff_python_ast::{self as ast, Stmt};
@@ -8,6 +10,7 @@ use std::sync::OnceLock;
 #[cfg(feature = "python")]
 mod python_deps {
     pub use crate::classes::{FileComplexity, FunctionComplexity};
+    pub use crate::helpers::results::{MergeOptions, MergedResults};
     pub use csv::Writer;
     pub use pyo3::exceptions::{PyIOError, PyValueError};
     pub use pyo3::prelude::*;
@@ -114,15 +117,17 @@ pub fn output_json(
         for function in file.functions {
             if show_detailed_results || function.complexity > max_complexity_limit {
                 let refactor_plans = if suggest_refactors {
-                    function.refactor_plans
+                    function.plans().0
                 } else {
-                    Vec::new()
+                    &[]
                 };
                 let entry = serde_json::json!({
                     "path": file.path,
                     "file_name": file.file_name,
                     "function_name": function.name,
                     "complexity": function.complexity,
+                    "line_start": function.line_start,
+                    "line_end": function.line_end,
                     "refactor_plans": refactor_plans
                 });
                 json_data.push(entry);
@@ -212,6 +217,35 @@ pub fn load_snapshot_file(snapshot_file_path: &str) -> PyResult<Vec<FileComplexi
         .map_err(|e| PyValueError::new_err(format!("Failed to parse snapshot JSON: {}", e)))
 }
 
+/// Rebuild `FileComplexity` entries from result files (JSON reports or
+/// snapshots) without re-analyzing anything. Each file is streamed, so the
+/// inputs are never loaded whole; files that cannot be read or parsed are
+/// returned as failed paths.
+#[cfg(feature = "python")]
+#[pyfunction]
+#[pyo3(signature = (paths, keep_plans=false, max_complexity=None))]
+pub fn load_result_files(
+    py: Python<'_>,
+    paths: Vec<String>,
+    keep_plans: bool,
+    max_complexity: Option<u64>,
+) -> (Vec<FileComplexity>, Vec<String>) {
+    let options = MergeOptions {
+        keep_plans,
+        max_complexity,
+    };
+    py.detach(|| {
+        let mut merged = MergedResults::default();
+        let mut failed_paths = Vec::new();
+        for path in paths {
+            if merged.read_file(&path, &options).is_err() {
+                failed_paths.push(path);
+            }
+        }
+        (merged.into_files(), failed_paths)
+    })
+}
+
 #[cfg(feature = "python")]
 pub fn get_repo_name(url: &str) -> PyResult<String> {
     let url = url.trim_end_matches('/');
@@ -229,86 +263,77 @@ pub fn get_repo_name(url: &str) -> PyResult<String> {
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-pub fn is_decorator(statement: Stmt) -> bool {
-    let mut ans = false;
+pub fn is_decorator(statement: &Stmt) -> bool {
     if let Stmt::FunctionDef(f) = statement
-        && f.body.len() == 2
+        && let [first, second] = f.body.as_slice()
     {
-        ans = matches!(f.body[0].clone(), Stmt::FunctionDef(..))
-            && matches!(f.body[1].clone(), Stmt::Return(..));
+        return matches!(first, Stmt::FunctionDef(..)) && matches!(second, Stmt::Return(..));
     }
-
-    ans
+    false
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-pub fn count_bool_ops(expr: ast::Expr, nesting_level: u64) -> u64 {
+pub fn count_bool_ops(expr: &ast::Expr, nesting_level: u64) -> u64 {
     let mut complexity: u64 = 0;
 
     match expr {
         ast::Expr::BoolOp(..) => {
             complexity += 1;
-            if let Some(b) = expr.clone().bool_op_expr() {
-                for value in b.values.iter() {
-                    complexity += count_different_childs_type(value.clone(), expr.clone());
-                }
-            }
+            complexity += count_operator_changes(expr);
         }
         ast::Expr::UnaryOp(..) => {
-            if let Some(u) = expr.clone().unary_op_expr() {
-                complexity += count_different_childs_type(*u.operand, expr.clone());
-            }
+            complexity += count_operator_changes(expr);
         }
         ast::Expr::Compare(c) => {
-            complexity += count_bool_ops(*c.left, nesting_level);
+            complexity += count_bool_ops(&c.left, nesting_level);
             for comparator in c.comparators.iter() {
-                complexity += count_bool_ops(comparator.clone(), nesting_level);
+                complexity += count_bool_ops(comparator, nesting_level);
             }
         }
         ast::Expr::If(i) => {
             complexity += 1 + nesting_level;
-            complexity += count_bool_ops(*i.test, nesting_level);
-            complexity += count_bool_ops(*i.body, nesting_level + 1);
-            complexity += count_bool_ops(*i.orelse, nesting_level + 1);
+            complexity += count_bool_ops(&i.test, nesting_level);
+            complexity += count_bool_ops(&i.body, nesting_level + 1);
+            complexity += count_bool_ops(&i.orelse, nesting_level + 1);
         }
         ast::Expr::Lambda(l) => {
-            complexity += count_bool_ops(*l.body, nesting_level + 1);
+            complexity += count_bool_ops(&l.body, nesting_level + 1);
         }
         ast::Expr::ListComp(c) => {
-            complexity += count_comprehension(&[*c.elt], &c.generators, nesting_level);
+            complexity += count_comprehension(&[&*c.elt], &c.generators, nesting_level);
         }
         ast::Expr::SetComp(c) => {
-            complexity += count_comprehension(&[*c.elt], &c.generators, nesting_level);
+            complexity += count_comprehension(&[&*c.elt], &c.generators, nesting_level);
         }
         ast::Expr::Generator(c) => {
-            complexity += count_comprehension(&[*c.elt], &c.generators, nesting_level);
+            complexity += count_comprehension(&[&*c.elt], &c.generators, nesting_level);
         }
         ast::Expr::DictComp(c) => {
-            complexity += count_comprehension(&[*c.key, *c.value], &c.generators, nesting_level);
+            complexity += count_comprehension(&[&*c.key, &*c.value], &c.generators, nesting_level);
         }
         ast::Expr::Call(c) => {
             for arg in c.arguments.args.iter() {
-                complexity += count_bool_ops(arg.clone(), nesting_level);
+                complexity += count_bool_ops(arg, nesting_level);
             }
         }
         ast::Expr::Tuple(t) => {
             for element in t.elts.iter() {
-                complexity += count_bool_ops(element.clone(), nesting_level);
+                complexity += count_bool_ops(element, nesting_level);
             }
         }
         ast::Expr::List(l) => {
             for element in l.elts.iter() {
-                complexity += count_bool_ops(element.clone(), nesting_level);
+                complexity += count_bool_ops(element, nesting_level);
             }
         }
         ast::Expr::Set(s) => {
             for element in s.elts.iter() {
-                complexity += count_bool_ops(element.clone(), nesting_level);
+                complexity += count_bool_ops(element, nesting_level);
             }
         }
         ast::Expr::Dict(d) => {
             for value in d.iter_values() {
-                complexity += count_bool_ops(value.clone(), nesting_level);
+                complexity += count_bool_ops(value, nesting_level);
             }
         }
         _ => {}
@@ -319,7 +344,7 @@ pub fn count_bool_ops(expr: ast::Expr, nesting_level: u64) -> u64 {
 
 #[cfg(any(feature = "python", feature = "wasm"))]
 fn count_comprehension(
-    elements: &[ast::Expr],
+    elements: &[&ast::Expr],
     generators: &[ast::Comprehension],
     nesting_level: u64,
 ) -> u64 {
@@ -328,74 +353,124 @@ fn count_comprehension(
 
     for generator in generators.iter() {
         complexity += 1 + nesting_level;
-        complexity += count_bool_ops(generator.iter.clone(), nesting_level);
+        complexity += count_bool_ops(&generator.iter, nesting_level);
         for filter in generator.ifs.iter() {
             complexity += 1;
-            complexity += count_bool_ops(filter.clone(), inner_nesting);
+            complexity += count_bool_ops(filter, inner_nesting);
         }
     }
 
     for element in elements.iter() {
-        complexity += count_bool_ops(element.clone(), inner_nesting);
+        complexity += count_bool_ops(element, inner_nesting);
     }
 
     complexity
 }
 
+/// Boolean and unary operators found at one depth of a boolean expression.
 #[cfg(any(feature = "python", feature = "wasm"))]
-fn count_different_childs_type(expr: ast::Expr, prev_pr: ast::Expr) -> u64 {
-    let mut complexity: u64 = 0;
+#[derive(Clone, Copy, Default)]
+struct OperatorLevel {
+    and: u64,
+    or: u64,
+    unary: u64,
+}
 
-    match expr {
-        ast::Expr::BoolOp(..) => match prev_pr {
-            ast::Expr::BoolOp(p) => {
-                if let Some(b) = expr.clone().bool_op_expr()
-                    && b.op != p.op
-                {
-                    complexity += 1;
-                }
+#[cfg(any(feature = "python", feature = "wasm"))]
+impl OperatorLevel {
+    /// Changes counted between every operator of `self` and every operator
+    /// of `other`: an `and` meeting an `or`, or a boolean operator meeting a
+    /// unary one in `other`.
+    fn changes_against(self, other: OperatorLevel) -> u64 {
+        self.and * other.or + self.or * other.and + (self.and + self.or) * other.unary
+    }
+}
 
-                for value in p.values {
-                    complexity += count_different_childs_type(value, expr.clone());
-                }
-            }
-            ast::Expr::UnaryOp(p) => {
-                complexity = 1 + count_different_childs_type(*p.operand, expr);
-            }
-            _ => {}
-        },
-        ast::Expr::UnaryOp(..) => match prev_pr {
-            ast::Expr::BoolOp(p) => {
-                for value in p.values {
-                    complexity += count_different_childs_type(value, expr.clone());
-                }
-            }
-            ast::Expr::UnaryOp(p) => {
-                complexity = count_different_childs_type(*p.operand, expr);
-            }
-            _ => {}
-        },
-        _ => {}
+/// Boolean expressions nested deeper than this tally their levels on the
+/// heap instead of the stack.
+#[cfg(any(feature = "python", feature = "wasm"))]
+const INLINE_OPERATOR_LEVELS: usize = 32;
+
+/// Operator-sequence changes inside the boolean or unary expression `expr`.
+///
+/// Every operator is paired with every operator one level above it and with
+/// every other operator on its own level, so the count only depends on how
+/// many `and`, `or` and unary operators sit at each depth of the unbroken
+/// chain of boolean/unary nodes below `expr`. Those are tallied in one walk.
+#[cfg(any(feature = "python", feature = "wasm"))]
+fn count_operator_changes(expr: &ast::Expr) -> u64 {
+    let mut inline = [OperatorLevel::default(); INLINE_OPERATOR_LEVELS];
+    if tally_operator_levels(expr, 0, &mut inline) {
+        return sum_operator_changes(&inline);
     }
+    let mut levels = vec![OperatorLevel::default(); operator_depth(expr)];
+    tally_operator_levels(expr, 0, &mut levels);
+    sum_operator_changes(&levels)
+}
 
-    complexity
+/// Add the operators of `expr` and its boolean/unary descendants to
+/// `levels`, starting at `depth`. Returns `false` if they do not fit.
+#[cfg(any(feature = "python", feature = "wasm"))]
+fn tally_operator_levels(expr: &ast::Expr, depth: usize, levels: &mut [OperatorLevel]) -> bool {
+    match expr {
+        ast::Expr::BoolOp(b) => {
+            let Some(level) = levels.get_mut(depth) else {
+                return false;
+            };
+            match b.op {
+                ast::BoolOp::And => level.and += 1,
+                ast::BoolOp::Or => level.or += 1,
+            }
+            b.values
+                .iter()
+                .all(|value| tally_operator_levels(value, depth + 1, levels))
+        }
+        ast::Expr::UnaryOp(u) => {
+            let Some(level) = levels.get_mut(depth) else {
+                return false;
+            };
+            level.unary += 1;
+            tally_operator_levels(&u.operand, depth + 1, levels)
+        }
+        _ => true,
+    }
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-pub fn get_line_number(byte_index: usize, code: &str) -> u64 {
-    let before_slice = &code[..byte_index];
-    let newline_count = before_slice.chars().filter(|&c| c == '\n').count();
-    (newline_count + 1) as u64
+fn operator_depth(expr: &ast::Expr) -> usize {
+    match expr {
+        ast::Expr::BoolOp(b) => 1 + b.values.iter().map(operator_depth).max().unwrap_or(0),
+        ast::Expr::UnaryOp(u) => 1 + operator_depth(&u.operand),
+        _ => 0,
+    }
 }
 
 #[cfg(any(feature = "python", feature = "wasm"))]
-pub fn get_column_number(byte_index: usize, code: &str) -> u64 {
-    let before_slice = &code[..byte_index];
-    let column_start = match before_slice.rfind('\n') {
-        Some(newline_index) => newline_index + 1,
-        None => 0,
-    };
-    (before_slice[column_start..].chars().count() + 1) as u64
+fn sum_operator_changes(levels: &[OperatorLevel]) -> u64 {
+    levels
+        .windows(2)
+        .map(|pair| pair[1].changes_against(pair[1]) + pair[1].changes_against(pair[0]))
+        .sum()
+}
+
+/// Whether `code` may hold anything that scores: a function definition or a
+/// keyword that adds complexity wherever it appears. Sources without any
+/// define no functions and total 0, so they need not be parsed. Keywords in
+/// strings, comments and identifiers like `x1if` only cause false positives.
+#[cfg(feature = "python")]
+pub fn may_add_complexity(code: &str) -> bool {
+    static KEYWORD_RE: OnceLock<Regex> = OnceLock::new();
+
+    let keyword_re =
+        KEYWORD_RE.get_or_init(|| Regex::new(r"def|if|for|while|except|match|and|or").unwrap());
+    let bytes = code.as_bytes();
+    // A digit before a keyword does not join it to a name: `1if x else 2`.
+    let joins_before = |byte: &u8| byte.is_ascii_alphabetic() || *byte == b'_' || !byte.is_ascii();
+    let joins_after = |byte: &u8| byte.is_ascii_alphanumeric() || *byte == b'_' || !byte.is_ascii();
+    keyword_re.find_iter(code).any(|keyword| {
+        let before = keyword.start().checked_sub(1).map(|i| &bytes[i]);
+        !before.is_some_and(joins_before) && !bytes.get(keyword.end()).is_some_and(joins_after)
+    })
 }
 
 /// Extract a canonical ignore comment marker from a line.
@@ -404,7 +479,7 @@ pub fn get_column_number(byte_index: usize, code: &str) -> u64 {
 /// when the line contains the corresponding pattern (case-insensitive).
 /// Returns `None` if neither marker is found.
 #[cfg(any(feature = "python", feature = "wasm"))]
-pub fn extract_comment_marker(line: &str) -> Option<String> {
+pub fn extract_comment_marker(line: &str) -> Option<&'static str> {
     static IGNORE_RE: OnceLock<Regex> = OnceLock::new();
     static NOQA_RE: OnceLock<Regex> = OnceLock::new();
 
@@ -413,92 +488,133 @@ pub fn extract_comment_marker(line: &str) -> Option<String> {
     let noqa_re = NOQA_RE.get_or_init(|| Regex::new(r"(?i)#\s*noqa\s*:\s*complexipy.*").unwrap());
 
     if ignore_re.is_match(line) {
-        return Some("# complexipy: ignore".to_string());
+        return Some("# complexipy: ignore");
     } else if noqa_re.is_match(line) {
-        return Some("# noqa: complexipy".to_string());
+        return Some("# noqa: complexipy");
     }
 
     None
 }
 
-/// Find a noqa/ignore comment near a `def` or decorator line.
-///
-/// Returns `Some(comment_text)` when a marker is found that would
-/// trigger suppression, `None` otherwise.
+/// The ignore markers of one file, found with a single scan of its lines, so
+/// checking whether a function is suppressed is a lookup instead of running
+/// the marker regexes over the lines around every `def`.
 #[cfg(any(feature = "python", feature = "wasm"))]
-pub fn find_noqa_comment(line_number: u64, code: &str) -> Option<String> {
-    if line_number == 0 {
-        return None;
-    }
-
-    let lines: Vec<&str> = code.lines().collect();
-    let idx = (line_number as usize).saturating_sub(1);
+pub struct IgnoreMarkers<'a> {
+    lines: &'a LineIndex<'a>,
+    /// 0-based index and marker of every line holding one, in line order.
+    markers: Vec<(usize, &'static str)>,
+}
 
-    let signature_has_marker = |def_idx: usize| -> Option<String> {
-        let max_scan = (def_idx + 20).min(lines.len());
-        for line in lines.iter().skip(def_idx).take(max_scan - def_idx) {
-            if let Some(marker) = extract_comment_marker(line) {
-                return Some(marker);
+#[cfg(any(feature = "python", feature = "wasm"))]
+impl<'a> IgnoreMarkers<'a> {
+    pub fn new(lines: &'a LineIndex<'a>) -> Self {
+        let mut markers = Vec::new();
+        let mut last_idx = None;
+        // Only lines holding a `#` can carry a marker.
+        for offset in memchr::memchr_iter(b'#', lines.source().as_bytes()) {
+            let idx = lines.line_number(offset) as usize - 1;
+            if last_idx == Some(idx) {
+                continue;
             }
-            if line.contains(':') {
-                break;
+            last_idx = Some(idx);
+            if let Some(marker) = lines.line(idx).and_then(extract_comment_marker) {
+                markers.push((idx, marker));
             }
         }
-        None
-    };
-
-    if idx < lines.len()
-        && let Some(marker) = extract_comment_marker(lines[idx])
-    {
-        return Some(marker);
+        IgnoreMarkers { lines, markers }
     }
 
-    if idx > 0
-        && let Some(marker) = extract_comment_marker(lines[idx - 1])
-    {
-        return Some(marker);
+    pub fn is_empty(&self) -> bool {
+        self.markers.is_empty()
     }
 
-    if idx < lines.len() && lines[idx].trim_start().starts_with("def ") {
-        return signature_has_marker(idx);
+    fn marker_on(&self, idx: usize) -> Option<&'static str> {
+        self.markers
+            .binary_search_by_key(&idx, |&(marker_idx, _)| marker_idx)
+            .ok()
+            .map(|pos| self.markers[pos].1)
     }
 
-    if idx < lines.len() && lines[idx].trim_start().starts_with('@') {
-        let max_scan = (idx + 10).min(lines.len());
-        for i in (idx + 1)..max_scan {
-            let line = lines[i].trim();
-            if line.starts_with("def ") {
-                if let Some(marker) = signature_has_marker(i) {
+    /// Find a noqa/ignore comment near a `def` or decorator line.
+    ///
+    /// Returns `Some(comment_text)` when a marker is found that would
+    /// trigger suppression, `None` otherwise.
+    pub fn find(&self, line_number: u64) -> Option<&'static str> {
+        if line_number == 0 || self.markers.is_empty() {
+            return None;
+        }
+
+        let line_count = self.lines.line_count();
+        let line = |idx: usize| self.lines.line(idx).unwrap_or_default();
+        let idx = (line_number as usize).saturating_sub(1);
+
+        let signature_has_marker = |def_idx: usize| -> Option<&'static str> {
+            let max_scan = (def_idx + 20).min(line_count);
+            for scan_idx in def_idx..max_scan {
+                if let Some(marker) = self.marker_on(scan_idx) {
                     return Some(marker);
                 }
-                if i > 0
-                    && let Some(marker) = extract_comment_marker(lines[i - 1])
-                {
-                    return Some(marker);
+                if line(scan_idx).contains(':') {
+                    break;
                 }
-                break;
             }
-            if !line.is_empty() && !line.trim_start().starts_with('@') {
-                break;
+            None
+        };
+
+        if idx < line_count
+            && let Some(marker) = self.marker_on(idx)
+        {
+            return Some(marker);
+        }
+
+        if idx > 0
+            && let Some(marker) = self.marker_on(idx - 1)
+        {
+            return Some(marker);
+        }
+
+        if idx < line_count && line(idx).trim_start().starts_with("def ") {
+            return signature_has_marker(idx);
+        }
+
+        if idx < line_count && line(idx).trim_start().starts_with('@') {
+            let max_scan = (idx + 10).min(line_count);
+            for i in (idx + 1)..max_scan {
+                let current = line(i).trim();
+                if current.starts_with("def ") {
+                    if let Some(marker) = signature_has_marker(i) {
+                        return Some(marker);
+                    }
+                    if let Some(marker) = self.marker_on(i - 1) {
+                        return Some(marker);
+                    }
+                    break;
+                }
+                if !current.is_empty() && !current.trim_start().starts_with('@') {
+                    break;
+                }
             }
         }
-    }
 
-    None
-}
+        None
+    }
 
-#[cfg(any(feature = "python", feature = "wasm"))]
-pub fn has_noqa_complexipy(line_number: u64, code: &str) -> bool {
-    find_noqa_comment(line_number, code).is_some()
+    pub fn suppresses(&self, line_number: u64) -> bool {
+        self.find(line_number).is_some()
+    }
 }
 
-/// Collect ignored locations from code, only reporting markers that
-/// actually suppress a function definition (i.e., are adjacent to `def`
-/// or `@decorator` lines).
+/// Collect ignored locations from a file's markers, only reporting markers
+/// that actually suppress a function definition (i.e., are adjacent to
+/// `def` or `@decorator` lines).
 #[cfg(feature = "python")]
-pub fn collect_ignored_locations(code: &str) -> Vec<(u64, String)> {
+pub fn collect_ignored_locations(markers: &IgnoreMarkers) -> Vec<(u64, String)> {
     let mut results = Vec::new();
-    let lines: Vec<&str> = code.lines().collect();
+    if markers.is_empty() {
+        return results;
+    }
+    let lines: Vec<&str> = markers.lines.lines().collect();
     #[allow(clippy::needless_range_loop)]
     let mut idx = 0;
     while idx < lines.len() {
@@ -506,8 +622,8 @@ pub fn collect_ignored_locations(code: &str) -> Vec<(u64, String)> {
 
         if trimmed.starts_with("def ") {
             let line_number = (idx + 1) as u64;
-            if let Some(comment) = find_noqa_comment(line_number, code) {
-                results.push((line_number, comment));
+            if let Some(comment) = markers.find(line_number) {
+                results.push((line_number, comment.to_string()));
             }
             idx += 1;
         } else if trimmed.starts_with('@') {
@@ -530,9 +646,9 @@ pub fn collect_ignored_locations(code: &str) -> Vec<(u64, String)> {
             }
             let mut reported = false;
             if let Some(dln) = def_line_number
-                && let Some(comment) = find_noqa_comment(dln, code)
+                && let Some(comment) = markers.find(dln)
             {
-                results.push((dln, comment));
+                results.push((dln, comment.to_string()));
                 reported = true;
             }
             while idx + 1 < lines.len() {
@@ -588,3 +704,15 @@ pub fn filter_removable_ignores(
 #[cfg(test)]
 #[path = "tests/removable.rs"]
 mod tests;
+
+#[cfg(all(test, feature = "python"))]
+#[path = "tests/bool_ops.rs"]
+mod bool_ops_tests;
+
+#[cfg(all(test, feature = "python"))]
+#[path = "tests/ignore_markers.rs"]
+mod ignore_markers_tests;
+
+#[cfg(all(test, feature = "python"))]
+#[path = "tests/prefilter.rs"]
+mod prefilter_tests;
@@ -3,7 +3,9 @@ use std::panic;
 use wasm_bindgen::prelude::*;
 
 use crate::classes::CodeComplexity;
-use crate::cognitive_complexity::function_level_cognitive_complexity_shared;
+use crate::cognitive_complexity::{
+    AnalysisMode, check_nesting_depth, function_level_cognitive_complexity_shared,
+};
 
 #[wasm_bindgen(start)]
 pub fn start() {
@@ -24,13 +26,14 @@ fn get_code_complexity(code: &str) -> Result<CodeComplexity, String> {
         Ok(parsed) => parsed,
         Err(e) => return Err(format!("Parse error: {}", e)),
     };
+    check_nesting_depth(parsed.suite())?;
 
     let (functions, complexity) = function_level_cognitive_complexity_shared(
         parsed.suite(),
         code,
         false,
         false,
-        true,
+        AnalysisMode::Full,
     );
 
     Ok(CodeComplexity {
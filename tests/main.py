@@ -1,3 +1,8 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
 from pathlib import Path
 from typing import List, Tuple
 
@@ -189,6 +194,150 @@ def hello_world(s: str) -> str:
         result = code_complexity(snippet)
         assert 2 == result.complexity
 
+    def test_score_only_matches_full_scores(self):
+        path = self.local_path / "src"
+        full, _ = _complexipy.main([path.resolve().as_posix()], True, [], False)
+        scores, _ = _complexipy.main(
+            [path.resolve().as_posix()], True, [], False, score_only=True
+        )
+
+        def summary(files: List[FileComplexity]):
+            return [
+                (
+                    file.path,
+                    file.complexity,
+                    [
+                        (f.name, f.complexity, f.line_start, f.line_end)
+                        for f in file.functions
+                    ],
+                )
+                for file in files
+            ]
+
+        assert summary(scores) == summary(full)
+        functions = [f for file in scores for f in file.functions]
+        assert all(len(f.line_complexities) == 0 for f in functions)
+        assert all(f.refactor_plans == [] for f in functions)
+
+    def test_score_only_code_complexity_api(self):
+        snippet = "def f(x):\n    if x and y:\n        return 1\n"
+        full = code_complexity(snippet)
+        scores = code_complexity(snippet, score_only=True)
+        assert scores.complexity == full.complexity == 2
+        assert len(full.functions[0].line_complexities) == 2
+        assert len(scores.functions[0].line_complexities) == 0
+
+    def test_refactor_plans_are_built_on_request(self):
+        path = (self.local_path / "fixtures" / "refactor_plans").resolve()
+        default, _ = _complexipy.main([path.as_posix()], True, [], False)
+        planned, _ = _complexipy.main(
+            [path.as_posix()], True, [], False, refactor_plans=True
+        )
+
+        def plans(function):
+            return (
+                [
+                    (p.rule_id, p.line_start, p.estimated_reduction)
+                    for p in function.refactor_plans
+                ],
+                function.additional_refactor_plans,
+            )
+
+        functions = [f for file in default for f in file.functions]
+        assert all(plans(f) == ([], 0) for f in functions)
+
+        built = []
+        for file in planned:
+            alone = file_complexity(str(path / file.file_name))
+            assert len(alone.functions) == len(file.functions)
+            for function, expected in zip(file.functions, alone.functions):
+                assert plans(function) == plans(expected)
+                assert plans(function) == plans(function)
+                built.append(plans(function))
+        assert any(function_plans for function_plans, _ in built)
+
+    def test_plan_jobs_do_not_change_plans(self):
+        path = (self.local_path / "fixtures" / "refactor_plans").resolve()
+
+        def plans(plan_jobs):
+            files, _ = _complexipy.main(
+                [path.as_posix()],
+                True,
+                [],
+                False,
+                refactor_plans=True,
+                plan_jobs=plan_jobs,
+            )
+            return [
+                (
+                    [
+                        (p.rule_id, p.line_start, p.estimated_reduction)
+                        for p in function.refactor_plans
+                    ],
+                    function.additional_refactor_plans,
+                )
+                for file in files
+                for function in file.functions
+            ]
+
+        serial = plans(1)
+        assert any(function_plans for function_plans, _ in serial)
+        assert plans(4) == serial
+        assert plans(None) == serial
+
+    def test_files_without_functions_are_not_parsed(self, tmp_path):
+        source = tmp_path / "settings.py"
+        source.write_text(
+            "from .base import *\n\nDEBUG = not True\nHOSTS = ['a', 'b']\n"
+        )
+        result = file_complexity(str(source))
+        assert result.complexity == 0
+        assert result.functions == []
+
+        script = file_complexity(str(source), check_script=True)
+        assert [
+            (f.name, f.complexity, f.line_start, f.line_end)
+            for f in script.functions
+        ] == [("<module>", 0, 1, 4)]
+
+    def test_code_complexity_releases_gil(self):
+        """Other Python threads keep running while code_complexity works."""
+        snippet = "".join(
+            f"""\
+def func_{i}(a, b, c):
+    for x in a:
+        if x and b or c:
+            while b:
+                if x > c and not a:
+                    break
+    return a
+"""
+            for i in range(4000)
+        )
+        stop = threading.Event()
+        ticks: List[float] = []
+
+        def tick() -> None:
+            while not stop.is_set():
+                ticks.append(time.perf_counter())
+                time.sleep(0.001)
+
+        ticker = threading.Thread(target=tick)
+        ticker.start()
+        try:
+            start = time.perf_counter()
+            result = code_complexity(snippet)
+            end = time.perf_counter()
+        finally:
+            stop.set()
+            ticker.join()
+
+        assert len(result.functions) == 4000
+        # Holding the GIL would only let the ticker run just before and just
+        # after the call, never in the middle of it.
+        quarter = (end - start) / 4
+        assert any(start + quarter < t < end - quarter for t in ticks)
+
     def test_utf8_multi_byte_comment_no_panic(self):
         """Multi-byte UTF-8 characters in comments must not cause panics.
 
@@ -697,6 +846,163 @@ def hello_world(s: str) -> str:
         # **/test_exclude*.py matches both test_exclude1.py and test_exclude2.py (complexity 3+3=6)
         assert 58 == total_complexity
 
+    def test_jobs_results_match_serial(self):
+        path = self.local_path / "src"
+        serial, serial_failed = _complexipy.main(
+            [path.resolve().as_posix()], True, [], False, jobs=1
+        )
+        parallel, parallel_failed = _complexipy.main(
+            [path.resolve().as_posix()], True, [], False, jobs=4
+        )
+
+        def summary(files: List[FileComplexity]):
+            return [
+                (
+                    file.path,
+                    file.complexity,
+                    [(f.name, f.complexity) for f in file.functions],
+                )
+                for file in files
+            ]
+
+        assert summary(serial) == summary(parallel)
+        assert serial_failed == parallel_failed
+        assert 64 == sum(file.complexity for file in parallel)
+
+    def test_pipeline_queue_depths_do_not_change_results(self, capfd):
+        path = self.local_path / "src"
+        files, failed = _complexipy.main(
+            [path.resolve().as_posix()],
+            True,
+            [],
+            False,
+            jobs=4,
+            path_queue_depth=1,
+            read_queue_depth=1,
+            stats=True,
+        )
+
+        assert 64 == sum(file.complexity for file in files)
+        assert failed == []
+        stderr = capfd.readouterr().err
+        assert "discovery" in stderr
+        assert "analysis" in stderr
+
+    @pytest.mark.parametrize("schedule", ["discovery", "largest-first"])
+    def test_schedule_does_not_change_results(self, schedule):
+        path = self.local_path / "src"
+        files, _ = _complexipy.main(
+            [path.resolve().as_posix()], True, [], False, schedule=schedule
+        )
+
+        assert 64 == sum(file.complexity for file in files)
+        assert [file.path for file in files] == sorted(
+            file.path for file in files
+        )
+
+    def test_unknown_schedule_raises(self):
+        path = self.local_path / "src"
+        with pytest.raises(ValueError):
+            _complexipy.main(
+                [path.resolve().as_posix()], True, [], False, schedule="random"
+            )
+
+    @pytest.mark.parametrize(
+        ("args", "recorded"),
+        [([], False), (["--schedule", "largest-first"], True)],
+    )
+    def test_cost_history_is_opt_in(
+        self, tmp_path, monkeypatch, args, recorded
+    ):
+        import complexipy.main as main_module
+        from complexipy.utils.cache import CACHE_DIR_NAME, COSTS_CACHE_KEY
+
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "a.py").write_text("def a():\n    return 1\n")
+
+        result = CliRunner().invoke(main_module.app, [*args, str(src)])
+        assert result.exit_code == 0
+
+        cost_file = tmp_path / CACHE_DIR_NAME / "v" / "cache" / COSTS_CACHE_KEY
+        assert cost_file.exists() is recorded
+
+    def test_shards_partition_the_files(self):
+        path = (self.local_path / "src").resolve().as_posix()
+        files, _ = _complexipy.main([path], True, [], False)
+        all_paths = {file.path for file in files}
+
+        seen: set = set()
+        for index in range(1, 4):
+            shard, _ = _complexipy.main(
+                [path], True, [], False, shard=(index, 3)
+            )
+            shard_paths = {file.path for file in shard}
+            assert shard_paths.isdisjoint(seen)
+            seen |= shard_paths
+        assert seen == all_paths
+
+    def test_invalid_shard_raises(self):
+        path = self.local_path / "src"
+        with pytest.raises(ValueError):
+            _complexipy.main(
+                [path.resolve().as_posix()], True, [], False, shard=(4, 3)
+            )
+
+    def _bare_repo(self, tmp_path: Path, name: str) -> Path:
+        work = tmp_path / f"{name}-work"
+        (work / "pkg").mkdir(parents=True)
+        (work / "pkg" / "module.py").write_text(
+            "def f(x):\n    if x:\n        return 1\n", encoding="utf-8"
+        )
+        (work / "README.md").write_text("not python\n", encoding="utf-8")
+        env = {
+            **os.environ,
+            "GIT_AUTHOR_NAME": "test",
+            "GIT_AUTHOR_EMAIL": "test@example.com",
+            "GIT_COMMITTER_NAME": "test",
+            "GIT_COMMITTER_EMAIL": "test@example.com",
+        }
+        for args in (
+            ["init", "-q"],
+            ["add", "."],
+            ["commit", "-q", "-m", "init"],
+        ):
+            subprocess.run(["git", *args], cwd=work, env=env, check=True)
+        bare = tmp_path / f"{name}.git"
+        subprocess.run(
+            ["git", "clone", "-q", "--bare", work.as_posix(), bare.as_posix()],
+            check=True,
+        )
+        return bare
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+    def test_local_repositories_are_cloned_without_chdir(self, tmp_path: Path):
+        first = self._bare_repo(tmp_path, "first")
+        second = self._bare_repo(tmp_path, "second")
+        missing = tmp_path / "missing.git"
+        cwd = os.getcwd()
+
+        files, failed = _complexipy.main(
+            [
+                second.as_uri(),
+                first.as_posix(),
+                missing.as_uri(),
+            ],
+            True,
+            [],
+            False,
+        )
+
+        assert os.getcwd() == cwd
+        assert [file.path for file in files] == [
+            "second/pkg/module.py",
+            "first/pkg/module.py",
+        ]
+        assert all(file.complexity == 1 for file in files)
+        assert failed == [missing.as_uri()]
+
     def test_snapshot_watermark_passes_and_updates_snapshot(
         self, tmp_path: Path
     ):
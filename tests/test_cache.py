@@ -4,8 +4,10 @@ from pathlib import Path
 from complexipy import _complexipy
 from complexipy.utils.cache import (
     CACHE_DIR_NAME,
+    COSTS_CACHE_KEY,
     FUNCTIONS_CACHE_KEY,
     MAX_CACHE_ENTRIES,
+    prepare_cost_history,
     remember_previous_functions,
 )
 
@@ -215,3 +217,29 @@ class TestCache:
 
         # Should return None gracefully without raising exceptions
         assert result is None
+
+    def test_cost_history_is_recorded_by_the_runner(self, tmp_path: Path):
+        """The runner writes measured per-file costs to the cache."""
+        src = tmp_path / "src"
+        src.mkdir()
+        for name in ("a.py", "b.py"):
+            (src / name).write_text(
+                "def example():\n    return 1\n", encoding="utf-8"
+            )
+
+        cost_history = prepare_cost_history(str(tmp_path))
+        assert cost_history == str(
+            tmp_path / CACHE_DIR_NAME / "v" / "cache" / COSTS_CACHE_KEY
+        )
+
+        files, _ = _complexipy.main(
+            [str(src)], True, [], cost_history=cost_history
+        )
+        assert len(files) == 2
+
+        payload = json.loads(Path(cost_history).read_text(encoding="utf-8"))
+        recorded = sorted(Path(path).name for path in payload["files"])
+        assert recorded == ["a.py", "b.py"]
+
+    def test_cost_history_unavailable_returns_none(self):
+        assert prepare_cost_history("/dev/null/invalid_path") is None
@@ -6,12 +6,16 @@ import pytest
 
 from complexipy.utils.config import resolve_config
 from complexipy.utils.diff import resolve_diff_flags
-from complexipy.types import ColorTypes, Sort
+from complexipy.types import ColorTypes, Schedule, Sort
 from rich.console import Console
 
 _console = Console(color_system=None)
 
 
+def _resolve(toml_config, **kwargs):
+    return resolve_config(toml_config, paths=["."], **kwargs)
+
+
 class TestRunConfigDefaults:
     def test_default_complexity(self):
         cfg = resolve_config(
@@ -814,3 +818,89 @@ class TestDiffSectionFromToml:
     def test_flat_staged_legacy_without_section(self):
         cfg = self._resolve({"staged": True})
         assert cfg.staged is False
+
+
+class TestPipelineOptions:
+    def test_defaults(self):
+        cfg = _resolve(None)
+        assert cfg.jobs is None
+        assert cfg.path_queue_depth is None
+        assert cfg.read_queue_depth is None
+        assert cfg.stats is False
+        assert cfg.schedule is Schedule.discovery
+
+    def test_cli_jobs(self):
+        assert _resolve(None, jobs=2).jobs == 2
+
+    def test_toml_jobs(self):
+        assert _resolve({"jobs": 3}).jobs == 3
+
+    def test_cli_overrides_toml(self):
+        assert _resolve({"jobs": 3}, jobs=1).jobs == 1
+
+    def test_non_positive_raises(self):
+        with pytest.raises(Exception):
+            _resolve(None, jobs=0)
+
+    def test_queue_depths_from_toml(self):
+        cfg = _resolve(
+            {"path-queue-depth": 8, "read-queue-depth": 2, "stats": True}
+        )
+        assert cfg.path_queue_depth == 8
+        assert cfg.read_queue_depth == 2
+        assert cfg.stats is True
+
+    def test_cli_queue_depth_overrides_toml(self):
+        cfg = _resolve({"read-queue-depth": 2}, read_queue_depth=16)
+        assert cfg.read_queue_depth == 16
+
+    def test_plan_jobs(self):
+        assert _resolve(None).plan_jobs is None
+        assert _resolve({"plan-jobs": 2}).plan_jobs == 2
+        assert _resolve({"plan-jobs": 2}, plan_jobs=1).plan_jobs == 1
+        with pytest.raises(Exception):
+            _resolve(None, plan_jobs=0)
+
+    def test_zero_queue_depth_raises(self):
+        with pytest.raises(Exception):
+            _resolve(None, path_queue_depth=0)
+
+    def test_schedule_from_toml(self):
+        cfg = _resolve({"schedule": Schedule.largest_first})
+        assert cfg.schedule is Schedule.largest_first
+
+    def test_cli_schedule_overrides_toml(self):
+        cfg = _resolve(
+            {"schedule": Schedule.largest_first}, schedule=Schedule.discovery
+        )
+        assert cfg.schedule is Schedule.discovery
+
+    def test_shard(self):
+        assert _resolve(None).shard is None
+        assert _resolve(None, shard="2/8").shard == (2, 8)
+
+    @pytest.mark.parametrize("shard", ["0/4", "5/4", "1/0", "2", "a/b", "-1/4"])
+    def test_invalid_shard_raises(self, shard):
+        with pytest.raises(Exception):
+            _resolve(None, shard=shard)
+
+
+class TestScoreOnly:
+    def test_full_analysis_by_default(self):
+        assert _resolve(None).score_only is False
+
+    def test_cli_and_toml(self):
+        assert _resolve(None, score_only=True).score_only is True
+        assert _resolve({"score-only": True}).score_only is True
+
+    @pytest.mark.parametrize("flag", ["quiet", "plain"])
+    def test_implied_by_quiet_and_plain(self, flag):
+        assert _resolve(None, **{flag: True}).score_only is True
+
+    def test_suggest_refactors_keeps_full_analysis(self):
+        cfg = _resolve(None, quiet=True, suggest_refactors=True)
+        assert cfg.score_only is False
+
+    def test_score_only_with_suggest_refactors_raises(self):
+        with pytest.raises(Exception):
+            _resolve(None, score_only=True, suggest_refactors=True)
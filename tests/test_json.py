@@ -47,6 +47,30 @@ class TestJsonOutput:
         assert data[0]["function_name"] == "simple"
         assert data[0]["refactor_plans"] == []
 
+    def test_json_entries_carry_the_function_line_range(self, tmp_path: Path):
+        source_file = tmp_path / "sample.py"
+        source_file.write_text(_SNIPPET, encoding="utf-8")
+        output_file = tmp_path / "results.json"
+
+        store_json(
+            output_file.as_posix(),
+            _build_file_complexity(source_file),
+            show_details=True,
+            max_complexity=0,
+        )
+
+        data = json.loads(output_file.read_text(encoding="utf-8"))
+        assert set(data[0]) == {
+            "path",
+            "file_name",
+            "function_name",
+            "complexity",
+            "line_start",
+            "line_end",
+            "refactor_plans",
+        }
+        assert (data[0]["line_start"], data[0]["line_end"]) == (1, 4)
+
     def test_cli_json_output_has_final_newline(
         self, tmp_path: Path, monkeypatch
     ):
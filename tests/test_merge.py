@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from complexipy._complexipy import load_result_files
+from complexipy._complexipy import main as _main
+from complexipy.utils.json import store_json
+
+_SIMPLE = """\
+def simple(value):
+    if value:
+        return value
+    return 0
+"""
+
+_COMPLEX = """\
+def complex_func(data):
+    if data:
+        for item in data:
+            if item:
+                if item > 0:
+                    return item
+    return None
+"""
+
+
+def _write_report(tmp_path: Path, name: str, source: str) -> Path:
+    source_file = tmp_path / f"{name}.py"
+    source_file.write_text(source, encoding="utf-8")
+    files, _ = _main(
+        [source_file.as_posix()], True, [], invocation_path=str(tmp_path)
+    )
+    report = tmp_path / f"{name}.json"
+    store_json(report.as_posix(), files, show_details=True, max_complexity=0)
+    return report
+
+
+class TestMerge:
+    def test_load_result_files_rebuilds_file_complexities(self, tmp_path: Path):
+        simple = _write_report(tmp_path, "simple", _SIMPLE)
+        complex_ = _write_report(tmp_path, "complex", _COMPLEX)
+        missing = tmp_path / "missing.json"
+
+        files, failed = load_result_files(
+            [complex_.as_posix(), simple.as_posix(), missing.as_posix()]
+        )
+
+        assert failed == [missing.as_posix()]
+        names = [file.file_name for file in files]
+        assert names == ["complex.py", "simple.py"]
+        assert files[1].functions[0].name == "simple"
+        assert files[1].functions[0].line_start == 1
+        assert files[1].complexity == files[1].functions[0].complexity
+
+    def test_truncated_input_adds_no_rows(self, tmp_path: Path):
+        report = _write_report(tmp_path, "both", _SIMPLE + "\n\n" + _COMPLEX)
+        text = report.read_text(encoding="utf-8")
+        truncated = tmp_path / "truncated.json"
+        assert text.count('"function_name"') == 2
+        # Cut partway through the second row, after the first one parsed.
+        truncated.write_text(text[: text.rindex('"function_name"')])
+
+        files, failed = load_result_files([truncated.as_posix()])
+
+        assert files == []
+        assert failed == [truncated.as_posix()]
+
+    def test_cli_merges_reports_into_sarif(self, tmp_path: Path, monkeypatch):
+        import complexipy.main as main_module
+
+        simple = _write_report(tmp_path, "simple", _SIMPLE)
+        complex_ = _write_report(tmp_path, "complex", _COMPLEX)
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+
+        result = CliRunner().invoke(
+            main_module.app,
+            [
+                "merge",
+                str(simple),
+                str(complex_),
+                "--max-complexity-allowed",
+                "5",
+                "--ignore-complexity",
+                "--output-format",
+                "sarif",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        sarif = json.loads(
+            (tmp_path / "complexipy-results.sarif").read_text(encoding="utf-8")
+        )
+        results = sarif["runs"][0]["results"]
+        assert len(results) == 1
+        region = results[0]["locations"][0]["physicalLocation"]["region"]
+        assert region["startLine"] == 1
+
+    def test_cli_merge_enforces_threshold(self, tmp_path: Path, monkeypatch):
+        import complexipy.main as main_module
+
+        simple = _write_report(tmp_path, "simple", _SIMPLE)
+        complex_ = _write_report(tmp_path, "complex", _COMPLEX)
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+        runner = CliRunner()
+
+        passing = runner.invoke(
+            main_module.app, ["merge", str(simple), "-mx", "5", "--quiet"]
+        )
+        failing = runner.invoke(
+            main_module.app,
+            ["merge", str(simple), str(complex_), "-mx", "5", "--quiet"],
+        )
+
+        assert passing.exit_code == 0, passing.output
+        assert failing.exit_code == 1
+
+    def test_cli_merge_reports_unreadable_inputs(
+        self, tmp_path: Path, monkeypatch
+    ):
+        import complexipy.main as main_module
+
+        broken = tmp_path / "broken.json"
+        broken.write_text("[{", encoding="utf-8")
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+
+        result = CliRunner().invoke(main_module.app, ["merge", str(broken)])
+
+        assert result.exit_code == 1
+        assert "broken.json" in result.output
+
+    def test_cli_merge_applies_snapshot_watermark(
+        self, tmp_path: Path, monkeypatch
+    ):
+        import complexipy.main as main_module
+
+        complex_ = _write_report(tmp_path, "complex", _COMPLEX)
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+        runner = CliRunner()
+
+        created = runner.invoke(
+            main_module.app,
+            ["merge", str(complex_), "-mx", "1", "--snapshot-create"],
+        )
+        watermarked = runner.invoke(
+            main_module.app, ["merge", str(complex_), "-mx", "1", "--quiet"]
+        )
+
+        assert (tmp_path / "complexipy-snapshot.json").exists()
+        assert created.exit_code == 0, created.output
+        assert watermarked.exit_code == 0, watermarked.output
+
+    def test_path_named_like_the_subcommand(self, tmp_path: Path, monkeypatch):
+        import complexipy.main as main_module
+
+        package = tmp_path / "merge"
+        package.mkdir()
+        (package / "simple.py").write_text(_SIMPLE, encoding="utf-8")
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+        monkeypatch.chdir(tmp_path)
+        runner = CliRunner()
+
+        for args in (["./merge"], ["--", "merge"]):
+            report = tmp_path / "complexipy-results.json"
+            report.unlink(missing_ok=True)
+            result = runner.invoke(
+                main_module.app, [*args, "--output-format", "json"]
+            )
+
+            assert result.exit_code == 0, (args, result.output)
+            entries = json.loads(report.read_text(encoding="utf-8"))
+            assert [entry["function_name"] for entry in entries] == ["simple"]
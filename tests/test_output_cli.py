@@ -100,6 +100,36 @@ class TestOutputCli:
         assert (output_dir / "complexipy-results.json").exists()
         assert (output_dir / "complexipy-results.csv").exists()
 
+    def test_shard_tags_default_output_filenames(self, tmp_path: Path):
+        import complexipy.main as main_module
+
+        runner = CliRunner()
+        source_file = tmp_path / "sample.py"
+        output_dir = tmp_path / "reports"
+        source_file.write_text(_SNIPPET, encoding="utf-8")
+
+        result = runner.invoke(
+            main_module.app,
+            [
+                "--shard",
+                "1/1",
+                "--output-format",
+                "json",
+                "--output-format",
+                "gitlab",
+                "--output",
+                f"{output_dir}{Path('/').as_posix()}",
+                str(source_file),
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert (output_dir / "complexipy-results.shard-1-of-1.json").exists()
+        assert (
+            output_dir / "complexipy-results.shard-1-of-1.gitlab.json"
+        ).exists()
+        assert not (output_dir / "complexipy-results.json").exists()
+
 
 _REFACTOR_SNIPPET = """\
 def sample(a, b, c, d):
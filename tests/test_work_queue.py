@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from complexipy import _complexipy
+from complexipy.utils.work_queue import (
+    MAX_ATTEMPTS,
+    claim_batch,
+    complete_batch,
+    create_queue,
+    queue_results,
+    queue_status,
+    run_worker,
+)
+
+SRC = Path(__file__).resolve().parent / "src"
+
+
+def _copy_sources(tmp_path: Path) -> Path:
+    project = tmp_path / "project"
+    shutil.copytree(SRC, project, ignore=shutil.ignore_patterns("__pycache__"))
+    return project
+
+
+def _functions(files) -> set:
+    return {
+        (file.path, function.name, function.complexity)
+        for file in files
+        for function in file.functions
+    }
+
+
+class TestWorkQueue:
+    def test_worker_processes_drain_one_queue(
+        self, tmp_path: Path, monkeypatch
+    ):
+        import complexipy.main as main_module
+
+        project = _copy_sources(tmp_path)
+        queue = tmp_path / "queue"
+        report = tmp_path / "report.json"
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+        runner = CliRunner()
+
+        init = runner.invoke(
+            main_module.app,
+            ["queue", "init", str(queue), str(project), "--batch-size", "2"],
+        )
+        assert init.exit_code == 0, init.output
+
+        workers = [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "complexipy.main",
+                    "queue",
+                    "work",
+                    str(queue),
+                    "--poll-interval",
+                    "0.05",
+                    "--quiet",
+                ],
+                cwd=tmp_path,
+            )
+            for _ in range(3)
+        ]
+        assert [worker.wait(timeout=120) for worker in workers] == [0, 0, 0]
+        assert queue_status(str(queue)).finished
+
+        assembled = runner.invoke(
+            main_module.app,
+            [
+                "queue",
+                "assemble",
+                str(queue),
+                "--ignore-complexity",
+                "--quiet",
+                "--output-format",
+                "json",
+                "--output",
+                str(report),
+            ],
+        )
+        assert assembled.exit_code == 0, assembled.output
+
+        expected, _ = _complexipy.main(
+            [str(project)], True, [], invocation_path=str(tmp_path)
+        )
+        rows = json.loads(report.read_text(encoding="utf-8"))
+        assert {
+            (row["path"], row["function_name"], row["complexity"])
+            for row in rows
+        } == _functions(expected)
+
+    def test_expired_claims_are_reissued(self, tmp_path: Path):
+        project = _copy_sources(tmp_path)
+        queue = str(tmp_path / "queue")
+        files, _ = _complexipy.discover_files([str(project)], [], str(tmp_path))
+        batches = create_queue(queue, files, batch_size=4)
+
+        stale = claim_batch(queue, "dead-worker", lease_seconds=0.01)
+        assert stale is not None
+        completed = run_worker(
+            queue, "live-worker", lease_seconds=60, poll_interval=0.01
+        )
+
+        assert completed == batches
+        assert queue_status(queue).done == batches
+        assert not complete_batch(queue, stale.id, "dead-worker", [], [])
+
+    def test_batches_that_keep_killing_workers_fail(self, tmp_path: Path):
+        project = _copy_sources(tmp_path)
+        queue = str(tmp_path / "queue")
+        files, _ = _complexipy.discover_files([str(project)], [], str(tmp_path))
+        create_queue(queue, files, batch_size=len(files))
+
+        for attempt in range(MAX_ATTEMPTS):
+            assert claim_batch(queue, f"dead-{attempt}", lease_seconds=0)
+            time.sleep(0.01)
+        completed = run_worker(queue, "live-worker", poll_interval=0.01)
+
+        status = queue_status(queue)
+        reports, failed_paths = queue_results(queue)
+        assert completed == 0
+        assert (status.failed, status.finished) == (1, True)
+        assert reports == []
+        assert failed_paths == sorted(file for file, _ in files)
+
+    def test_plans_are_only_built_when_requested(self, tmp_path: Path):
+        fixtures = SRC.parent / "fixtures" / "refactor_plans"
+        files, _ = _complexipy.discover_files(
+            [str(fixtures)], [], str(tmp_path)
+        )
+        plans = {}
+        for suggest_refactors in (False, True):
+            queue = tmp_path / f"queue-{suggest_refactors}"
+            create_queue(str(queue), files, suggest_refactors=suggest_refactors)
+            run_worker(str(queue), "worker", poll_interval=0.01)
+            reports, _ = queue_results(str(queue))
+            plans[suggest_refactors] = [
+                plan
+                for report in reports
+                for row in json.loads(Path(report).read_text("utf-8"))
+                for plan in row["refactor_plans"]
+            ]
+
+        assert plans[False] == []
+        assert plans[True]
+
+    def test_assemble_requires_a_drained_queue(
+        self, tmp_path: Path, monkeypatch
+    ):
+        import complexipy.main as main_module
+
+        project = _copy_sources(tmp_path)
+        queue = tmp_path / "queue"
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+        runner = CliRunner()
+
+        runner.invoke(
+            main_module.app, ["queue", "init", str(queue), str(project)]
+        )
+        again = runner.invoke(
+            main_module.app, ["queue", "init", str(queue), str(project)]
+        )
+        assembled = runner.invoke(
+            main_module.app, ["queue", "assemble", str(queue)]
+        )
+
+        assert again.exit_code == 2
+        assert assembled.exit_code == 1
+        assert "not finished" in assembled.output
+
+    def test_path_named_like_the_subcommand(self, tmp_path: Path, monkeypatch):
+        import complexipy.main as main_module
+
+        shutil.copytree(
+            SRC,
+            tmp_path / "queue",
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+        monkeypatch.setattr(main_module, "INVOCATION_PATH", str(tmp_path))
+        monkeypatch.chdir(tmp_path)
+        runner = CliRunner()
+
+        for args in (["./queue"], ["--", "queue"]):
+            report = tmp_path / "complexipy-results.json"
+            report.unlink(missing_ok=True)
+            result = runner.invoke(
+                main_module.app, [*args, "--output-format", "json"]
+            )
+
+            assert result.exit_code in (0, 1), (args, result.output)
+            assert json.loads(report.read_text(encoding="utf-8"))